@@ -0,0 +1,867 @@
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import httpx
+import numpy as np
+import orjson
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; payload reports skip brotli sizes without it
+    brotli = None
+
+
+# Benchmark Configuration
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "src", "data")
+SEED_BATCH_SIZE = 1000
+
+# Share of generated investors that are incubators/accelerators
+INCUBATOR_SHARE = 0.02
+
+# Percentiles reported for every endpoint
+PERCENTILES = (50, 90, 95, 99)
+
+# Responses measured by `payload`: name -> path (exports are NDJSON streams)
+PAYLOAD_TARGETS = {
+    "startups.list": "/api/startups?limit=100",
+    "startups.list.sparse": "/api/startups?limit=100&fields=name,logo",
+    "investors.list": "/api/investors?limit=100",
+    "investors.list.sparse": "/api/investors?limit=100&fields=name,logo",
+    "dashboard": "/api/stats/dashboard",
+    "startups.export": "/api/startups/export",
+    "startups.export.sparse": "/api/startups/export?fields=name,logo",
+}
+
+
+# ==================== SYNTHETIC DATA ====================
+
+def _load_seed_files() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    with open(os.path.join(DATA_DIR, "investorsData.json")) as f:
+        investors = json.load(f)
+    with open(os.path.join(DATA_DIR, "startupsData.json")) as f:
+        startups = json.load(f)
+    return investors, startups
+
+
+def _unique(values) -> List[Any]:
+    return list(dict.fromkeys(value for value in values if value))
+
+
+def _format_money(amount: float) -> str:
+    """Format a dollar amount the way the seed files do: $500K, $8.5M, $1.2B"""
+    for threshold, suffix in ((1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if amount >= threshold:
+            return f"${round(amount / threshold, 1):g}{suffix}"
+    return f"${amount:.0f}"
+
+
+class SyntheticData:
+    """Deterministic investors and startups shaped like frontend/src/data/*.json.
+
+    Vocabularies (industries, stages, locations, tags...) and free text come
+    from the seed files, so filters and search hit realistic values.
+    """
+
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+        investors_data, startups_data = _load_seed_files()
+        self.investor_templates = investors_data["investors"]
+        self.incubator_templates = investors_data["incubators"]
+        self.startup_templates = startups_data["startups"]
+        filters = investors_data["filters"]
+
+        self.industries = _unique(
+            [s["industry"] for s in self.startup_templates]
+            + [i for t in self.investor_templates for i in t["focusIndustries"]]
+            + filters["industries"]
+        )
+        self.funding_stages = _unique(
+            [s["fundingStage"] for s in self.startup_templates] + filters["investmentStages"]
+        )
+        self.startup_locations = _unique(s["location"] for s in self.startup_templates)
+        self.investor_locations = _unique(
+            [t["location"] for t in self.investor_templates + self.incubator_templates]
+            + [location for location in filters["locations"] if location != "All Locations"]
+        )
+        self.categories = _unique(c for s in self.startup_templates for c in s["categories"])
+        self.tags = _unique(t for s in self.startup_templates for t in s["tags"] if not t.startswith("+"))
+        self.deal_sizes = _unique(t["dealSize"] for t in self.investor_templates) + ["small"]
+        self.investor_types = _unique(t["type"] for t in self.investor_templates) + ["Angel Network", "Corporate VC"]
+        self.name_words = _unique(
+            word for t in self.startup_templates + self.investor_templates + self.incubator_templates
+            for word in t["name"].split()
+        )
+        self.search_terms = _unique(
+            [word.lower() for word in self.name_words if len(word) > 3]
+            + [industry.lower() for industry in self.industries]
+        )
+
+    def _name(self, index: int) -> str:
+        return f"{' '.join(self.rng.sample(self.name_words, 2))} {index}"
+
+    def _amount(self, low: float, high: float) -> float:
+        """Log-uniform amount, so every order of magnitude is equally common"""
+        return 10 ** self.rng.uniform(np.log10(low), np.log10(high))
+
+    def startup(self, index: int) -> Dict[str, Any]:
+        template = self.rng.choice(self.startup_templates)
+        industry = self.rng.choice(self.industries)
+        return {
+            "name": self._name(index),
+            "logo": template["logo"],
+            "tagline": template["tagline"],
+            "description": template["description"],
+            "matchPercentage": self.rng.randint(50, 99),
+            "industry": industry,
+            "fundingStage": self.rng.choice(self.funding_stages),
+            "location": self.rng.choice(self.startup_locations),
+            "funding": _format_money(self._amount(1e5, 2e8)),
+            "teamSize": int(self._amount(2, 2000)),
+            "founded": self.rng.randint(2005, 2025),
+            "growth": f"+{self.rng.randint(5, 900)}%",
+            "categories": _unique([industry] + self.rng.sample(self.categories, self.rng.randint(1, 3))),
+            "foundingTeam": template["foundingTeam"][:self.rng.randint(1, len(template["foundingTeam"]))],
+            "tags": self.rng.sample(self.tags, self.rng.randint(1, 4)),
+        }
+
+    def investor(self, index: int) -> Dict[str, Any]:
+        if self.rng.random() < INCUBATOR_SHARE:
+            template = self.rng.choice(self.incubator_templates)
+            incubator = {key: value for key, value in template.items() if key != "id"}
+            incubator.update({
+                "name": self._name(index),
+                "location": self.rng.choice(self.investor_locations),
+                "status": "Active",
+                "focusAreas": self.rng.sample(self.industries, self.rng.randint(1, 4)),
+                "batchSize": self.rng.randint(5, 300),
+                "alumni": self.rng.randint(10, 5000),
+            })
+            return incubator
+        template = self.rng.choice(self.investor_templates)
+        low = self._amount(1e5, 5e7)
+        return {
+            "name": self._name(index),
+            "type": self.rng.choice(self.investor_types),
+            "logo": template["logo"],
+            "location": self.rng.choice(self.investor_locations),
+            "status": "Active" if self.rng.random() < 0.85 else "Inactive",
+            "investmentRange": {"min": _format_money(low), "max": _format_money(low * self.rng.uniform(2, 100))},
+            "focusIndustries": self.rng.sample(self.industries, self.rng.randint(1, 4)),
+            "investmentStages": sorted(
+                self.rng.sample(self.funding_stages, self.rng.randint(1, 4)),
+                key=self.funding_stages.index
+            ),
+            "portfolioCompanies": self.rng.randint(0, 300),
+            "activeDeals": self.rng.randint(0, 40),
+            "investmentThesis": template["investmentThesis"],
+            "dealSize": self.rng.choice(self.deal_sizes),
+        }
+
+
+async def seed_database(scale: int, seed: int = 42) -> Dict[str, int]:
+    """Replace the investors and startups collections with `scale` synthetic documents each"""
+    import db
+    import indexes
+    import stats
+
+    database = db.get_database()
+    for collection_name in ("investors", "startups", db.COUNTERS_COLLECTION, stats.STATS_COLLECTION):
+        await database[collection_name].drop()
+    await indexes.ensure_indexes(database)
+    await db.ensure_id_counters()
+
+    data = SyntheticData(seed)
+    started = time.perf_counter()
+    for collection_name, make, create_batch in (
+        ("investors", data.investor, db.bulk_create_investors),
+        ("startups", data.startup, db.bulk_create_startups),
+    ):
+        for offset in range(0, scale, SEED_BATCH_SIZE):
+            batch = [make(index) for index in range(offset + 1, min(offset + SEED_BATCH_SIZE, scale) + 1)]
+            await create_batch(batch)
+        print(f"Seeded {scale} {collection_name} ({time.perf_counter() - started:.1f}s)")
+    await stats.rebuild(database)
+    return {"investors": scale, "startups": scale}
+
+
+# ==================== SCENARIOS ====================
+
+class Recorder:
+    """Collects latencies, errors and response sizes per scenario for requests started after `measure_from`"""
+
+    def __init__(self, measure_from: float):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        # Bytes received per response, as sent (compressed when the server compressed it)
+        self.sizes: Dict[str, List[int]] = {}
+        self.measure_from = measure_from
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        name: str,
+        method: str,
+        path: str,
+        **kwargs
+    ) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - started
+        if started >= self.measure_from:
+            self.samples.setdefault(name, []).append(elapsed)
+            if response is None or response.status_code >= 500:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            else:
+                self.sizes.setdefault(name, []).append(response.num_bytes_downloaded)
+        return response
+
+
+class Context:
+    """What scenarios need to know about the target: data vocabularies and id ranges"""
+
+    def __init__(self, data: SyntheticData, investors: int, startups: int):
+        self.data = data
+        self.investors = max(investors, 1)
+        self.startups = max(startups, 1)
+        self.created: List[int] = []
+
+
+def _query(**params) -> str:
+    return "&".join(f"{key}={httpx.QueryParams({key: value})[key]}" for key, value in params.items() if value is not None)
+
+
+def _maybe(rng: random.Random, probability: float, value: Any) -> Any:
+    return value if rng.random() < probability else None
+
+
+async def investors_list(client, rng, ctx, rec):
+    data = ctx.data
+    query = _query(
+        industry=_maybe(rng, 0.5, rng.choice(data.industries)),
+        stage=_maybe(rng, 0.3, rng.choice(data.funding_stages)),
+        status=_maybe(rng, 0.3, "Active"),
+        deal_size=_maybe(rng, 0.2, rng.choice(data.deal_sizes)),
+        check_size=_maybe(rng, 0.2, int(data._amount(1e5, 5e7))),
+        page=rng.choice([1, 1, 1, 2, 3]),
+        limit=rng.choice([10, 20]),
+    )
+    await rec.request(client, "investors.list", "GET", f"/api/investors?{query}")
+
+
+async def investors_search(client, rng, ctx, rec):
+    await rec.request(client, "investors.search", "GET", f"/api/investors?{_query(search=rng.choice(ctx.data.search_terms))}")
+
+
+async def investors_deep_page(client, rng, ctx, rec):
+    page = rng.randint(1, max(ctx.investors // 10, 1))
+    await rec.request(client, "investors.deepPage", "GET", f"/api/investors?page={page}&limit=10")
+
+
+async def startups_list(client, rng, ctx, rec):
+    data = ctx.data
+    query = _query(
+        industry=_maybe(rng, 0.5, rng.choice(data.industries)),
+        funding_stage=_maybe(rng, 0.3, rng.choice(data.funding_stages)),
+        location=_maybe(rng, 0.1, rng.choice(data.startup_locations)),
+        min_team_size=_maybe(rng, 0.2, rng.choice([5, 10, 25])),
+        max_team_size=_maybe(rng, 0.2, rng.choice([50, 100, 500])),
+        min_funding=_maybe(rng, 0.2, rng.choice([500000, 1000000, 5000000])),
+        sort_by=_maybe(rng, 0.6, rng.choice(["matchPercentage", "teamSize", "founded", "funding", "growth"])),
+        sort_order=rng.choice(["asc", "desc"]),
+        page=rng.choice([1, 1, 1, 2, 3]),
+        limit=rng.choice([10, 20]),
+    )
+    await rec.request(client, "startups.list", "GET", f"/api/startups?{query}")
+
+
+async def startups_faceted(client, rng, ctx, rec):
+    """A browse page view: one page plus the facet counts for its filter sidebar"""
+    query = _query(
+        industry=_maybe(rng, 0.5, rng.choice(ctx.data.industries)),
+        funding_stage=_maybe(rng, 0.3, rng.choice(ctx.data.funding_stages)),
+        facets="industry,fundingStage,location,categories,tags",
+    )
+    await rec.request(client, "startups.faceted", "GET", f"/api/startups?{query}")
+
+
+async def startups_search(client, rng, ctx, rec):
+    await rec.request(client, "startups.search", "GET", f"/api/startups?{_query(search=rng.choice(ctx.data.search_terms))}")
+
+
+async def startups_deep_page(client, rng, ctx, rec):
+    page = rng.randint(1, max(ctx.startups // 10, 1))
+    await rec.request(client, "startups.deepPage", "GET", f"/api/startups?page={page}&limit=10&sort_by=teamSize")
+
+
+async def startups_cursor_walk(client, rng, ctx, rec):
+    """Follow nextCursor for a few pages, as infinite scroll does"""
+    cursor = "*"
+    sort_by = rng.choice(["matchPercentage", "teamSize", "funding"])
+    for _ in range(rng.randint(2, 5)):
+        response = await rec.request(
+            client, "startups.cursorPage", "GET",
+            f"/api/startups?{_query(sort_by=sort_by, cursor=cursor, limit=20)}"
+        )
+        if response is None or response.status_code != 200 or not response.json().get("nextCursor"):
+            return
+        cursor = response.json()["nextCursor"]
+
+
+async def document_detail(client, rng, ctx, rec):
+    if rng.random() < 0.5:
+        await rec.request(client, "investors.detail", "GET", f"/api/investors/{rng.randint(1, ctx.investors)}")
+    else:
+        await rec.request(client, "startups.detail", "GET", f"/api/startups/{rng.randint(1, ctx.startups)}")
+
+
+async def matches(client, rng, ctx, rec):
+    if rng.random() < 0.5:
+        await rec.request(client, "investors.matches", "GET", f"/api/investors/{rng.randint(1, ctx.investors)}/matches")
+    else:
+        await rec.request(client, "startups.matches", "GET", f"/api/startups/{rng.randint(1, ctx.startups)}/matches")
+
+
+async def batch_lookup(client, rng, ctx, rec):
+    """Resolve a portfolio's worth of ids in one request instead of one per id"""
+    count = rng.randint(5, 200)
+    if rng.random() < 0.5:
+        ids = ",".join(str(rng.randint(1, ctx.startups)) for _ in range(count))
+        await rec.request(client, "startups.ids", "GET", f"/api/startups?ids={ids}&fields=name,logo,industry")
+    else:
+        items = [
+            {"collection": "investors", "id": rng.randint(1, ctx.investors)} if rng.random() < 0.5
+            else {"collection": "startups", "id": rng.randint(1, ctx.startups)}
+            for _ in range(count)
+        ]
+        await rec.request(client, "lookup", "POST", "/api/lookup", json={"items": items})
+
+
+async def filter_lists(client, rng, ctx, rec):
+    path = rng.choice([
+        "/api/investors/filters/industries",
+        "/api/investors/filters/stages",
+        "/api/investors/filters/locations",
+        "/api/investors/incubators/all",
+        "/api/startups/filters/industries",
+        "/api/startups/filters/stages",
+        "/api/startups/filters/locations",
+        "/api/startups/filters/categories",
+        "/api/startups/filters/tags",
+    ])
+    await rec.request(client, "filters", "GET", path)
+
+
+async def dashboard(client, rng, ctx, rec):
+    if rng.random() < 0.5:
+        await rec.request(client, "stats.platform", "GET", "/api/stats")
+    else:
+        await rec.request(client, "stats.dashboard", "GET", "/api/stats/dashboard")
+
+
+async def revalidate(client, rng, ctx, rec):
+    """Repeat visit: refetch a list with the ETag from the first fetch"""
+    path = f"/api/startups?{_query(industry=rng.choice(ctx.data.industries))}"
+    response = await rec.request(client, "startups.list", "GET", path)
+    if response is not None and response.headers.get("etag"):
+        await rec.request(client, "startups.revalidate", "GET", path, headers={"If-None-Match": response.headers["etag"]})
+
+
+async def startup_writes(client, rng, ctx, rec):
+    roll = rng.random()
+    if roll < 0.4 or not ctx.created:
+        response = await rec.request(client, "startups.create", "POST", "/api/startups", json=ctx.data.startup(0))
+        if response is not None and response.status_code == 201:
+            ctx.created.append(response.json()["id"])
+    elif roll < 0.8:
+        await rec.request(
+            client, "startups.patch", "PATCH", f"/api/startups/{rng.choice(ctx.created)}",
+            json={"teamSize": rng.randint(2, 500)}
+        )
+    else:
+        startup_id = ctx.created.pop(rng.randrange(len(ctx.created)))
+        await rec.request(client, "startups.delete", "DELETE", f"/api/startups/{startup_id}")
+
+
+async def investor_writes(client, rng, ctx, rec):
+    investor = ctx.data.investor(0)
+    if "duration" in investor:
+        return
+    response = await rec.request(client, "investors.create", "POST", "/api/investors", json=investor)
+    if response is not None and response.status_code == 201:
+        investor_id = response.json()["id"]
+        await rec.request(
+            client, "investors.put", "PUT", f"/api/investors/{investor_id}",
+            json={"activeDeals": rng.randint(0, 40)}
+        )
+        await rec.request(client, "investors.delete", "DELETE", f"/api/investors/{investor_id}")
+
+
+async def bulk_import(client, rng, ctx, rec):
+    body = "\n".join(json.dumps(ctx.data.startup(0)) for _ in range(100))
+    response = await rec.request(
+        client, "startups.bulk", "POST", "/api/startups:bulk",
+        content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    if response is not None and response.status_code == 200:
+        print(f"Bulk import inserted {response.json()['inserted']} startups")
+
+
+async def export(client, rng, ctx, rec):
+    collection_name = rng.choice(["investors", "startups"])
+    await rec.request(client, f"{collection_name}.export", "GET", f"/api/{collection_name}/export")
+
+
+# Scenario mixes: scenario -> weight. Search scenarios need $text support (MongoDB
+# or the embedded store) and are dropped under --mongomock.
+MIXES: Dict[str, Dict[Callable, float]] = {
+    "read": {
+        investors_list: 15,
+        investors_search: 5,
+        investors_deep_page: 3,
+        startups_list: 20,
+        startups_search: 6,
+        startups_deep_page: 3,
+        startups_cursor_walk: 5,
+        startups_faceted: 5,
+        document_detail: 15,
+        matches: 5,
+        batch_lookup: 3,
+        filter_lists: 10,
+        dashboard: 8,
+        revalidate: 5,
+    },
+}
+MIXES["full"] = {
+    **MIXES["read"],
+    startup_writes: 6,
+    investor_writes: 2,
+    bulk_import: 0.2,
+    export: 0.1,
+}
+SERVER_ONLY_SCENARIOS = {investors_search, startups_search}
+
+
+# ==================== RUNNER ====================
+
+def summarize(samples: List[float], errors: int, duration: float, sizes: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Throughput, latency percentiles (milliseconds) and bytes on the wire for a list of latencies"""
+    latencies = np.array(samples) * 1000 if samples else np.zeros(1)
+    sizes = sizes or []
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput": round(len(samples) / duration, 2) if duration else 0.0,
+        "latencyMs": {
+            **{f"p{p}": round(float(np.percentile(latencies, p)), 3) for p in PERCENTILES},
+            "mean": round(float(latencies.mean()), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+        "bytes": {
+            "mean": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "total": sum(sizes),
+        }
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _target_sizes(client: httpx.AsyncClient) -> Tuple[int, int]:
+    """Document counts of the target, used to pick valid ids and pages"""
+    response = await client.get("/api/stats/dashboard")
+    response.raise_for_status()
+    totals = response.json()["totals"]
+    return totals["investors"], totals["startups"]
+
+
+async def run_benchmark(
+    client: httpx.AsyncClient,
+    mix: Dict[Callable, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """Drive the target with `concurrency` workers picking weighted scenarios"""
+    investors, startups = await _target_sizes(client)
+    ctx = Context(SyntheticData(seed), investors, startups)
+    scenarios = list(mix)
+    weights = list(mix.values())
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+    recorder = Recorder(measure_from)
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < stop_at:
+            scenario = rng.choices(scenarios, weights)[0]
+            await scenario(client, rng, ctx, recorder)
+            # In-process targets may never suspend; let the other workers in
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    measured = time.perf_counter() - measure_from
+
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    all_sizes = [size for sizes in recorder.sizes.values() for size in sizes]
+    return {
+        "summary": summarize(all_samples, sum(recorder.errors.values()), measured, all_sizes),
+        "endpoints": {
+            name: summarize(samples, recorder.errors.get(name, 0), measured, recorder.sizes.get(name))
+            for name, samples in sorted(recorder.samples.items())
+        }
+    }
+
+
+def _configure_storage(args):
+    """Pick the database of the app in this process before db is first imported"""
+    if args.storage:
+        if getattr(args, "url", None) or args.mongomock:
+            raise SystemExit("--storage picks the backend of the app in this process; start the server with STORAGE_BACKEND instead")
+        os.environ["STORAGE_BACKEND"] = args.storage
+    if args.mongomock:
+        _use_mongomock()
+
+
+async def _start_app(args):
+    """Start the app in this process, seeding it first when asked"""
+    import main
+    app = main.app
+    await app.router.startup()
+    if args.seed_scale:
+        await seed_database(args.seed_scale, args.seed)
+    return app
+
+
+def _storage_name(args) -> str:
+    return "mongomock" if args.mongomock else os.getenv("STORAGE_BACKEND", "mongodb")
+
+
+async def _run(args) -> Dict[str, Any]:
+    mix = dict(MIXES[args.mix])
+    _configure_storage(args)
+    if args.mongomock:
+        mix = {scenario: weight for scenario, weight in mix.items() if scenario not in SERVER_ONLY_SCENARIOS}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        if args.seed_scale:
+            raise SystemExit("--seed-scale seeds through this process; run `seed` against the server's database instead")
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)
+        app = None
+    else:
+        app = await _start_app(args)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark", limits=limits, timeout=timeout
+        )
+
+    try:
+        result = await run_benchmark(client, mix, args.concurrency, args.duration, args.warmup, args.seed)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    result["meta"] = {
+        "target": args.url or "in-process",
+        "database": "mongomock" if args.mongomock else os.getenv("DATABASE_NAME", "Visnex_global"),
+        "storage": _storage_name(args),
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "seed": args.seed,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+    }
+    return result
+
+
+def _use_mongomock():
+    """Point db at an in-memory mongomock database (it lives only as long as this process)"""
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--mongomock requires the 'mongomock-motor' package (pip install mongomock-motor)")
+    os.environ.setdefault("MONGODB_URL", "mongodb://mongomock")
+    import db
+    client = AsyncMongoMockClient()
+    db._client = client
+    db._db = client[db.DATABASE_NAME]
+    db._read_db = db._db
+
+
+# ==================== PAYLOAD ====================
+
+def _median_ms(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1000, 3)
+
+
+def serialization_times(body: Any, repeat: int) -> Dict[str, float]:
+    """Median milliseconds to render `body` with orjson and with FastAPI's default JSON encoding"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    return {
+        "orjson": _median_ms(lambda: ORJSONResponse(body), repeat),
+        "default": _median_ms(lambda: JSONResponse(jsonable_encoder(body)), repeat),
+    }
+
+
+async def measure_payloads(client: httpx.AsyncClient, repeat: int) -> Dict[str, Any]:
+    """Body and on-the-wire sizes of representative responses, and the cost of rendering them"""
+    results = {}
+    for name, path in PAYLOAD_TARGETS.items():
+        plain = await client.get(path, headers={"Accept-Encoding": "identity"})
+        plain.raise_for_status()
+        wire = {"identity": plain.num_bytes_downloaded}
+        for encoding in ("gzip", "br"):
+            response = await client.get(path, headers={"Accept-Encoding": encoding})
+            if response.headers.get("content-encoding") == encoding:
+                wire[encoding] = response.num_bytes_downloaded
+        body = plain.content
+        result = {
+            "bodyBytes": len(body),
+            "wireBytes": wire,
+            # What the body would compress to, whatever the server is configured to send
+            "gzipBytes": len(gzip.compress(body, compresslevel=6)),
+            "brotliBytes": len(brotli.compress(body)) if brotli is not None else None,
+        }
+        if plain.headers.get("content-type", "").startswith("application/json"):
+            result["serializationMs"] = serialization_times(orjson.loads(body), repeat)
+        results[name] = result
+    return results
+
+
+async def _payload(args) -> Dict[str, Any]:
+    _configure_storage(args)
+    app = await _start_app(args)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+    try:
+        results = await measure_payloads(client, args.repeat)
+    finally:
+        await client.aclose()
+        await app.router.shutdown()
+    return {
+        "payloads": results,
+        "meta": {
+            "storage": _storage_name(args),
+            "repeat": args.repeat,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+        }
+    }
+
+
+def payload_table(report: Dict[str, Any]) -> List[str]:
+    """One line per measured response: sizes in bytes, render times in milliseconds"""
+    headings = ("body", "gzip", "brotli", "wire gzip", "orjson ms", "default ms")
+    width = max(len(name) for name in report["payloads"])
+    lines = ["  ".join([f"{'response':<{width}}"] + [f"{heading:>10}" for heading in headings])]
+    for name, result in report["payloads"].items():
+        times = result.get("serializationMs") or {}
+        cells = (
+            result["bodyBytes"], result["gzipBytes"], result["brotliBytes"],
+            result["wireBytes"].get("gzip"), times.get("orjson"), times.get("default"),
+        )
+        lines.append("  ".join([f"{name:<{width}}"] + [f"{'-' if cell is None else cell:>10}" for cell in cells]))
+    return lines
+
+
+# ==================== COMPARISON ====================
+
+# Run settings that must match for a comparison to mean anything
+COMPARABLE_SETTINGS = ("target", "database", "storage", "mix", "concurrency")
+
+# Columns of the side-by-side table: (heading, metric path in an endpoint summary)
+TABLE_COLUMNS = (("p50", ("latencyMs", "p50")), ("p99", ("latencyMs", "p99")), ("req/s", ("throughput",)))
+
+
+def compare(
+    base: Dict[str, Any],
+    head: Dict[str, Any],
+    threshold: float,
+    min_ms: float,
+    min_requests: int
+) -> List[Dict[str, Any]]:
+    """Endpoint metrics that got worse by more than `threshold` (a fraction) between two runs.
+
+    Latency changes smaller than `min_ms`, and endpoints with fewer than
+    `min_requests` samples in either run, are ignored as noise.
+    """
+    regressions = []
+    rows = [("summary", base["summary"], head["summary"])] + [
+        (name, base["endpoints"][name], head["endpoints"][name])
+        for name in sorted(set(base["endpoints"]) & set(head["endpoints"]))
+        if min(base["endpoints"][name]["requests"], head["endpoints"][name]["requests"]) >= min_requests
+    ]
+    for name, before, after in rows:
+        for metric in ("p50", "p95", "p99"):
+            old, new = before["latencyMs"][metric], after["latencyMs"][metric]
+            if new - old > min_ms and old and (new - old) / old > threshold:
+                regressions.append({"endpoint": name, "metric": metric, "base": old, "head": new,
+                                    "change": round((new - old) / old, 4)})
+        old, new = before["throughput"], after["throughput"]
+        if name == "summary" and old and (old - new) / old > threshold:
+            regressions.append({"endpoint": name, "metric": "throughput", "base": old, "head": new,
+                                "change": round((new - old) / old, 4)})
+        old_rate = before["errors"] / max(before["requests"], 1)
+        new_rate = after["errors"] / max(after["requests"], 1)
+        if new_rate > old_rate + 0.001:
+            regressions.append({"endpoint": name, "metric": "errorRate", "base": round(old_rate, 4),
+                                "head": round(new_rate, 4), "change": round(new_rate - old_rate, 4)})
+    return regressions
+
+
+def comparison_table(base: Dict[str, Any], head: Dict[str, Any]) -> List[str]:
+    """Per-endpoint p50/p99 latency and throughput of two runs side by side, e.g. two storage backends"""
+    def value(summary: Optional[Dict[str, Any]], path: Tuple[str, ...]) -> str:
+        if summary is None:
+            return "-"
+        for key in path:
+            summary = summary[key]
+        return f"{summary:g}"
+
+    names = ["summary"] + sorted(set(base["endpoints"]) | set(head["endpoints"]))
+    width = max(len(name) for name in names)
+    labels = [report["meta"].get("storage") for report in (base, head)]
+    if None in labels or labels[0] == labels[1]:
+        labels = ["base", "head"]
+    headings = [f"{heading} {label}" for heading, _ in TABLE_COLUMNS for label in labels]
+    lines = ["  ".join([f"{'endpoint':<{width}}"] + [f"{heading:>14}" for heading in headings])]
+    for name in names:
+        before = base["summary"] if name == "summary" else base["endpoints"].get(name)
+        after = head["summary"] if name == "summary" else head["endpoints"].get(name)
+        cells = [value(summary, path) for _, path in TABLE_COLUMNS for summary in (before, after)]
+        lines.append("  ".join([f"{name:<{width}}"] + [f"{cell:>14}" for cell in cells]))
+    return lines
+
+
+# ==================== CLI ====================
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Seed, load-test and compare the Visnex API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="replace the database contents with synthetic data")
+    seed.add_argument("--scale", type=int, default=1000, help="investors and startups to generate (e.g. 1000, 100000, 1000000)")
+    seed.add_argument("--seed", type=int, default=42)
+
+    run = commands.add_parser("run", help="drive the API and report throughput and latency percentiles")
+    run.add_argument("--url", help="benchmark a running server instead of the app in this process")
+    run.add_argument("--mongomock", action="store_true", help="in-process only: use an in-memory mongomock database")
+    run.add_argument("--storage", choices=["mongodb", "embedded"], help="in-process only: storage backend (default STORAGE_BACKEND)")
+    run.add_argument("--seed-scale", type=int, help="in-process only: seed this many documents first")
+    run.add_argument("--mix", choices=sorted(MIXES), default="read")
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--duration", type=float, default=30, help="measured seconds")
+    run.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    run.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    payload = commands.add_parser("payload", help="report response sizes, compressed and not, and JSON rendering time")
+    payload.add_argument("--mongomock", action="store_true", help="use an in-memory mongomock database")
+    payload.add_argument("--storage", choices=["mongodb", "embedded"], help="storage backend (default STORAGE_BACKEND)")
+    payload.add_argument("--seed-scale", type=int, help="seed this many documents first")
+    payload.add_argument("--repeat", type=int, default=50, help="renders timed per response")
+    payload.add_argument("--seed", type=int, default=42)
+    payload.add_argument("--output", help="write the JSON report here instead of printing a table")
+
+    comparison = commands.add_parser("compare", help="flag regressions between two run reports")
+    comparison.add_argument("base")
+    comparison.add_argument("head")
+    comparison.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    comparison.add_argument("--min-ms", type=float, default=1.0, help="ignore latency changes below this")
+    comparison.add_argument("--min-requests", type=int, default=20, help="skip endpoints with fewer samples")
+    comparison.add_argument("--table", action="store_true", help="print both runs side by side instead of checking for regressions")
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = _parser().parse_args(argv)
+
+    if args.command == "seed":
+        import db
+        asyncio.run(seed_database(args.scale, args.seed))
+        db.close_database()
+        return 0
+
+    if args.command == "run":
+        result = asyncio.run(_run(args))
+        report = json.dumps(result, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(report + "\n")
+            summary = result["summary"]
+            print(
+                f"{summary['requests']} requests, {summary['throughput']} req/s, "
+                f"p50 {summary['latencyMs']['p50']}ms, p99 {summary['latencyMs']['p99']}ms -> {args.output}"
+            )
+        else:
+            print(report)
+        return 0
+
+    if args.command == "payload":
+        result = asyncio.run(_payload(args))
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(json.dumps(result, indent=2) + "\n")
+        print("\n".join(payload_table(result)))
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    for setting in COMPARABLE_SETTINGS:
+        if base["meta"].get(setting) != head["meta"].get(setting):
+            print(f"WARNING runs differ in {setting}: {base['meta'].get(setting)} vs {head['meta'].get(setting)}")
+    if args.table:
+        print("\n".join(comparison_table(base, head)))
+        return 0
+    regressions = compare(base, head, args.threshold, args.min_ms, args.min_requests)
+    for item in regressions:
+        print(f"REGRESSION {item['endpoint']} {item['metric']}: {item['base']} -> {item['head']} ({item['change']:+.1%})")
+    print(f"Compared {len(base['endpoints'])} endpoints, {len(regressions)} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    # python benchmark.py seed --scale 100000
+    # python benchmark.py run --url http://localhost:8000 --concurrency 32 --output head.json
+    # python benchmark.py run --mongomock --seed-scale 1000 --duration 10
+    # python benchmark.py run --storage embedded --seed-scale 1000 --output embedded.json
+    # python benchmark.py compare base.json head.json
+    # python benchmark.py compare --table mongodb.json embedded.json
+    # python benchmark.py payload --storage embedded --seed-scale 1000
+    # Before/after a change: serve each build against the same seeded database, then
+    # python benchmark.py run --url http://localhost:8001 --output before.json
+    # python benchmark.py run --url http://localhost:8002 --output after.json
+    # python benchmark.py compare --table before.json after.json
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,295 @@
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from functools import wraps
+import asyncio
+import json
+import os
+import secrets
+import time
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Optional dependency, only needed for CACHE_BACKEND=redis
+    redis_asyncio = None
+
+
+# Cache Configuration
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", 300))
+# Seconds a coalesced result is reused after its flight lands (0 = share in-flight calls only)
+MICRO_CACHE_TTL = float(os.getenv("MICRO_CACHE_TTL", 1))
+# Worker processes serving the app (gunicorn and uvicorn read the same variable;
+# server.py sets it for its workers). Memory-backend versions are per process,
+# so they only track every write when there is a single worker.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+
+# ==================== BACKENDS ====================
+
+class MemoryBackend:
+    """In-process LRU with per-key expiry. Versions are never evicted."""
+
+    name = "memory"
+    # Other processes neither see nor bump these versions
+    shared = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._max_entries = max_entries
+        # Versions restart at zero with the process, so they are only comparable within one epoch
+        self._epoch = secrets.token_hex(8)
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_versions(self, names: List[str]) -> List[int]:
+        return [self._versions.get(name, 0) for name in names]
+
+    async def bump_version(self, name: str) -> int:
+        self._versions[name] = self._versions.get(name, 0) + 1
+        return self._versions[name]
+
+    async def get_epoch(self) -> str:
+        return self._epoch
+
+    async def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    async def close(self):
+        self._entries.clear()
+
+
+class RedisBackend:
+    """Redis (or any protocol-compatible server) shared by every worker. Values are JSON."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = CACHE_URL, prefix: str = "visnex:"):
+        if redis_asyncio is None:
+            raise ValueError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._redis = redis_asyncio.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        raw = await self._redis.get(self._prefix + key)
+        return (False, None) if raw is None else (True, json.loads(raw))
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._redis.set(self._prefix + key, json.dumps(value), px=max(int(ttl * 1000), 1))
+
+    async def get_versions(self, names: List[str]) -> List[int]:
+        values = await self._redis.mget([f"{self._prefix}version:{name}" for name in names])
+        return [int(value or 0) for value in values]
+
+    async def bump_version(self, name: str) -> int:
+        return await self._redis.incr(f"{self._prefix}version:{name}")
+
+    async def get_epoch(self) -> str:
+        # Shared by every worker; a server that lost its versions also lost this key
+        key = f"{self._prefix}epoch"
+        epoch = await self._redis.get(key)
+        if epoch is None:
+            await self._redis.set(key, secrets.token_hex(8), nx=True)
+            epoch = await self._redis.get(key)
+        return epoch.decode() if isinstance(epoch, bytes) else epoch
+
+    async def size(self) -> Optional[int]:
+        # Keys are shared with other workers and expire server-side
+        return None
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+# ==================== CACHE ====================
+
+class Cache:
+    """Read-through cache whose keys embed the version of every collection they depend on.
+
+    Writes bump a collection's version, which orphans every entry derived from
+    it at once; orphaned entries simply age out through TTL or LRU eviction.
+
+    Concurrent loads of the same versioned key are single-flight: the first
+    caller runs the loader and the others await its result.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+        self._flights: Dict[str, "asyncio.Future"] = {}
+
+    async def versions(self, names: List[str]) -> List[int]:
+        return await self.backend.get_versions(names)
+
+    async def epoch(self) -> str:
+        """Identifies the lifetime of the version counters (see MemoryBackend)"""
+        return await self.backend.get_epoch()
+
+    def versions_shared(self) -> bool:
+        """Whether versions move with every worker's writes, not just this process's.
+
+        Derived state that is kept fresh by versions (ETags, the snapshot, the
+        matching engine) can only trust them when this holds.
+        """
+        return self.backend.shared or WEB_CONCURRENCY <= 1
+
+    async def invalidate(self, name: str) -> int:
+        """Bump the version of a collection; returns the new version"""
+        return await self.backend.bump_version(name)
+
+    async def versioned_key(self, name: str, depends_on: List[str], key: str) -> str:
+        versions = await self.versions(depends_on)
+        return f"{name}:{key}:" + ":".join(f"{n}={v}" for n, v in zip(depends_on, versions))
+
+    async def single_flight(self, name: str, key: str, loader: Callable) -> Any:
+        """Run `loader` once for all concurrent callers with the same key.
+
+        The flight runs as its own task, so a caller that goes away (a client
+        disconnect cancels its request) does not cancel it for the others.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(loader())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.coalesced[name] = self.coalesced.get(name, 0) + 1
+        return await asyncio.shield(flight)
+
+    def _land(self, key: str, flight: "asyncio.Future"):
+        self._flights.pop(key, None)
+        if not flight.cancelled():
+            # Mark the exception retrieved even if every waiter has gone
+            flight.exception()
+
+    async def get_or_load(
+        self,
+        name: str,
+        depends_on: List[str],
+        key: str,
+        loader: Callable,
+        ttl: float = CACHE_DEFAULT_TTL
+    ) -> Any:
+        if not self.versions_shared():
+            # Writes on other workers don't move our versions; only expiry bounds staleness
+            ttl = min(ttl, MICRO_CACHE_TTL)
+        versioned_key = await self.versioned_key(name, depends_on, key)
+        found, value = await self.backend.get(versioned_key)
+        if found:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return value
+
+        async def load_and_store():
+            self.misses[name] = self.misses.get(name, 0) + 1
+            loaded = await loader()
+            await self.backend.set(versioned_key, loaded, ttl)
+            return loaded
+        return await self.single_flight(name, versioned_key, load_and_store)
+
+    async def metrics(self) -> Dict[str, Any]:
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        names = sorted(set(self.hits) | set(self.misses) | set(self.coalesced))
+        return {
+            "backend": self.backend.name,
+            "versionsShared": self.versions_shared(),
+            "entries": await self.backend.size(),
+            "hits": hits,
+            "misses": misses,
+            "hitRate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "coalesced": sum(self.coalesced.values()),
+            "inFlight": len(self._flights),
+            "byName": {
+                name: {
+                    "hits": self.hits.get(name, 0),
+                    "misses": self.misses.get(name, 0),
+                    "coalesced": self.coalesced.get(name, 0)
+                }
+                for name in names
+            }
+        }
+
+
+# Global cache instance
+_cache: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """Get the cache configured by CACHE_BACKEND"""
+    global _cache
+    if _cache is None:
+        if CACHE_BACKEND == "redis":
+            _cache = Cache(RedisBackend())
+        elif CACHE_BACKEND == "memory":
+            _cache = Cache(MemoryBackend())
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+        print(f"Cache backend: {_cache.backend.name}")
+    return _cache
+
+
+async def close_cache():
+    """Release the cache backend"""
+    global _cache
+    if _cache:
+        await _cache.backend.close()
+        _cache = None
+
+
+def _call_key(args: tuple, kwargs: Dict[str, Any]) -> str:
+    return json.dumps([args, sorted(kwargs.items())], default=str)
+
+
+def cached(*depends_on: str, ttl: float = CACHE_DEFAULT_TTL):
+    """Cache an async function's result until TTL expiry or a write to any of `depends_on`.
+
+    Results are shared between callers and must not be mutated.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await get_cache().get_or_load(
+                func.__name__, list(depends_on), _call_key(args, kwargs), lambda: func(*args, **kwargs), ttl
+            )
+        return wrapper
+    return decorator
+
+
+def coalesced(*depends_on: str, ttl: float = MICRO_CACHE_TTL):
+    """Share one call among concurrent identical calls, then reuse its result for `ttl` seconds.
+
+    For hot reads too varied to cache for long (listing pages, dashboards):
+    a burst of identical requests costs one query. Like `cached`, a write to
+    any of `depends_on` starts a new flight, and results must not be mutated.
+    """
+    def decorator(func):
+        if ttl > 0:
+            return cached(*depends_on, ttl=ttl)(func)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            shared_cache = get_cache()
+            key = await shared_cache.versioned_key(func.__name__, list(depends_on), _call_key(args, kwargs))
+            return await shared_cache.single_flight(func.__name__, key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -1,55 +1,712 @@
-from pymongo import MongoClient
-from typing import Optional, List, Dict, Any
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Callable
 import os
 from dotenv import load_dotenv
 import math
+import base64
+import binascii
+import json
+import asyncio
+import threading
+import time
+from pymongo import ReturnDocument, ReadPreference, monitoring
+from pymongo.errors import BulkWriteError
+import cache
+import embedded
+import geo
+import metrics
+import money
+import stats
+import text_search
 
 load_dotenv()
 
-# MongoDB Configuration
+# Storage Configuration
+# "mongodb", or "embedded" for the in-process store in embedded.py (no server:
+# tests, CI load runs and small single-process deployments)
+STORAGE_BACKENDS = ("mongodb", "embedded")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongodb")
+if STORAGE_BACKEND not in STORAGE_BACKENDS:
+    raise ValueError(f"STORAGE_BACKEND must be one of: {', '.join(STORAGE_BACKENDS)}")
+
+# MongoDB Configuration (required by the mongodb backend when it first connects)
 MONGODB_URL = os.getenv("MONGODB_URL")
-if not MONGODB_URL:
-    raise ValueError("MONGODB_URL environment variable is required. Please set it in .env file.")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "Visnex_global")
 
-# Global database connection
-_client: Optional[MongoClient] = None
-_db = None
+# Connection pool configuration (timeouts in milliseconds)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 10))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+# Unset by default: index builds and exports may legitimately keep a socket busy
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 0)) or None
+
+# Read preference for read-only queries (listings, lookups, exports). Anything
+# but "primary" lets them run on replica secondaries, which may trail writes.
+_READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+if MONGO_READ_PREFERENCE not in _READ_PREFERENCES:
+    raise ValueError(f"MONGO_READ_PREFERENCE must be one of: {', '.join(_READ_PREFERENCES)}")
+
+
+class _PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters per server, fed by pymongo's CMAP events.
+
+    Events arrive on driver threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers: Dict[str, Dict[str, int]] = {}
+
+    def _add(self, address, counter: str, amount: int = 1):
+        with self._lock:
+            server = self._servers.setdefault(f"{address[0]}:{address[1]}", {
+                "open": 0, "checkedOut": 0, "checkOutFailures": 0, "cleared": 0
+            })
+            server[counter] += amount
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {address: dict(counters) for address, counters in self._servers.items()}
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add(event.address, "cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add(event.address, "open")
+
+    def connection_ready(self, event):
+        pass
 
+    def connection_closed(self, event):
+        self._add(event.address, "open", -1)
 
-def get_database():
-    """Get database connection"""
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add(event.address, "checkOutFailures")
+
+    def connection_checked_out(self, event):
+        self._add(event.address, "checkedOut")
+
+    def connection_checked_in(self, event):
+        self._add(event.address, "checkedOut", -1)
+
+
+# Global database connection: Motor objects, or their embedded.py stand-ins
+_client: Optional[AsyncIOMotorClient] = None
+_db: Optional[AsyncIOMotorDatabase] = None
+_read_db: Optional[AsyncIOMotorDatabase] = None
+_pool_stats = _PoolStats()
+
+# Derived fields stored for indexing only, and the projection that hides them from clients
+_INTERNAL_FIELDS = [text_search.GRAMS_FIELD, *money.ALL_SHADOW_FIELDS, *geo.GEO_FIELDS]
+_PROJECTION = {"_id": 0, **{field: 0 for field in _INTERNAL_FIELDS}}
+
+# Callbacks told about every write as (collection name, [(before, after), ...])
+_write_listeners: List[Callable] = []
+
+# Optional in-process engine that list queries try before MongoDB (see snapshot.py)
+_list_engine = None
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """Get database connection (Motor clients connect lazily, so this never blocks).
+
+    Every data function goes through this handle (or get_read_database()), so
+    the storage backend is whatever it returns: a Motor database, or an
+    embedded.Database implementing the same subset of its API.
+    """
     global _client, _db
+    if _db is None and STORAGE_BACKEND == "embedded":
+        _client = embedded.Client()
+        _db = _client[DATABASE_NAME]
+        print(f"Using embedded storage: {DATABASE_NAME}")
     if _db is None:
-        _client = MongoClient(MONGODB_URL)
+        if not MONGODB_URL:
+            raise ValueError("MONGODB_URL environment variable is required. Please set it in .env file.")
+        _client = AsyncIOMotorClient(
+            MONGODB_URL,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            event_listeners=[_pool_stats, metrics.command_metrics]
+        )
         _db = _client[DATABASE_NAME]
         print(f"Connected to MongoDB: {DATABASE_NAME}")
     return _db
 
 
+def get_read_database() -> AsyncIOMotorDatabase:
+    """Database handle for read-only queries, honouring MONGO_READ_PREFERENCE"""
+    global _read_db
+    if _read_db is None:
+        _read_db = get_database().with_options(read_preference=_READ_PREFERENCES[MONGO_READ_PREFERENCE])
+    return _read_db
+
+
+async def warm_up() -> bool:
+    """Open MONGO_MIN_POOL_SIZE connections up front so the first requests don't pay for them.
+
+    Concurrent pings each check out their own connection. Returns False (and
+    leaves the pool lazy) when MongoDB is unreachable.
+    """
+    databases = [get_database()]
+    if STORAGE_BACKEND == "embedded":
+        # No connections to open
+        return True
+    if MONGO_READ_PREFERENCE != "primary":
+        databases.append(get_read_database())
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            database.command("ping")
+            for database in databases
+            for _ in range(max(MONGO_MIN_POOL_SIZE, 1))
+        ))
+    except Exception as e:
+        print(f"MongoDB warmup failed: {e}")
+        return False
+    print(f"MongoDB pool warmed up in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return True
+
+
+async def ping() -> float:
+    """Round trip to the primary in milliseconds; raises when it is unreachable"""
+    started = time.perf_counter()
+    await get_database().command("ping")
+    return (time.perf_counter() - started) * 1000
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Pool configuration and live per-server connection counters"""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "readPreference": MONGO_READ_PREFERENCE,
+        "servers": _pool_stats.snapshot()
+    }
+
+
+def add_write_listener(listener: Callable):
+    """Register a callback for in-process state derived from the collections"""
+    _write_listeners.append(listener)
+
+
+def set_list_engine(engine):
+    """Let an in-process engine answer the list queries it supports"""
+    global _list_engine
+    _list_engine = engine
+
+
+async def _list_collection(collection_name: str, filter_query: Dict[str, Any]):
+    """Where a list query runs: the in-process engine when it can answer it, the read database otherwise"""
+    if _list_engine is not None:
+        collection = await _list_engine.collection(collection_name, filter_query)
+        if collection is not None:
+            metrics.LIST_QUERIES.labels(collection_name, "snapshot").inc()
+            return collection
+    metrics.LIST_QUERIES.labels(collection_name, STORAGE_BACKEND).inc()
+    return get_read_database()[collection_name]
+
+
 def close_database():
     """Close database connection"""
-    global _client
+    global _client, _db, _read_db
     if _client:
         _client.close()
-        print("MongoDB connection closed")
+        _client = None
+        _db = None
+        _read_db = None
+        print("Database connection closed")
+
+
+def _forget_client_after_fork():
+    """A forked child must not use its parent's client (its sockets and monitor
+    threads belong to the parent); drop it so get_database() opens a fresh one.
+    """
+    global _client, _db, _read_db, _pool_stats
+    _client = None
+    _db = None
+    _read_db = None
+    _pool_stats = _PoolStats()
+
+
+os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+
+def _projection(fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Projection for a sparse fieldset (all public fields when None); `id` is always included"""
+    if not fields:
+        return _PROJECTION
+    return {"_id": 0, "id": 1, **{field: 1 for field in fields if field not in _INTERNAL_FIELDS}}
+
+
+# ==================== PAGINATION HELPERS ====================
+
+# Passing this as `cursor` starts a keyset-paginated listing from the first document
+FIRST_CURSOR = "*"
+
+
+def _encode_cursor(sort_field: str, direction: int, last_doc: Dict[str, Any]) -> str:
+    """Build an opaque cursor from the sort key and id of the last returned document"""
+    payload = {"s": sort_field, "d": direction, "v": last_doc.get(sort_field), "id": last_doc["id"]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_sort_value(value: Any) -> bool:
+    """Whether a cursor's sort value is a plain value (never an operator document) _keyset_filter can compare"""
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return value is None or isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool))
+
+
+def _decode_cursor(cursor: str, sort_field: str, direction: int) -> Dict[str, Any]:
+    """Decode a cursor, rejecting tampered ones and ones issued for a different sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        valid = (
+            isinstance(payload, dict)
+            and type(payload.get("id")) is int
+            and "v" in payload
+            and _is_sort_value(payload["v"])
+        )
+    except (ValueError, binascii.Error):
+        valid = False
+    if not valid:
+        raise ValueError("Invalid cursor")
+    if payload.get("s") != sort_field or payload.get("d") != direction:
+        raise ValueError("Cursor does not match the requested sort order")
+    return payload
+
+
+def _keyset_filter(sort_field: str, direction: int, last_value: Any, last_id: int) -> Dict[str, Any]:
+    """Range query selecting every document that sorts after (last_value, last_id).
+
+    Ties on the sort key are broken by `id` in the same direction, so a compound
+    {sort_field, id} index serves the whole query. Documents missing the sort key
+    sort as null: first when ascending, last when descending.
+    """
+    op = "$lt" if direction == -1 else "$gt"
+    if sort_field == "id":
+        return {"id": {op: last_id}}
+
+    if last_value is None:
+        remaining = [{sort_field: None, "id": {op: last_id}}]
+        if direction == 1:
+            remaining.append({sort_field: {"$ne": None}})
+    else:
+        remaining = [
+            {sort_field: {op: last_value}},
+            {sort_field: last_value, "id": {op: last_id}},
+        ]
+        if direction == -1:
+            remaining.append({sort_field: None})
+    return {"$or": remaining}
+
+
+async def _cursor_page(
+    collection,
+    filter_query: Dict[str, Any],
+    sort_field: str,
+    direction: int,
+    limit: int,
+    cursor: str,
+    include_total: bool,
+    projection: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Fetch one keyset page; resuming never skips over earlier documents"""
+    query = filter_query
+    if cursor != FIRST_CURSOR:
+        last = _decode_cursor(cursor, sort_field, direction)
+        # Kept at the top level next to any $text clause, which may not be nested
+        query = dict(filter_query)
+        query["$and"] = filter_query.get("$and", []) + [_keyset_filter(sort_field, direction, last["v"], last["id"])]
+
+    sort_query = [(sort_field, direction)]
+    if sort_field != "id":
+        sort_query.append(("id", direction))
+
+    # The sort key may be hidden or left out of a sparse fieldset; the cursor needs it
+    projection = projection or _PROJECTION
+    inclusive = 1 in projection.values()
+    if inclusive:
+        sort_key_hidden = projection.get(sort_field) != 1
+    else:
+        sort_key_hidden = projection.get(sort_field) == 0
+    if sort_key_hidden:
+        projection = {field: value for field, value in projection.items() if field != sort_field}
+        if inclusive:
+            projection[sort_field] = 1
+
+    # Fetch one extra document to learn whether another page exists
+    docs = await collection.find(query, projection).sort(sort_query).limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = _encode_cursor(sort_field, direction, docs[-1]) if has_more else None
+    if sort_key_hidden:
+        for doc in docs:
+            doc.pop(sort_field, None)
+
+    result = {
+        "data": docs,
+        "limit": limit,
+        "nextCursor": next_cursor
+    }
+    if include_total:
+        # The collection metadata count is O(1); a filtered count has to be exact
+        if filter_query:
+            result["total"] = await collection.count_documents(filter_query)
+        else:
+            result["total"] = await collection.estimated_document_count()
+    return result
+
+
+# ==================== FACET HELPERS ====================
+
+# Fields the list endpoints can count values of: facet name -> (document field, whether it is an array).
+# A list filter on the same field lives under the same key in the filter query,
+# or under one of _FACET_FILTER_KEYS.
+FACET_FIELDS = {
+    "startups": {
+        "industry": ("industry", False),
+        "fundingStage": ("fundingStage", False),
+        "location": (geo.LABEL_FIELD, False),
+        "categories": ("categories", True),
+        "tags": ("tags", True),
+    },
+    "investors": {
+        "focusIndustries": ("focusIndustries", True),
+        "investmentStages": ("investmentStages", True),
+        "location": (geo.LABEL_FIELD, False),
+        "dealSize": ("dealSize", False),
+        "status": ("status", False),
+    },
+}
+
+
+# Filter query keys that select on a faceted field besides the field itself
+_FACET_FILTER_KEYS = {geo.LABEL_FIELD: ["location", geo.KEYS_FIELD]}
+
+
+def check_facets(collection_name: str, facets: Optional[List[str]]) -> Optional[List[str]]:
+    """Validate requested facet names, dropping duplicates"""
+    if not facets:
+        return None
+    unknown = [name for name in facets if name not in FACET_FIELDS[collection_name]]
+    if unknown:
+        raise ValueError(f"Unknown facets: {', '.join(unknown)}; available: {', '.join(FACET_FIELDS[collection_name])}")
+    return list(dict.fromkeys(facets))
+
+
+def facet_filters(
+    collection_name: str,
+    filter_query: Dict[str, Any],
+    facets: List[str]
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Split a filter into the part every facet shares and, per facet, the
+    filters on other faceted fields. A facet never filters on its own field,
+    so its counts show what selecting another value would return.
+    """
+    fields = {name: FACET_FIELDS[collection_name][name][0] for name in facets}
+    # Filter keys selecting on each facet's own field
+    selects = {name: {field, *_FACET_FILTER_KEYS.get(field, [])} for name, field in fields.items()}
+    faceted = set().union(*selects.values())
+    shared = {key: value for key, value in filter_query.items() if key not in faceted}
+    own = {}
+    for name in facets:
+        own[name] = {key: value for key, value in filter_query.items() if key in faceted and key not in selects[name]}
+    return shared, own
+
+
+def _facet_pipeline(collection_name: str, filter_query: Dict[str, Any], facets: List[str]) -> List[Dict[str, Any]]:
+    """One aggregation counting every facet: a shared $match (which can use
+    indexes and holds any $text clause), then one $facet branch per facet
+    """
+    shared, own = facet_filters(collection_name, filter_query, facets)
+    branches = {}
+    for name in facets:
+        field, is_array = FACET_FIELDS[collection_name][name]
+        stages = [{"$match": own[name]}] if own[name] else []
+        if is_array:
+            stages.append({"$unwind": f"${field}"})
+        stages.append({"$group": {"_id": f"${field}", "count": {"$sum": 1}}})
+        stages.append({"$sort": {"count": -1, "_id": 1}})
+        branches[name] = stages
+    return [{"$match": shared}, {"$facet": branches}]
+
+
+async def _add_facets(
+    result: Dict[str, Any],
+    collection,
+    collection_name: str,
+    filter_query: Dict[str, Any],
+    facets: Optional[List[str]]
+) -> Dict[str, Any]:
+    """Attach {facet: [{name, count}, ...]} to a list result, most common values first"""
+    if not facets:
+        return result
+    if hasattr(type(collection), "facet_counts"):
+        # The in-process engine counts from its own indexes (checked on the class:
+        # Motor collections answer any attribute with a sub-collection)
+        result["facets"] = collection.facet_counts(filter_query, facets)
+        return result
+    pipeline = _facet_pipeline(collection_name, filter_query, facets)
+    counts = (await collection.aggregate(pipeline).to_list(length=1))[0]
+    result["facets"] = {
+        name: [{"name": item["_id"], "count": item["count"]} for item in counts[name] if item["_id"]]
+        for name in facets
+    }
+    return result
+
+
+# ==================== ID ALLOCATION ====================
+
+# One {_id: <collection>, seq: <last id handed out>} document per collection
+COUNTERS_COLLECTION = "counters"
+
+
+async def ensure_id_counters():
+    """Make sure every counter is at least the highest id already stored.
+
+    $max makes this idempotent and safe to run from several workers at once.
+    """
+    db = get_database()
+    for collection_name in ("investors", "startups"):
+        last = await db[collection_name].find_one({}, {"id": 1}, sort=[("id", -1)])
+        await db[COUNTERS_COLLECTION].update_one(
+            {"_id": collection_name},
+            {"$max": {"seq": last["id"] if last else 0}},
+            upsert=True
+        )
+
+
+async def _allocate_ids(collection_name: str, count: int = 1) -> int:
+    """Atomically reserve `count` consecutive ids and return the first one"""
+    counter = await get_database()[COUNTERS_COLLECTION].find_one_and_update(
+        {"_id": collection_name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"] - count + 1
+
+
+# ==================== WRITE HELPERS ====================
+
+class VersionConflict(Exception):
+    """Raised when an update's expected version no longer matches the stored document"""
+
+
+def to_dotted_set(data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested objects into dotted $set paths so a patch only touches the leaves it names.
+
+    {"investmentRange": {"min": "$1M"}} -> {"investmentRange.min": "$1M"}
+
+    An empty object names no leaves, so it sets nothing (rather than
+    replacing the stored sub-document with {}).
+    """
+    dotted = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            dotted.update(to_dotted_set(value, f"{path}."))
+        else:
+            dotted[path] = value
+    return dotted
+
+
+def _apply_set(document: Dict[str, Any], update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a $set (dotted paths included) to a copy of a document, as the server does"""
+    result = dict(document)
+    for path, value in update_data.items():
+        *parents, leaf = path.split(".")
+        target = result
+        for part in parents:
+            child = target.get(part)
+            target[part] = dict(child) if isinstance(child, dict) else {}
+            target = target[part]
+        target[leaf] = value
+    return result
+
+
+def _add_derived_fields(collection_name: str, document: Dict[str, Any]):
+    """Store the search grams, numeric shadow fields and location fields of a new document"""
+    document[text_search.GRAMS_FIELD] = text_search.build_search_grams(collection_name, document)
+    document.update(money.shadow_fields_update(collection_name, document))
+    document.update(geo.location_fields_update(document))
+
+
+def _strip_internal_fields(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove _id and derived fields from a document that was just inserted"""
+    document.pop("_id", None)
+    for field in _INTERNAL_FIELDS:
+        document.pop(field, None)
+    return document
+
+
+def public_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored document as clients see it, i.e. what _PROJECTION returns"""
+    return {key: value for key, value in document.items() if key != "_id" and key not in _INTERNAL_FIELDS}
+
+
+def _derived_fields_update(collection_name: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """$set entries refreshing the derived fields an update touches"""
+    return {
+        **text_search.search_grams_update(collection_name, update_data),
+        **money.shadow_fields_update(collection_name, update_data),
+        **geo.location_fields_update(update_data)
+    }
+
+
+def _version_filter(version: int) -> Dict[str, Any]:
+    """Match a document version; documents written before versioning count as version 0"""
+    return {"version": {"$in": [0, None]}} if version == 0 else {"version": version}
+
+
+async def _update_document(
+    collection_name: str,
+    document_id: int,
+    update_data: Dict[str, Any],
+    expected_version: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """Apply a $set in one round trip and return the updated document (None if missing).
+
+    The atomic pre-image feeds the stats delta and the post-image is derived from
+    it locally, so there is no read before or after the write. When
+    `expected_version` is given the write only applies to that version.
+    """
+    collection = get_database()[collection_name]
+    
+    # Remove None values
+    update_data = {k: v for k, v in update_data.items() if v is not None}
+    
+    filter_query = {"id": document_id}
+    if expected_version is not None:
+        filter_query.update(_version_filter(expected_version))
+    
+    if update_data:
+        before = await collection.find_one_and_update(
+            filter_query,
+            {
+                "$set": {**update_data, **_derived_fields_update(collection_name, update_data)},
+                "$inc": {"version": 1}
+            },
+            projection=_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+    else:
+        before = await collection.find_one(filter_query, _PROJECTION)
+    
+    if before is None:
+        # Only a failed precondition needs a second look to tell 412 from 404
+        if expected_version is not None and await collection.count_documents({"id": document_id}, limit=1):
+            raise VersionConflict(f"{collection_name[:-1].capitalize()} {document_id} is not at version {expected_version}")
+        return None
+    if not update_data:
+        return before
+    
+    after = _apply_set(before, update_data)
+    after["version"] = (before.get("version") or 0) + 1
+    await _record_write(collection_name, before, after)
+    return after
+
+
+# ==================== LOOKUP HELPERS ====================
+
+@metrics.timed
+async def find_by_ids(
+    collection_name: str,
+    ids: List[int],
+    fields: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Fetch documents with one $in query, returned in the order of `ids` (missing ones skipped)"""
+    documents = await find_by_id_map(collection_name, ids, fields)
+    return [documents[document_id] for document_id in ids if document_id in documents]
+
+
+async def find_by_id_map(
+    collection_name: str,
+    ids: List[int],
+    fields: Optional[List[str]] = None
+) -> Dict[int, Dict[str, Any]]:
+    """Fetch documents with one $in query, keyed by id; duplicate ids are queried once"""
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        return {}
+    collection = get_read_database()[collection_name]
+    cursor = collection.find({"id": {"$in": unique_ids}}, _projection(fields))
+    documents = await cursor.to_list(length=len(unique_ids))
+    return {document["id"]: document for document in documents}
+
+
+@metrics.timed
+async def lookup(
+    requested: Dict[str, List[int]],
+    fields: Optional[List[str]] = None
+) -> Dict[str, Dict[int, Dict[str, Any]]]:
+    """Resolve ids in several collections at once: one $in query per collection, run concurrently"""
+    names = [name for name, ids in requested.items() if ids]
+    results = await asyncio.gather(*(find_by_id_map(name, requested[name], fields) for name in names))
+    return dict(zip(names, results))
 
 
 # ==================== INVESTORS OPERATIONS ====================
 
-def get_all_investors(
+@metrics.timed
+@cache.coalesced("investors")
+async def get_all_investors(
     page: int = 1,
     limit: int = 10,
     industry: Optional[str] = None,
     stage: Optional[str] = None,
     location: Optional[str] = None,
+    near: Optional[Tuple[float, float]] = None,
+    radius_km: float = 50,
     deal_size: Optional[str] = None,
     status: Optional[str] = None,
-    search: Optional[str] = None
+    check_size: Optional[float] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    fields: Optional[List[str]] = None,
+    facets: Optional[List[str]] = None
 ) -> Dict[str, Any]:
-    """Get all investors with filtering and pagination"""
-    db = get_database()
-    collection = db["investors"]
+    """Get all investors with filtering and pagination.
+
+    `check_size` (in dollars) keeps investors whose investment range covers it.
+    `location` matches a known place exactly (see geo.py); `near` (lat, lng)
+    keeps investors within `radius_km`.
+    `facets` adds value counts for those fields under the other filters (see FACET_FIELDS).
+
+    Passing `cursor` switches to keyset pagination ordered by id: start with
+    FIRST_CURSOR and follow `nextCursor`. Totals are then opt-in via `include_total`.
+    """
+    facets = check_facets("investors", facets)
     
     # Build filter query
     filter_query = {}
@@ -61,7 +718,10 @@ def get_all_investors(
         filter_query["investmentStages"] = stage
     
     if location:
-        filter_query["location"] = {"$regex": location, "$options": "i"}
+        filter_query.update(geo.location_filter(location))
+    
+    if near is not None:
+        filter_query.update(geo.near_filter(near[0], near[1], radius_km))
     
     if deal_size:
         filter_query["dealSize"] = deal_size
@@ -69,127 +729,171 @@ def get_all_investors(
     if status:
         filter_query["status"] = status
     
+    if check_size is not None:
+        filter_query["investmentRangeMin"] = {"$lte": check_size}
+        filter_query["investmentRangeMax"] = {"$gte": check_size}
+    
     if search:
-        filter_query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"investmentThesis": {"$regex": search, "$options": "i"}},
-        ]
+        filter_query.update(text_search.text_query(search))
+    
+    collection = await _list_collection("investors", filter_query)
+    
+    if cursor is not None:
+        result = await _cursor_page(
+            collection, filter_query, "id", 1, limit, cursor, bool(include_total), _projection(fields)
+        )
+        return await _add_facets(result, collection, "investors", filter_query, facets)
     
     # Get total count
-    total = collection.count_documents(filter_query)
+    total = total_pages = None
+    if include_total is not False:
+        total = await collection.count_documents(filter_query)
+        total_pages = math.ceil(total / limit) if total > 0 else 0
     
     # Calculate pagination
     skip = (page - 1) * limit
-    total_pages = math.ceil(total / limit) if total > 0 else 0
     
-    # Get paginated results
-    investors = list(collection.find(filter_query, {"_id": 0}).skip(skip).limit(limit))
+    # Get paginated results, most relevant first when searching
+    investors_cursor = collection.find(filter_query, _projection(fields))
+    if search:
+        investors_cursor = investors_cursor.sort(text_search.RELEVANCE_SORT)
+    investors = await investors_cursor.skip(skip).limit(limit).to_list(length=limit)
     
-    return {
+    result = {
         "data": investors,
         "total": total,
         "page": page,
         "limit": limit,
         "totalPages": total_pages
     }
+    return await _add_facets(result, collection, "investors", filter_query, facets)
 
 
-def get_investor_by_id(investor_id: int) -> Optional[Dict[str, Any]]:
-    """Get a specific investor by ID"""
+@metrics.timed
+async def get_investor_by_id(investor_id: int, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Get a specific investor by ID (a sparse fieldset also carries `version`, for the ETag)"""
     db = get_database()
     collection = db["investors"]
-    investor = collection.find_one({"id": investor_id}, {"_id": 0})
+    investor = await collection.find_one({"id": investor_id}, _projection(fields and [*fields, "version"]))
     return investor
 
 
-def create_investor(investor_data: Dict[str, Any]) -> Dict[str, Any]:
+@metrics.timed
+async def create_investor(investor_data: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new investor"""
     db = get_database()
     collection = db["investors"]
     
-    # Get the highest ID and increment
-    last_investor = collection.find_one(sort=[("id", -1)])
-    new_id = (last_investor["id"] + 1) if last_investor else 1
+    investor_data["id"] = await _allocate_ids("investors")
+    investor_data["version"] = 1
+    _add_derived_fields("investors", investor_data)
+    await collection.insert_one(investor_data)
     
-    investor_data["id"] = new_id
-    collection.insert_one(investor_data)
-    
-    # Return without _id
-    investor_data.pop("_id", None)
+    # Return without _id and internal fields
+    _strip_internal_fields(investor_data)
+    await _record_write("investors", None, investor_data)
     return investor_data
 
 
-def update_investor(investor_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Update an existing investor"""
-    db = get_database()
-    collection = db["investors"]
-    
-    # Remove None values
-    update_data = {k: v for k, v in update_data.items() if v is not None}
-    
-    if update_data:
-        collection.update_one({"id": investor_id}, {"$set": update_data})
-    
-    return collection.find_one({"id": investor_id}, {"_id": 0})
+@metrics.timed
+async def update_investor(
+    investor_id: int,
+    update_data: Dict[str, Any],
+    expected_version: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """Update an existing investor; keys may be dotted paths for partial sub-document updates"""
+    return await _update_document("investors", investor_id, update_data, expected_version)
 
 
-def delete_investor(investor_id: int) -> bool:
+@metrics.timed
+async def delete_investor(investor_id: int) -> bool:
     """Delete an investor"""
     db = get_database()
     collection = db["investors"]
-    result = collection.delete_one({"id": investor_id})
-    return result.deleted_count > 0
+    deleted = await collection.find_one_and_delete({"id": investor_id}, projection=_PROJECTION)
+    if deleted is None:
+        return False
+    await _record_write("investors", deleted, None)
+    return True
 
 
-def get_incubators() -> List[Dict[str, Any]]:
+@metrics.timed
+@cache.coalesced("investors")
+async def get_incubators() -> List[Dict[str, Any]]:
     """Get all incubators/accelerators"""
     db = get_database()
     collection = db["investors"]
-    incubators = list(collection.find({"duration": {"$exists": True}}, {"_id": 0}))
+    incubators = await collection.find({"duration": {"$exists": True}}, _PROJECTION).to_list(length=None)
     return incubators
 
 
-def get_investor_industries() -> List[str]:
+@metrics.timed
+@cache.cached("investors")
+async def get_investor_industries() -> List[str]:
     """Get list of all unique industries"""
     db = get_database()
     collection = db["investors"]
-    industries = collection.distinct("focusIndustries")
+    industries = await collection.distinct("focusIndustries")
     return sorted(industries)
 
 
-def get_investor_stages() -> List[str]:
+@metrics.timed
+@cache.cached("investors")
+async def get_investor_stages() -> List[str]:
     """Get list of all unique investment stages"""
     db = get_database()
     collection = db["investors"]
-    stages = collection.distinct("investmentStages")
+    stages = await collection.distinct("investmentStages")
     return sorted(stages)
 
 
-def get_investor_locations() -> List[str]:
-    """Get list of all unique locations"""
+@metrics.timed
+@cache.cached("investors")
+async def get_investor_locations() -> List[str]:
+    """Get list of all unique locations, spelling variants merged into their canonical label"""
     db = get_database()
     collection = db["investors"]
-    locations = collection.distinct("location")
-    return sorted(locations)
+    locations = await collection.distinct("location")
+    return sorted({geo.label(location) for location in locations if isinstance(location, str) and location.strip()})
 
 
 # ==================== STARTUPS OPERATIONS ====================
 
-def get_all_startups(
+# sort_by values backed by a numeric shadow field
+_STARTUP_SORT_FIELDS = {"funding": "fundingAmount", "growth": "growthPercent"}
+
+@metrics.timed
+@cache.coalesced("startups")
+async def get_all_startups(
     page: int = 1,
     limit: int = 10,
     industry: Optional[str] = None,
     funding_stage: Optional[str] = None,
     location: Optional[str] = None,
+    near: Optional[Tuple[float, float]] = None,
+    radius_km: float = 50,
     min_team_size: Optional[int] = None,
     max_team_size: Optional[int] = None,
+    min_funding: Optional[float] = None,
+    max_funding: Optional[float] = None,
     search: Optional[str] = None,
     sort_by: Optional[str] = None,
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    fields: Optional[List[str]] = None,
+    facets: Optional[List[str]] = None
 ) -> Dict[str, Any]:
-    """Get all startups with filtering, sorting, and pagination"""
-    db = get_database()
-    collection = db["startups"]
+    """Get all startups with filtering, sorting, and pagination.
+
+    `location` matches a known place exactly (see geo.py); `near` (lat, lng)
+    keeps startups within `radius_km`.
+    `facets` adds value counts for those fields under the other filters (see FACET_FIELDS).
+
+    Passing `cursor` switches to keyset pagination on (sort_by, id): start with
+    FIRST_CURSOR and follow `nextCursor`. Totals are then opt-in via `include_total`.
+    """
+    facets = check_facets("startups", facets)
     
     # Build filter query
     filter_query = {}
@@ -201,7 +905,10 @@ def get_all_startups(
         filter_query["fundingStage"] = funding_stage
     
     if location:
-        filter_query["location"] = {"$regex": location, "$options": "i"}
+        filter_query.update(geo.location_filter(location))
+    
+    if near is not None:
+        filter_query.update(geo.near_filter(near[0], near[1], radius_km))
     
     if min_team_size is not None:
         filter_query["teamSize"] = {"$gte": min_team_size}
@@ -212,94 +919,121 @@ def get_all_startups(
         else:
             filter_query["teamSize"] = {"$lte": max_team_size}
     
+    # Funding bounds are in dollars and compare against the parsed `funding` string
+    if min_funding is not None:
+        filter_query["fundingAmount"] = {"$gte": min_funding}
+    
+    if max_funding is not None:
+        if "fundingAmount" in filter_query:
+            filter_query["fundingAmount"]["$lte"] = max_funding
+        else:
+            filter_query["fundingAmount"] = {"$lte": max_funding}
+    
     if search:
-        filter_query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"tagline": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-        ]
+        filter_query.update(text_search.text_query(search))
+    
+    collection = await _list_collection("startups", filter_query)
+    sort_field = _STARTUP_SORT_FIELDS.get(sort_by, sort_by)
+    
+    if cursor is not None:
+        sort_field = sort_field or "id"
+        sort_direction = 1 if not sort_by or sort_order == "asc" else -1
+        result = await _cursor_page(
+            collection, filter_query, sort_field, sort_direction, limit, cursor, bool(include_total), _projection(fields)
+        )
+        return await _add_facets(result, collection, "startups", filter_query, facets)
     
     # Get total count
-    total = collection.count_documents(filter_query)
+    total = total_pages = None
+    if include_total is not False:
+        total = await collection.count_documents(filter_query)
+        total_pages = math.ceil(total / limit) if total > 0 else 0
     
     # Calculate pagination
     skip = (page - 1) * limit
-    total_pages = math.ceil(total / limit) if total > 0 else 0
     
     # Build sort query
     sort_query = []
-    if sort_by:
+    if sort_field:
+        # Ties broken by id, as in cursor mode and the {sort_field, id} indexes
         sort_direction = -1 if sort_order == "desc" else 1
-        sort_query.append((sort_by, sort_direction))
+        sort_query.extend([(sort_field, sort_direction), ("id", sort_direction)])
+    elif search:
+        sort_query.extend(text_search.RELEVANCE_SORT)
     else:
         sort_query.append(("id", 1))
     
     # Get paginated results
-    startups = list(
-        collection.find(filter_query, {"_id": 0})
+    startups = await (
+        collection.find(filter_query, _projection(fields))
         .sort(sort_query)
         .skip(skip)
         .limit(limit)
+        .to_list(length=limit)
     )
     
-    return {
+    result = {
         "data": startups,
         "total": total,
         "page": page,
         "limit": limit,
         "totalPages": total_pages
     }
+    return await _add_facets(result, collection, "startups", filter_query, facets)
 
 
-def get_startup_by_id(startup_id: int) -> Optional[Dict[str, Any]]:
-    """Get a specific startup by ID"""
+@metrics.timed
+async def get_startup_by_id(startup_id: int, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Get a specific startup by ID (a sparse fieldset also carries `version`, for the ETag)"""
     db = get_database()
     collection = db["startups"]
-    startup = collection.find_one({"id": startup_id}, {"_id": 0})
+    startup = await collection.find_one({"id": startup_id}, _projection(fields and [*fields, "version"]))
     return startup
 
 
-def create_startup(startup_data: Dict[str, Any]) -> Dict[str, Any]:
+@metrics.timed
+async def create_startup(startup_data: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new startup"""
     db = get_database()
     collection = db["startups"]
     
-    # Get the highest ID and increment
-    last_startup = collection.find_one(sort=[("id", -1)])
-    new_id = (last_startup["id"] + 1) if last_startup else 1
-    
-    startup_data["id"] = new_id
+    startup_data["id"] = await _allocate_ids("startups")
     startup_data["lastActive"] = "Just now"
-    collection.insert_one(startup_data)
+    startup_data["version"] = 1
+    _add_derived_fields("startups", startup_data)
+    await collection.insert_one(startup_data)
     
-    # Return without _id
-    startup_data.pop("_id", None)
+    # Return without _id and internal fields
+    _strip_internal_fields(startup_data)
+    await _record_write("startups", None, startup_data)
     return startup_data
 
 
-def update_startup(startup_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Update an existing startup"""
-    db = get_database()
-    collection = db["startups"]
-    
-    # Remove None values
-    update_data = {k: v for k, v in update_data.items() if v is not None}
-    
-    if update_data:
-        collection.update_one({"id": startup_id}, {"$set": update_data})
-    
-    return collection.find_one({"id": startup_id}, {"_id": 0})
+@metrics.timed
+async def update_startup(
+    startup_id: int,
+    update_data: Dict[str, Any],
+    expected_version: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """Update an existing startup; keys may be dotted paths for partial sub-document updates"""
+    return await _update_document("startups", startup_id, update_data, expected_version)
 
 
-def delete_startup(startup_id: int) -> bool:
+@metrics.timed
+async def delete_startup(startup_id: int) -> bool:
     """Delete a startup"""
     db = get_database()
     collection = db["startups"]
-    result = collection.delete_one({"id": startup_id})
-    return result.deleted_count > 0
+    deleted = await collection.find_one_and_delete({"id": startup_id}, projection=_PROJECTION)
+    if deleted is None:
+        return False
+    await _record_write("startups", deleted, None)
+    return True
 
 
-def get_startup_industries() -> List[Dict[str, Any]]:
+@metrics.timed
+@cache.cached("startups")
+async def get_startup_industries() -> List[Dict[str, Any]]:
     """Get list of all unique industries with counts"""
     db = get_database()
     collection = db["startups"]
@@ -309,12 +1043,14 @@ def get_startup_industries() -> List[Dict[str, Any]]:
         {"$sort": {"count": -1}}
     ]
     
-    result = list(collection.aggregate(pipeline))
+    result = await collection.aggregate(pipeline).to_list(length=None)
     industries = [{"name": item["_id"], "count": item["count"]} for item in result if item["_id"]]
     return industries
 
 
-def get_startup_funding_stages() -> List[Dict[str, Any]]:
+@metrics.timed
+@cache.cached("startups")
+async def get_startup_funding_stages() -> List[Dict[str, Any]]:
     """Get list of all unique funding stages with counts"""
     db = get_database()
     collection = db["startups"]
@@ -324,20 +1060,24 @@ def get_startup_funding_stages() -> List[Dict[str, Any]]:
         {"$sort": {"count": -1}}
     ]
     
-    result = list(collection.aggregate(pipeline))
+    result = await collection.aggregate(pipeline).to_list(length=None)
     stages = [{"name": item["_id"], "count": item["count"]} for item in result if item["_id"]]
     return stages
 
 
-def get_startup_locations() -> List[str]:
-    """Get list of all unique locations"""
+@metrics.timed
+@cache.cached("startups")
+async def get_startup_locations() -> List[str]:
+    """Get list of all unique locations, spelling variants merged into their canonical label"""
     db = get_database()
     collection = db["startups"]
-    locations = collection.distinct("location")
-    return sorted(locations)
+    locations = await collection.distinct("location")
+    return sorted({geo.label(location) for location in locations if isinstance(location, str) and location.strip()})
 
 
-def get_startup_categories() -> List[Dict[str, Any]]:
+@metrics.timed
+@cache.cached("startups")
+async def get_startup_categories() -> List[Dict[str, Any]]:
     """Get list of all unique categories"""
     db = get_database()
     collection = db["startups"]
@@ -348,12 +1088,14 @@ def get_startup_categories() -> List[Dict[str, Any]]:
         {"$sort": {"count": -1}}
     ]
     
-    result = list(collection.aggregate(pipeline))
+    result = await collection.aggregate(pipeline).to_list(length=None)
     categories = [{"name": item["_id"], "count": item["count"]} for item in result if item["_id"]]
     return categories
 
 
-def get_startup_tags() -> List[Dict[str, Any]]:
+@metrics.timed
+@cache.cached("startups")
+async def get_startup_tags() -> List[Dict[str, Any]]:
     """Get list of all unique tags"""
     db = get_database()
     collection = db["startups"]
@@ -364,100 +1106,148 @@ def get_startup_tags() -> List[Dict[str, Any]]:
         {"$sort": {"count": -1}}
     ]
     
-    result = list(collection.aggregate(pipeline))
+    result = await collection.aggregate(pipeline).to_list(length=None)
     tags = [{"name": item["_id"], "count": item["count"]} for item in result if item["_id"]]
     return tags
 
 
-# ==================== STATISTICS OPERATIONS ====================
+# ==================== BULK OPERATIONS ====================
 
-def get_platform_stats() -> Dict[str, Any]:
-    """Get platform statistics"""
-    db = get_database()
-    investors_collection = db["investors"]
-    startups_collection = db["startups"]
+EXPORT_BATCH_SIZE = 500
+
+
+async def _bulk_insert(collection_name: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Insert a batch with one id reservation and one unordered insert_many.
+
+    Errors are reported per document by its index in `documents`; the rest of
+    the batch is still written.
+    """
+    if not documents:
+        return {"inserted": 0, "errors": []}
+    collection = get_database()[collection_name]
     
-    # Count active investors (excluding incubators)
-    active_investors = investors_collection.count_documents({
-        "status": "Active",
-        "duration": {"$exists": False}
-    })
+    first_id = await _allocate_ids(collection_name, len(documents))
+    for offset, document in enumerate(documents):
+        document["id"] = first_id + offset
+        document["version"] = 1
+        _add_derived_fields(collection_name, document)
     
-    # Count incubators
-    incubators = investors_collection.count_documents({
-        "duration": {"$exists": True}
-    })
+    errors = []
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = [{"index": error["index"], "error": error["errmsg"]} for error in e.details["writeErrors"]]
     
-    # Calculate total funding facilitated
-    pipeline = [
-        {"$match": {"status": "Active"}},
-        {"$group": {"_id": None, "totalDeals": {"$sum": "$activeDeals"}}}
-    ]
-    result = list(investors_collection.aggregate(pipeline))
-    total_deals = result[0]["totalDeals"] if result else 0
+    failed = {error["index"] for error in errors}
+    inserted = []
+    for index, document in enumerate(documents):
+        _strip_internal_fields(document)
+        if index not in failed:
+            inserted.append(document)
     
-    # Calculate total connections
-    pipeline = [
-        {"$match": {"status": "Active"}},
-        {"$group": {"_id": None, "totalPortfolio": {"$sum": "$portfolioCompanies"}}}
-    ]
-    result = list(investors_collection.aggregate(pipeline))
-    active_connections = result[0]["totalPortfolio"] if result else 0
+    await _record_writes(collection_name, [(None, document) for document in inserted])
+    return {"inserted": len(inserted), "errors": errors}
+
+
+@metrics.timed
+async def bulk_create_investors(investors_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create many investors at once"""
+    return await _bulk_insert("investors", investors_data)
+
+
+@metrics.timed
+async def bulk_create_startups(startups_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create many startups at once"""
+    for startup_data in startups_data:
+        startup_data["lastActive"] = "Just now"
+    return await _bulk_insert("startups", startups_data)
+
+
+async def _export(collection_name: str, fields: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream every document in id order through a server-side cursor"""
+    collection = get_read_database()[collection_name]
+    async for document in collection.find({}, _projection(fields)).sort("id", 1).batch_size(EXPORT_BATCH_SIZE):
+        yield document
+
+
+def export_investors(fields: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream all investors (only `fields` of each, when given)"""
+    return _export("investors", fields)
+
+
+def export_startups(fields: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Stream all startups (only `fields` of each, when given)"""
+    return _export("startups", fields)
+
+
+# ==================== STATISTICS OPERATIONS ====================
+
+async def _record_write(
+    collection_name: str,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]]
+):
+    """Keep derived data in step with a create (before=None), update or delete (after=None)"""
+    await _record_writes(collection_name, [(before, after)])
+
+
+async def _record_writes(
+    collection_name: str,
+    changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+):
+    """Keep derived data in step with a batch of (before, after) changes"""
+    if not changes:
+        return
+    try:
+        await cache.get_cache().invalidate(collection_name)
+    except Exception as e:
+        # Entries cached before this write expire through their TTL
+        print(f"Failed to invalidate cache for {collection_name}: {e}")
+    try:
+        await stats.record_changes(get_database(), collection_name, changes)
+    except Exception as e:
+        # The write itself succeeded; counter drift is repaired by `python stats.py`
+        print(f"Failed to update materialized stats for {collection_name}: {e}")
+    for listener in _write_listeners:
+        try:
+            listener(collection_name, changes)
+        except Exception as e:
+            print(f"Write listener {listener.__name__} failed for {collection_name}: {e}")
+
+
+@metrics.timed
+@cache.coalesced("investors", "startups")
+async def get_platform_stats() -> Dict[str, Any]:
+    """Get platform statistics from the materialized stats document"""
+    investors_stats = (await stats.load(get_database()))["investors"]
     
     # Estimate funding facilitated
-    funding_facilitated = f"${round(total_deals * 5.2, 1)}B"
+    funding_facilitated = f"${round(investors_stats['activeDeals'] * 5.2, 1)}B"
     
     return {
-        "activeInvestors": active_investors,
-        "incubators": incubators,
+        "activeInvestors": investors_stats["activeNonIncubator"],
+        "incubators": investors_stats["incubators"],
         "fundingFacilitated": funding_facilitated,
-        "activeConnections": active_connections
+        "activeConnections": investors_stats["portfolioCompanies"]
     }
 
 
-def get_dashboard_stats() -> Dict[str, Any]:
-    """Get comprehensive dashboard statistics"""
-    db = get_database()
-    investors_collection = db["investors"]
-    startups_collection = db["startups"]
-    
-    # Total counts
-    total_investors = investors_collection.count_documents({})
-    total_startups = startups_collection.count_documents({})
-    active_investors = investors_collection.count_documents({"status": "Active"})
-    
-    # Funding stages distribution
-    funding_stages = get_startup_funding_stages()
-    
-    # Industries distribution
-    industries = get_startup_industries()
-    
-    # Investment stages distribution
-    pipeline = [
-        {"$unwind": "$investmentStages"},
-        {"$group": {"_id": "$investmentStages", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    result = list(investors_collection.aggregate(pipeline))
-    investment_stages = [{"name": item["_id"], "count": item["count"]} for item in result if item["_id"]]
-    
-    # Locations distribution
-    pipeline = [
-        {"$group": {"_id": "$location", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    result = list(startups_collection.aggregate(pipeline))
-    top_locations = [{"name": item["_id"], "count": item["count"]} for item in result if item["_id"]]
+@metrics.timed
+@cache.coalesced("investors", "startups")
+async def get_dashboard_stats() -> Dict[str, Any]:
+    """Get comprehensive dashboard statistics from the materialized stats document"""
+    document = await stats.load(get_database())
+    investors_stats = document["investors"]
+    startups_stats = document["startups"]
     
     return {
         "totals": {
-            "investors": total_investors,
-            "startups": total_startups,
-            "activeInvestors": active_investors
+            "investors": investors_stats["total"],
+            "startups": startups_stats["total"],
+            "activeInvestors": investors_stats["active"]
         },
-        "fundingStages": funding_stages,
-        "industries": industries,
-        "investmentStages": investment_stages,
-        "topLocations": top_locations
-    }
\ No newline at end of file
+        "fundingStages": stats.named_counts(startups_stats["fundingStages"]),
+        "industries": stats.named_counts(startups_stats["industries"]),
+        "investmentStages": stats.named_counts(investors_stats["investmentStages"]),
+        "topLocations": stats.named_counts(startups_stats["locations"], limit=10)
+    }
@@ -0,0 +1,1199 @@
+from bson import ObjectId, json_util
+from collections import Counter
+from functools import lru_cache
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+from typing import Optional, List, Dict, Any, Tuple, Set, Iterable, AsyncIterator
+from datetime import datetime
+import asyncio
+import bisect
+import math
+import os
+import re
+import unicodedata
+
+
+# Embedded Storage Configuration
+# JSON file the store is loaded from on start and written back to on close (unset = memory only)
+EMBEDDED_DATA_FILE = os.getenv("EMBEDDED_DATA_FILE")
+# Sort orders kept up to date per collection; each costs O(log n) per write
+EMBEDDED_MAX_SORT_ORDERS = int(os.getenv("EMBEDDED_MAX_SORT_ORDERS", 64))
+
+_REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Placeholder for a path that reaches nothing
+_MISSING = object()
+
+
+# ==================== VALUES ====================
+
+def _copy(value: Any) -> Any:
+    """Copy of a document value; stored documents are never shared with callers"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _rank(value: Any) -> int:
+    """BSON type order: null, numbers, strings, objects, arrays, ObjectId, booleans, dates"""
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _part(value: Any) -> Tuple[int, Any]:
+    """Comparable form of a value: types order by rank, never against each other"""
+    rank = _rank(value)
+    if rank == 1:
+        return rank, 0
+    if rank == 2 and math.isnan(value):
+        return rank, -math.inf
+    if rank in (4, 5):
+        return rank, repr(value)
+    return rank, value
+
+
+def _key(value: Any) -> Tuple[int, Any]:
+    """Hashable form of a value for equality indexes; 1 and 1.0 share a key, True does not"""
+    rank = _rank(value)
+    if rank in (4, 5):
+        return rank, repr(value)
+    return rank, value
+
+
+def _resolve(document: Dict[str, Any], path: str) -> List[Any]:
+    """Values a dotted path reaches, descending into arrays of sub-documents; empty when missing"""
+    values = [document]
+    for part in path.split("."):
+        reached = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    reached.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    reached.append(value[int(part)])
+                reached.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = reached
+    return values
+
+
+def _candidates(values: List[Any]) -> Iterable[Any]:
+    """What a condition is tested against: each value and, for arrays, each element"""
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _set_path(document: Dict[str, Any], path: str, value: Any):
+    *parents, leaf = path.split(".")
+    target = document
+    for part in parents:
+        child = target.get(part) if isinstance(target, dict) else None
+        if child is None:
+            child = target[part] = {}
+        elif not isinstance(child, dict):
+            raise OperationFailure(f"Cannot create field '{leaf}' in element {{{part}: {child!r}}}")
+        target = child
+    target[leaf] = value
+
+
+def _get_path(document: Dict[str, Any], path: str) -> Any:
+    target: Any = document
+    for part in path.split("."):
+        if not isinstance(target, dict) or part not in target:
+            return _MISSING
+        target = target[part]
+    return target
+
+
+def _unset_path(document: Dict[str, Any], path: str):
+    *parents, leaf = path.split(".")
+    target: Any = document
+    for part in parents:
+        target = target.get(part) if isinstance(target, dict) else None
+    if isinstance(target, dict):
+        target.pop(leaf, None)
+
+
+# ==================== QUERIES ====================
+
+@lru_cache(maxsize=256)
+def _compile_regex(pattern: str, options: str) -> "re.Pattern":
+    flags = 0
+    for option in options:
+        if option not in _REGEX_FLAGS:
+            raise OperationFailure(f"invalid flag in regex options: {option}")
+        flags |= _REGEX_FLAGS[option]
+    try:
+        return re.compile(pattern, flags)
+    except re.error as e:
+        raise OperationFailure(f"Regular expression is invalid: {e}")
+
+
+def _equals(values: List[Any], target: Any) -> bool:
+    """Equality as a query sees it: null also matches a missing field, arrays match by element"""
+    if isinstance(target, re.Pattern):
+        return any(isinstance(value, str) and target.search(value) for value in _candidates(values))
+    if target is None:
+        return not values or any(value is None for value in _candidates(values))
+    rank = _rank(target)
+    return any(_rank(value) == rank and value == target for value in _candidates(values))
+
+
+def _compares(values: List[Any], operator: str, target: Any) -> bool:
+    """$gt/$gte/$lt/$lte, which only compare values of the same type"""
+    if target is None:
+        return operator in ("$gte", "$lte") and _equals(values, None)
+    bound = _part(target)
+    for value in _candidates(values):
+        part = _part(value)
+        if part[0] != bound[0] or part[0] in (4, 5):
+            continue
+        if operator == "$gt" and part > bound or operator == "$gte" and part >= bound:
+            return True
+        if operator == "$lt" and part < bound or operator == "$lte" and part <= bound:
+            return True
+    return False
+
+
+def _within_sphere(values: List[Any], sphere: Any) -> bool:
+    """$centerSphere [[lng, lat], radians] against GeoJSON points (or legacy [lng, lat] pairs)"""
+    (center_lng, center_lat), radius = sphere
+    lat1, lng1 = math.radians(center_lat), math.radians(center_lng)
+    for value in values:
+        coordinates = value.get("coordinates") if isinstance(value, dict) and value.get("type") == "Point" else value
+        if not (isinstance(coordinates, list) and len(coordinates) == 2):
+            continue
+        lat2, lng2 = math.radians(coordinates[1]), math.radians(coordinates[0])
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+        if 2 * math.asin(min(1.0, math.sqrt(a))) <= radius:
+            return True
+    return False
+
+
+def _is_operator_document(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def _field_matches(document: Dict[str, Any], path: str, condition: Any) -> bool:
+    values = _resolve(document, path)
+    if not _is_operator_document(condition):
+        return _equals(values, condition)
+    for operator, argument in condition.items():
+        if operator == "$options":
+            continue
+        if operator == "$eq":
+            matched = _equals(values, argument)
+        elif operator == "$ne":
+            matched = not _equals(values, argument)
+        elif operator == "$in":
+            matched = any(_equals(values, item) for item in argument)
+        elif operator == "$nin":
+            matched = not any(_equals(values, item) for item in argument)
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            matched = _compares(values, operator, argument)
+        elif operator == "$exists":
+            matched = bool(values) == bool(argument)
+        elif operator == "$regex":
+            pattern = argument if isinstance(argument, re.Pattern) else _compile_regex(argument, condition.get("$options", ""))
+            matched = _equals(values, pattern)
+        elif operator == "$all":
+            matched = bool(argument) and all(_equals(values, item) for item in argument)
+        elif operator == "$size":
+            matched = any(isinstance(value, list) and len(value) == argument for value in values)
+        elif operator == "$not":
+            matched = not _field_matches(document, path, argument)
+        elif operator == "$geoWithin" and set(argument) == {"$centerSphere"}:
+            matched = _within_sphere(values, argument["$centerSphere"])
+        else:
+            raise OperationFailure(f"unknown operator: {operator}")
+        if not matched:
+            return False
+    return True
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Whether a document satisfies a query; $text is answered by the text index, not here"""
+    for key, condition in query.items():
+        if key == "$and":
+            matched = all(matches(document, clause) for clause in condition)
+        elif key == "$or":
+            matched = any(matches(document, clause) for clause in condition)
+        elif key == "$nor":
+            matched = not any(matches(document, clause) for clause in condition)
+        elif key == "$text":
+            raise OperationFailure("$text is only allowed at the top level of a find or $match")
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}")
+        else:
+            matched = _field_matches(document, key, condition)
+        if not matched:
+            return False
+    return True
+
+
+# ==================== PROJECTION ====================
+
+def _path_tree(paths: Iterable[str]) -> Dict[str, Any]:
+    """{"a.b", "c"} -> {"a": {"b": True}, "c": True}"""
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        *parents, leaf = path.split(".")
+        node = tree
+        for part in parents:
+            if node.get(part) is True:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[leaf] = True
+    return tree
+
+
+def _pick(value: Any, tree: Any) -> Any:
+    """Apply an inclusion tree: scalars under a nested path vanish"""
+    if tree is True:
+        return _copy(value)
+    if isinstance(value, dict):
+        picked = {}
+        for key, item in value.items():
+            if key in tree:
+                item = _pick(item, tree[key])
+                if item is not _MISSING:
+                    picked[key] = item
+        return picked
+    if isinstance(value, list):
+        return [_pick(item, tree) for item in value if isinstance(item, (dict, list))]
+    return _MISSING
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """A copy of a stored document shaped by a find projection; `_id` is kept unless excluded"""
+    if not projection:
+        return _copy(document)
+    included = [path for path, value in projection.items() if value and path != "_id"]
+    if included or all(projection.values()):
+        result = _pick(document, _path_tree(included)) if included else {}
+        if projection.get("_id", 1) and "_id" in document:
+            result = {"_id": document["_id"], **result}
+        return result
+    result = _copy(document)
+    for path, value in projection.items():
+        if not value:
+            _unset_path(result, path)
+    return result
+
+
+# ==================== INDEXES ====================
+
+class _Index:
+    """Equality index on the first field of an index key: value -> rows.
+
+    Arrays are indexed by element and a missing field as null, like a
+    MongoDB multikey index. The remaining key fields only matter to MongoDB.
+    """
+
+    def __init__(self, name: str, field: str, unique: bool = False):
+        self.name = name
+        self.field = field
+        self.unique = unique
+        self.entries: Dict[Tuple[int, Any], Set[int]] = {}
+
+    def keys(self, document: Dict[str, Any]) -> Set[Tuple[int, Any]]:
+        values = _resolve(document, self.field)
+        if not values:
+            return {_key(None)}
+        keys = set()
+        for value in values:
+            if isinstance(value, list):
+                keys.update(_key(item) for item in value)
+            else:
+                keys.add(_key(value))
+        return keys
+
+    def add(self, row: int, document: Dict[str, Any]):
+        for key in self.keys(document):
+            self.entries.setdefault(key, set()).add(row)
+
+    def remove(self, row: int, document: Dict[str, Any]):
+        for key in self.keys(document):
+            rows = self.entries.get(key)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self.entries[key]
+
+
+def _tokens(text: str) -> List[str]:
+    """Words of a text field, case and diacritics folded (a "none" language text index)"""
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return [token.lower() for token in _TOKEN_RE.findall(text)]
+
+
+class _TextIndex:
+    """Inverted index behind $text: token -> rows, plus per-row token counts for scoring"""
+
+    def __init__(self, name: str, weights: Dict[str, int]):
+        self.name = name
+        self.weights = weights
+        self.postings: Dict[str, Set[int]] = {}
+        self.fields: Dict[int, Dict[str, Tuple[Counter, int]]] = {}
+
+    def add(self, row: int, document: Dict[str, Any]):
+        fields = {}
+        for path in self.weights:
+            tokens = [
+                token for value in _candidates(_resolve(document, path)) if isinstance(value, str)
+                for token in _tokens(value)
+            ]
+            if tokens:
+                fields[path] = (Counter(tokens), len(tokens))
+                for token in fields[path][0]:
+                    self.postings.setdefault(token, set()).add(row)
+        self.fields[row] = fields
+
+    def remove(self, row: int, document: Dict[str, Any]):
+        for counts, _ in self.fields.pop(row, {}).values():
+            for token in counts:
+                rows = self.postings.get(token)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del self.postings[token]
+
+    def rows(self, terms: List[str]) -> Set[int]:
+        """Rows containing any of the terms"""
+        return set().union(*(self.postings.get(term, set()) for term in terms))
+
+    def score(self, row: int, terms: List[str]) -> float:
+        """Weighted term frequency, in the spirit of MongoDB's textScore"""
+        score = 0.0
+        for path, (counts, size) in self.fields.get(row, {}).items():
+            for term in terms:
+                if counts.get(term):
+                    score += self.weights[path] * (0.5 + 0.5 * counts[term] / size)
+        return score
+
+
+def _is_text_score(direction: Any) -> bool:
+    return isinstance(direction, dict) and direction.get("$meta") == "textScore"
+
+
+def _sort_spec(key_or_list: Any, direction: Any = None) -> List[Tuple[str, Any]]:
+    """Normalize the ways a sort can be given: "field", ("field", -1) lists, {"field": -1}"""
+    if isinstance(key_or_list, str):
+        spec = [(key_or_list, 1 if direction is None else direction)]
+    elif isinstance(key_or_list, dict):
+        spec = list(key_or_list.items())
+    else:
+        spec = [tuple(item) for item in key_or_list]
+    for field, value in spec:
+        if value not in (1, -1) and not _is_text_score(value):
+            raise OperationFailure(f"bad sort specification for {field}: {value!r}")
+    return spec
+
+
+def _sort_part(document: Dict[str, Any], path: str, direction: int) -> Tuple[int, Any]:
+    """Sort key of one field; arrays sort by their lowest element ascending, highest descending"""
+    values = list(_candidates(_resolve(document, path)))
+    scalars = [value for value in values if not isinstance(value, list)] or values
+    if not scalars:
+        return _part(None)
+    parts = [_part(value) for value in scalars]
+    return min(parts) if direction == 1 else max(parts)
+
+
+def _ordered(rows: List[Any], spec: List[Tuple[str, Any]], part_of) -> List[Any]:
+    """Stable multi-key sort, one pass per key from the last; ties keep their incoming order"""
+    rows = list(rows)
+    for index in reversed(range(len(spec))):
+        field, direction = spec[index]
+        rows.sort(key=lambda row: part_of(row, index), reverse=_is_text_score(direction) or direction == -1)
+    return rows
+
+
+class _SortKey:
+    """Sort key of a row under a spec, ending in the row number so every key is distinct"""
+
+    __slots__ = ("parts", "directions")
+
+    def __init__(self, parts: Tuple[Any, ...], directions: Tuple[int, ...]):
+        self.parts = parts
+        self.directions = directions
+
+    def __lt__(self, other: "_SortKey") -> bool:
+        for mine, theirs, direction in zip(self.parts, other.parts, self.directions):
+            if mine != theirs:
+                return mine < theirs if direction == 1 else theirs < mine
+        return False
+
+
+class _SortOrder:
+    """Every row of a collection sorted by one spec, kept current by bisecting on each write"""
+
+    def __init__(self, spec: List[Tuple[str, int]], documents: Dict[int, Dict[str, Any]]):
+        self.spec = spec
+        self.directions = (*(direction for _, direction in spec), 1)
+        self.keys = {row: self._key(row, document) for row, document in documents.items()}
+        self.rows = _ordered(list(documents), spec, lambda row, index: self.keys[row].parts[index])
+
+    def _key(self, row: int, document: Dict[str, Any]) -> _SortKey:
+        parts = tuple(_sort_part(document, field, direction) for field, direction in self.spec)
+        return _SortKey((*parts, row), self.directions)
+
+    def add(self, row: int, document: Dict[str, Any]):
+        self.keys[row] = self._key(row, document)
+        bisect.insort(self.rows, row, key=self.keys.__getitem__)
+
+    def remove(self, row: int):
+        position = bisect.bisect_left(self.rows, self.keys[row], key=self.keys.__getitem__)
+        del self.rows[position]
+        del self.keys[row]
+
+
+# ==================== CURSORS ====================
+
+class _Cursor:
+    """The parts of a Motor find cursor db.py uses; evaluated on to_list or iteration"""
+
+    def __init__(self, collection: "Collection", query: Dict[str, Any], projection: Optional[Dict[str, Any]]):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self.sort_spec: Optional[List[Tuple[str, Any]]] = None
+        self.skip_count = 0
+        self.limit_count = 0
+        self.batch = 100
+
+    def sort(self, key_or_list: Any, direction: Any = None) -> "_Cursor":
+        self.sort_spec = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "_Cursor":
+        self.skip_count = count
+        return self
+
+    def limit(self, count: int) -> "_Cursor":
+        self.limit_count = abs(count)
+        return self
+
+    def batch_size(self, size: int) -> "_Cursor":
+        self.batch = max(size, 1)
+        return self
+
+    def _documents(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        limit = self.limit_count
+        if length is not None:
+            limit = min(limit, length) if limit else length
+        rows = self.collection._select(self.query, self.sort_spec, self.skip_count, limit)
+        return [project(self.collection._documents[row], self.projection) for row in rows]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self._documents(length)
+
+    async def _iterate(self) -> AsyncIterator[Dict[str, Any]]:
+        for count, document in enumerate(self._documents(), start=1):
+            yield document
+            if count % self.batch == 0:
+                # Long exports still let other requests run between batches
+                await asyncio.sleep(0)
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self._iterate()
+
+
+class _ListCursor:
+    """Cursor over already computed documents (aggregation results)"""
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.documents if length is None else self.documents[:length]
+
+    async def _iterate(self) -> AsyncIterator[Dict[str, Any]]:
+        for document in self.documents:
+            yield document
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self._iterate()
+
+
+# ==================== AGGREGATION ====================
+
+def _expression(document: Dict[str, Any], expression: Any) -> Any:
+    """"$field" paths, objects of expressions and literals"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        values = _resolve(document, expression[1:])
+        if not values:
+            return _MISSING
+        return values[0] if len(values) == 1 else values
+    if isinstance(expression, dict) and not _is_operator_document(expression):
+        return {key: _expression(document, item) for key, item in expression.items()}
+    if isinstance(expression, dict):
+        raise OperationFailure(f"Unsupported expression: {next(iter(expression))}")
+    return expression
+
+
+def _present(value: Any) -> Any:
+    return None if value is _MISSING else value
+
+
+def _accumulate(documents: List[Dict[str, Any]], operator: str, argument: Any) -> Any:
+    if operator == "$sum" and _rank(argument) == 2:
+        # {"$sum": 1} counts; no need to evaluate it per document
+        return argument * len(documents)
+    values = [_expression(document, argument) for document in documents]
+    if operator == "$sum":
+        return sum(value for value in values if _rank(value) == 2)
+    if operator == "$avg":
+        numbers = [value for value in values if _rank(value) == 2]
+        return sum(numbers) / len(numbers) if numbers else None
+    if operator in ("$min", "$max"):
+        present = [value for value in values if value is not _MISSING and value is not None]
+        if not present:
+            return None
+        return (min if operator == "$min" else max)(present, key=_part)
+    if operator == "$first":
+        return _present(values[0])
+    if operator == "$last":
+        return _present(values[-1])
+    if operator == "$push":
+        return [value for value in values if value is not _MISSING]
+    if operator == "$addToSet":
+        return list({_key(value): value for value in values if value is not _MISSING}.values())
+    if operator == "$count":
+        return len(documents)
+    raise OperationFailure(f"unknown group operator '{operator}'")
+
+
+def _group(documents: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, Tuple[Any, List[Dict[str, Any]]]] = {}
+    for document in documents:
+        group_id = _present(_expression(document, spec["_id"]))
+        groups.setdefault(_key(group_id), (group_id, []))[1].append(document)
+    results = []
+    for group_id, members in groups.values():
+        result = {"_id": group_id}
+        for field, accumulator in spec.items():
+            if field != "_id":
+                (operator, argument), = accumulator.items()
+                result[field] = _accumulate(members, operator, argument)
+        results.append(result)
+    return results
+
+
+def _replaced(document: Dict[str, Any], path: str, value: Any) -> Dict[str, Any]:
+    """Copy of a document with `path` set to `value`, sharing everything off the path"""
+    head, _, rest = path.partition(".")
+    copied = dict(document)
+    copied[head] = _replaced(document[head], rest, value) if rest else value
+    return copied
+
+
+def _unwind(documents: List[Dict[str, Any]], spec: Any) -> List[Dict[str, Any]]:
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec["path"][1:]
+    preserve = spec.get("preserveNullAndEmptyArrays", False)
+    unwound = []
+    for document in documents:
+        value = _get_path(document, path)
+        if isinstance(value, list) and value:
+            unwound.extend(_replaced(document, path, item) for item in value)
+        elif isinstance(value, list) or value is _MISSING or value is None:
+            if preserve:
+                unwound.append(document)
+        else:
+            unwound.append(document)
+    return unwound
+
+
+def _run_pipeline(documents: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            documents = [document for document in documents if matches(document, spec)]
+        elif name == "$unwind":
+            documents = _unwind(documents, spec)
+        elif name == "$group":
+            documents = _group(documents, spec)
+        elif name == "$sort":
+            sort_spec = _sort_spec(spec)
+            documents = _ordered(
+                documents, sort_spec,
+                lambda document, index: _sort_part(document, sort_spec[index][0], sort_spec[index][1])
+            )
+        elif name == "$skip":
+            documents = documents[spec:]
+        elif name == "$limit":
+            documents = documents[:spec]
+        elif name == "$count":
+            documents = [{spec: len(documents)}] if documents else []
+        elif name == "$project":
+            documents = [project(document, spec) for document in documents]
+        elif name == "$facet":
+            documents = [{field: _run_pipeline(documents, branch) for field, branch in spec.items()}]
+        else:
+            raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'")
+    return documents
+
+
+# ==================== COLLECTIONS ====================
+
+class Collection:
+    """One collection: documents by row number, with equality, text and sort indexes.
+
+    Implements the subset of AsyncIOMotorCollection the data layer uses.
+    Every operation runs to completion without yielding, so single
+    operations are atomic as they are in MongoDB.
+    """
+
+    def __init__(self, database: "Database", name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._documents: Dict[int, Dict[str, Any]] = {}
+        self._next_row = 0
+        self._indexes: Dict[str, _Index] = {"_id_": _Index("_id_", "_id", unique=True)}
+        self._specs: List[Dict[str, Any]] = []
+        self._text: Optional[_TextIndex] = None
+        self._orders: Dict[Tuple[Tuple[str, int], ...], _SortOrder] = {}
+
+    # ---------- storage ----------
+
+    def _index(self, row: int, document: Dict[str, Any]):
+        for index in self._indexes.values():
+            index.add(row, document)
+        if self._text:
+            self._text.add(row, document)
+        for order in self._orders.values():
+            order.add(row, document)
+
+    def _unindex(self, row: int, document: Dict[str, Any]):
+        for order in self._orders.values():
+            order.remove(row)
+        for index in self._indexes.values():
+            index.remove(row, document)
+        if self._text:
+            self._text.remove(row, document)
+
+    def _add(self, row: int, document: Dict[str, Any]):
+        self._documents[row] = document
+        self._index(row, document)
+
+    def _remove(self, row: int) -> Dict[str, Any]:
+        document = self._documents.pop(row)
+        self._unindex(row, document)
+        return document
+
+    def _row(self, document_id: Any) -> int:
+        return next(iter(self._indexes["_id_"].entries[_key(document_id)]))
+
+    def _check_unique(self, document: Dict[str, Any], row: Optional[int] = None):
+        for index in self._indexes.values():
+            if not index.unique:
+                continue
+            for key in index.keys(document):
+                if index.entries.get(key, set()) - {row}:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.full_name} index: {index.name} "
+                        f"dup key: {{ {index.field}: {key[1]!r} }}",
+                        11000
+                    )
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        """Store a copy, adding `_id` to the caller's document as pymongo does"""
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        stored = {"_id": document["_id"], **{key: _copy(value) for key, value in document.items() if key != "_id"}}
+        self._check_unique(stored)
+        self._add(self._next_row, stored)
+        self._next_row += 1
+        return stored["_id"]
+
+    def _replace(self, row: int, document: Dict[str, Any]):
+        """Swap a row's document in place, so updates keep its natural order"""
+        old = self._documents[row]
+        self._unindex(row, old)
+        try:
+            self._check_unique(document, row)
+        except DuplicateKeyError:
+            self._index(row, old)
+            raise
+        self._documents[row] = document
+        self._index(row, document)
+
+    # ---------- query planning ----------
+
+    def _equality_rows(self, field: str, condition: Any) -> Optional[Set[int]]:
+        index = next((index for index in self._indexes.values() if index.field == field), None)
+        if index is None:
+            return None
+        if _is_operator_document(condition):
+            if set(condition) == {"$eq"}:
+                condition = condition["$eq"]
+            elif set(condition) == {"$in"} and not any(isinstance(item, (dict, list, re.Pattern)) for item in condition["$in"]):
+                return set().union(*(index.entries.get(_key(item), set()) for item in condition["$in"]))
+            else:
+                return None
+        if isinstance(condition, (dict, list, re.Pattern)):
+            return None
+        return set(index.entries.get(_key(condition), set()))
+
+    def _plan(self, query: Dict[str, Any]) -> Optional[Set[int]]:
+        """Smallest row set an equality index gives for a top-level clause, None to scan"""
+        best = None
+        clauses = list(query.items()) + [item for clause in query.get("$and", []) for item in clause.items()]
+        for field, condition in clauses:
+            if field.startswith("$"):
+                continue
+            rows = self._equality_rows(field, condition)
+            if rows is not None and (best is None or len(rows) < len(best)):
+                best = rows
+        return best
+
+    def _order(self, spec: List[Tuple[str, int]]) -> _SortOrder:
+        key = tuple(spec)
+        order = self._orders.get(key)
+        if order is None:
+            if len(self._orders) >= EMBEDDED_MAX_SORT_ORDERS:
+                self._orders.pop(next(iter(self._orders)))
+            order = self._orders[key] = _SortOrder(list(spec), self._documents)
+        return order
+
+    def _select(
+        self,
+        query: Optional[Dict[str, Any]],
+        sort: Optional[List[Tuple[str, Any]]] = None,
+        skip: int = 0,
+        limit: int = 0
+    ) -> List[int]:
+        """Rows matching a query in sort order (natural order without one), after skip and limit"""
+        query = query or {}
+        terms = None
+        if "$text" in query:
+            if self._text is None:
+                raise OperationFailure("text index required for $text query")
+            terms = _tokens(query["$text"]["$search"])
+            query = {key: value for key, value in query.items() if key != "$text"}
+        candidates = self._plan(query)
+        if terms is not None:
+            text_rows = self._text.rows(terms)
+            candidates = text_rows if candidates is None else candidates & text_rows
+
+        end = skip + limit if limit else None
+        by_score = bool(sort) and any(_is_text_score(direction) for _, direction in sort)
+        # Unselective filters walk a maintained sort order and stop once the page is full;
+        # selective ones match their few candidates and sort those
+        if not by_score and (candidates is None or len(candidates) * 8 > len(self._documents)):
+            source = self._order(sort).rows if sort else list(self._documents)
+            matched = []
+            for row in source:
+                if (candidates is None or row in candidates) and matches(self._documents[row], query):
+                    matched.append(row)
+                    if end is not None and len(matched) >= end:
+                        break
+            return matched[skip:end]
+
+        matched = [row for row in sorted(candidates) if matches(self._documents[row], query)]
+        if sort:
+            scores = {row: self._text.score(row, terms) for row in matched} if terms is not None else {}
+
+            def part_of(row: int, index: int) -> Any:
+                field, direction = sort[index]
+                if _is_text_score(direction):
+                    return scores.get(row, 0.0)
+                return _sort_part(self._documents[row], field, direction)
+
+            matched = _ordered(matched, sort, part_of)
+        return matched[skip:end]
+
+    def _first(self, query: Optional[Dict[str, Any]], sort: Any = None) -> Optional[int]:
+        rows = self._select(query, _sort_spec(sort) if sort else None, limit=1)
+        return rows[0] if rows else None
+
+    # ---------- reads ----------
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> _Cursor:
+        return _Cursor(self, filter or {}, projection)
+
+    async def find_one(
+        self,
+        filter: Any = None,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Any = None
+    ) -> Optional[Dict[str, Any]]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        row = self._first(filter, sort)
+        return None if row is None else project(self._documents[row], projection)
+
+    async def count_documents(self, filter: Dict[str, Any], limit: int = 0, skip: int = 0) -> int:
+        return len(self._select(filter, None, skip, limit))
+
+    async def estimated_document_count(self) -> int:
+        return len(self._documents)
+
+    async def distinct(self, key: str, filter: Optional[Dict[str, Any]] = None) -> List[Any]:
+        values = {}
+        for row in self._select(filter):
+            for value in _resolve(self._documents[row], key):
+                for item in value if isinstance(value, list) else [value]:
+                    values.setdefault(_key(item), _copy(item))
+        return list(values.values())
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> _ListCursor:
+        """Run a pipeline; a leading $match (which may hold $text) uses the indexes"""
+        stages = list(pipeline)
+        query = stages.pop(0)["$match"] if stages and "$match" in stages[0] else {}
+        documents = [self._documents[row] for row in self._select(query)]
+        return _ListCursor([_copy(document) for document in _run_pipeline(documents, stages)])
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets")
+
+    # ---------- writes ----------
+
+    async def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        inserted_ids, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                inserted_ids.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": e.code, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted_ids),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []
+            })
+        return InsertManyResult(inserted_ids, True)
+
+    def _updated(self, document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> Dict[str, Any]:
+        """A copy of `document` with update operators applied"""
+        if not _is_operator_document(update):
+            raise ValueError("update only works with $ operators")
+        updated = _copy(document)
+        for operator, fields in update.items():
+            for path, value in fields.items():
+                current = _get_path(updated, path)
+                if operator == "$set" or operator == "$setOnInsert" and inserting:
+                    _set_path(updated, path, _copy(value))
+                elif operator == "$setOnInsert":
+                    continue
+                elif operator == "$unset":
+                    _unset_path(updated, path)
+                elif operator == "$inc":
+                    if current is _MISSING or current is None:
+                        _set_path(updated, path, value)
+                    elif _rank(current) == 2:
+                        _set_path(updated, path, current + value)
+                    else:
+                        raise OperationFailure(f"Cannot apply $inc to a value of non-numeric type at {path}")
+                elif operator in ("$max", "$min"):
+                    if current is _MISSING or (_part(value) > _part(current) if operator == "$max" else _part(value) < _part(current)):
+                        _set_path(updated, path, _copy(value))
+                elif operator == "$push":
+                    if current is _MISSING:
+                        _set_path(updated, path, [_copy(value)])
+                    elif isinstance(current, list):
+                        current.append(_copy(value))
+                    else:
+                        raise OperationFailure(f"The field '{path}' must be an array")
+                else:
+                    raise OperationFailure(f"Unknown modifier: {operator}")
+        if "_id" in document and updated.get("_id") != document["_id"]:
+            raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'")
+        return updated
+
+    def _upsert(self, filter: Dict[str, Any], update: Dict[str, Any], replacement: bool = False) -> Any:
+        """Insert the document an upsert creates: the filter's equalities plus the update"""
+        if replacement:
+            document = _copy(update)
+        else:
+            document = {}
+            for path, condition in filter.items():
+                if path.startswith("$"):
+                    continue
+                if _is_operator_document(condition):
+                    if set(condition) != {"$eq"}:
+                        continue
+                    condition = condition["$eq"]
+                _set_path(document, path, _copy(condition))
+            document = self._updated(document, update, inserting=True)
+        if "_id" in filter and "_id" not in document:
+            document["_id"] = filter["_id"]
+        return self._insert(document)
+
+    def _update_rows(self, rows: List[int], update: Dict[str, Any], replacement: bool = False) -> int:
+        modified = 0
+        for row in rows:
+            document = self._documents[row]
+            if replacement:
+                updated = {"_id": document["_id"], **_copy(update)}
+            else:
+                updated = self._updated(document, update)
+            if updated != document:
+                self._replace(row, updated)
+                modified += 1
+        return modified
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return self._update(filter, update, upsert, many=False)
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return self._update(filter, update, upsert, many=True)
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        if _is_operator_document(replacement):
+            raise ValueError("replacement can not include $ operators")
+        return self._update(filter, replacement, upsert, many=False, replacement=True)
+
+    def _update(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        upsert: bool,
+        many: bool,
+        replacement: bool = False
+    ) -> UpdateResult:
+        rows = self._select(filter, limit=0 if many else 1)
+        if not rows and upsert:
+            upserted_id = self._upsert(filter, update, replacement)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": upserted_id, "updatedExisting": False}, True)
+        modified = self._update_rows(rows, update, replacement)
+        return UpdateResult({"n": len(rows), "nModified": modified, "updatedExisting": bool(rows)}, True)
+
+    async def find_one_and_update(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE
+    ) -> Optional[Dict[str, Any]]:
+        row = self._first(filter, sort)
+        if row is None:
+            if not upsert:
+                return None
+            upserted_id = self._upsert(filter, update)
+            if return_document != ReturnDocument.AFTER:
+                return None
+            return project(self._documents[self._row(upserted_id)], projection)
+        before = project(self._documents[row], projection)
+        self._update_rows([row], update)
+        return project(self._documents[row], projection) if return_document == ReturnDocument.AFTER else before
+
+    async def find_one_and_delete(
+        self,
+        filter: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Any = None
+    ) -> Optional[Dict[str, Any]]:
+        row = self._first(filter, sort)
+        return None if row is None else project(self._remove(row), projection)
+
+    async def delete_one(self, filter: Dict[str, Any]) -> DeleteResult:
+        rows = self._select(filter, limit=1)
+        for row in rows:
+            self._remove(row)
+        return DeleteResult({"n": len(rows)}, True)
+
+    async def delete_many(self, filter: Dict[str, Any]) -> DeleteResult:
+        rows = self._select(filter)
+        for row in rows:
+            self._remove(row)
+        return DeleteResult({"n": len(rows)}, True)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult:
+        """InsertOne, UpdateOne/UpdateMany, ReplaceOne and DeleteOne/DeleteMany requests"""
+        result = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []
+        }
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    outcome = self._update(
+                        request._filter, request._doc, bool(request._upsert),
+                        many=isinstance(request, UpdateMany), replacement=isinstance(request, ReplaceOne)
+                    )
+                    if outcome.upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": outcome.upserted_id})
+                    else:
+                        result["nMatched"] += outcome.matched_count
+                        result["nModified"] += outcome.modified_count
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    rows = self._select(request._filter, limit=0 if isinstance(request, DeleteMany) else 1)
+                    for row in rows:
+                        self._remove(row)
+                    result["nRemoved"] += len(rows)
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": index, "code": e.code, "errmsg": str(e), "op": request})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    # ---------- indexes ----------
+
+    def _create_index(self, spec: Dict[str, Any]) -> str:
+        name = spec["name"]
+        if any(existing["name"] == name for existing in self._specs):
+            return name
+        fields = list(spec["key"].items()) if isinstance(spec["key"], dict) else [tuple(item) for item in spec["key"]]
+        if any(kind == "text" for _, kind in fields):
+            if self._text is not None:
+                raise OperationFailure(f"An equivalent text index already exists: {self._text.name}")
+            weights = dict(spec.get("weights") or {})
+            for field, kind in fields:
+                if kind == "text":
+                    weights.setdefault(field, 1)
+            self._text = _TextIndex(name, weights)
+            for row, document in self._documents.items():
+                self._text.add(row, document)
+        elif fields[0][1] in (1, -1, "hashed"):
+            index = _Index(name, fields[0][0], bool(spec.get("unique")))
+            for row, document in self._documents.items():
+                if index.unique:
+                    keys = index.keys(document)
+                    if any(key in index.entries for key in keys):
+                        raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: {name}", 11000)
+                index.add(row, document)
+            self._indexes[name] = index
+        # Geo indexes are accepted; $geoWithin filters scan
+        self._specs.append({
+            "name": name,
+            "key": [list(field) for field in fields],
+            **{option: spec[option] for option in ("unique", "weights") if spec.get(option)}
+        })
+        return name
+
+    async def create_indexes(self, indexes: List[Any]) -> List[str]:
+        return [self._create_index(model.document) for model in indexes]
+
+    async def drop(self):
+        self.database._collections.pop(self.name, None)
+
+
+# ==================== DATABASES ====================
+
+class Database:
+    """Collections by name; stands in for AsyncIOMotorDatabase"""
+
+    def __init__(self, client: "Client", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, Collection] = {}
+
+    def __getitem__(self, name: str) -> Collection:
+        if name not in self._collections:
+            self._collections[name] = Collection(self, name)
+        return self._collections[name]
+
+    def get_collection(self, name: str) -> Collection:
+        return self[name]
+
+    def with_options(self, **kwargs) -> "Database":
+        # Read preferences and write concerns mean nothing without replicas
+        return self
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def drop_collection(self, name: str):
+        self._collections.pop(name, None)
+
+    async def command(self, command: Any, value: Any = 1, **kwargs) -> Dict[str, Any]:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        if name in ("hello", "isMaster", "ismaster"):
+            return {"isWritablePrimary": True, "ismaster": True, "ok": 1.0}
+        raise OperationFailure(f"Command {name} is not supported by the embedded store")
+
+
+class Client:
+    """The databases of this process; stands in for AsyncIOMotorClient.
+
+    With a data file, databases are read from it on creation and written
+    back by close(), so a restart keeps the data (but not a crash).
+    """
+
+    def __init__(self, data_file: Optional[str] = EMBEDDED_DATA_FILE):
+        self.data_file = data_file
+        self._databases: Dict[str, Database] = {}
+        if data_file and os.path.exists(data_file):
+            self._load()
+
+    def __getitem__(self, name: str) -> Database:
+        if name not in self._databases:
+            self._databases[name] = Database(self, name)
+        return self._databases[name]
+
+    def _load(self):
+        with open(self.data_file, encoding="utf-8") as f:
+            data = json_util.loads(f.read())
+        for database_name, collections in data.items():
+            for collection_name, contents in collections.items():
+                collection = self[database_name][collection_name]
+                for spec in contents["indexes"]:
+                    collection._create_index(spec)
+                for document in contents["documents"]:
+                    collection._insert(document)
+        print(f"Loaded embedded store from {self.data_file}")
+
+    def _save(self):
+        data = {
+            database.name: {
+                collection.name: {
+                    "indexes": collection._specs,
+                    "documents": list(collection._documents.values()),
+                }
+                for collection in database._collections.values()
+            }
+            for database in self._databases.values()
+        }
+        temporary = f"{self.data_file}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(json_util.dumps(data))
+        os.replace(temporary, self.data_file)
+        print(f"Saved embedded store to {self.data_file}")
+
+    def close(self):
+        if self.data_file:
+            self._save()
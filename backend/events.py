@@ -0,0 +1,366 @@
+from collections import deque
+from pymongo.errors import PyMongoError, OperationFailure
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+import asyncio
+import os
+import secrets
+import orjson
+import db
+
+
+# Events Configuration
+# auto: change streams on replica sets / sharded clusters, in-process otherwise
+EVENTS_SOURCE = os.getenv("EVENTS_SOURCE", "auto")
+# Events buffered per subscriber before a slow client is disconnected (it resumes via Last-Event-ID)
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 1024))
+# Recent events kept for Last-Event-ID replay
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", 1000))
+# Seconds between keep-alive comments on idle streams
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", 15))
+# Streams end after this many seconds and clients reconnect, so shutdowns and
+# rebalancing across workers never wait on a stream that lives forever
+EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", 300))
+# Reconnect delay suggested to EventSource clients, in milliseconds
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", 1000))
+
+COLLECTIONS = ("investors", "startups")
+
+# Change stream errors that resuming from the same token cannot fix:
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+NON_RESUMABLE_CODES = {260, 280, 286}
+
+# Fields the per-client filters look at: filter -> collection -> (field, is_array)
+FILTER_FIELDS = {
+    "industry": {"startups": ("industry", False), "investors": ("focusIndustries", True)},
+    "stage": {"startups": ("fundingStage", False), "investors": ("investmentStages", True)},
+}
+
+
+# ==================== EVENTS ====================
+
+def _changed_fields(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> List[str]:
+    """Top-level public fields that differ between two images of a document"""
+    keys = dict.fromkeys([*(before or {}), *(after or {})])
+    return [
+        key for key in keys
+        if key != "version" and (before or {}).get(key) != (after or {}).get(key)
+    ]
+
+
+def write_event(
+    collection_name: str,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Event for a (before, after) write as seen by db.py"""
+    event_type = "insert" if before is None else "delete" if after is None else "update"
+    document = after or before
+    event = {
+        "type": event_type,
+        "collection": collection_name,
+        "id": document.get("id"),
+        "version": after.get("version") if after else None,
+        "document": after,
+    }
+    if event_type == "update":
+        event["changed"] = _changed_fields(before, after)
+    return event
+
+
+def reset_event(collection_name: str) -> Dict[str, Any]:
+    """Event telling clients that writes to a collection may have been missed and they should refetch"""
+    return {"type": "reset", "collection": collection_name, "id": None, "version": None, "document": None}
+
+
+def change_event(collection_name: str, change: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """(event, before image) for a change stream document, None for operations clients don't see"""
+    operation = change.get("operationType")
+    if operation not in ("insert", "update", "replace", "delete"):
+        return None
+    after = db.public_document(change["fullDocument"]) if change.get("fullDocument") else None
+    before = db.public_document(change["fullDocumentBeforeChange"]) if change.get("fullDocumentBeforeChange") else None
+    if operation == "delete":
+        after = None
+    event = {
+        "type": "insert" if operation == "insert" else "delete" if operation == "delete" else "update",
+        "collection": collection_name,
+        "id": (after or before or {}).get("id"),
+        "version": after.get("version") if after else None,
+        "document": after,
+    }
+    if event["type"] == "update":
+        if before is not None and after is not None:
+            event["changed"] = _changed_fields(before, after)
+        else:
+            description = change.get("updateDescription") or {}
+            paths = [*description.get("updatedFields", {}), *description.get("removedFields", [])]
+            public = db.public_document({path.split(".")[0]: None for path in paths})
+            event["changed"] = [field for field in public if field != "version"]
+    return event, before
+
+
+# ==================== SUBSCRIPTIONS ====================
+
+class Subscription:
+    """One client's queue and filters. A None in the queue ends the stream."""
+
+    def __init__(self, collections: Optional[List[str]], filters: Dict[str, str]):
+        self.collections = collections
+        self.filters = filters
+        self.queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.closed = False
+
+    def matches(self, event: Dict[str, Any], before: Optional[Dict[str, Any]]) -> bool:
+        """Collections must match; filters match if either image of the document does.
+
+        Matching the before image too tells a client when a document leaves
+        its filter. Deletes without a before image can't be filtered and are
+        always delivered.
+        """
+        if self.collections and event["collection"] not in self.collections:
+            return False
+        images = [image for image in (before, event["document"]) if image]
+        if not images or not self.filters:
+            return True
+        return any(self._image_matches(event["collection"], image) for image in images)
+
+    def _image_matches(self, collection_name: str, document: Dict[str, Any]) -> bool:
+        for name, wanted in self.filters.items():
+            field, is_array = FILTER_FIELDS[name][collection_name]
+            value = document.get(field)
+            if not (wanted in value if is_array and isinstance(value, list) else value == wanted):
+                return False
+        return True
+
+    def deliver(self, item: Optional[Tuple[str, Dict[str, Any]]]):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Too slow to keep up: end the stream, the client resumes from its last event id
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+# ==================== EVENT HUB ====================
+
+class EventHub:
+    """Fans events from one source out to every matching subscriber.
+
+    The source is a change stream per collection (every write, from any
+    worker or tool) or, without a replica set, this process's own db.py
+    writes. Event ids are `<epoch>-<sequence>`, and the last
+    EVENTS_REPLAY_SIZE events are replayed to clients reconnecting with
+    Last-Event-ID.
+    """
+
+    def __init__(self):
+        self.subscribers: List[Subscription] = []
+        self.source: Optional[str] = None
+        self.epoch = secrets.token_hex(4)
+        self.sequence = 0
+        self.recent: "deque[Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]]" = deque(maxlen=EVENTS_REPLAY_SIZE)
+        self._tasks: List[asyncio.Task] = []
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """Pick the source and start it, once"""
+        async with self._start_lock:
+            if self.source is not None:
+                return
+            source = EVENTS_SOURCE
+            if source == "auto":
+                source = "changestream" if await _supports_change_streams() else "inprocess"
+            if source == "changestream":
+                pre_images = await _pre_images_enabled()
+                self._tasks = [asyncio.ensure_future(self._watch(name, pre_images)) for name in COLLECTIONS]
+            elif source != "inprocess":
+                raise ValueError(f"Unknown EVENTS_SOURCE: {EVENTS_SOURCE}")
+            self.source = source
+            print(f"Event source: {source}")
+
+    def publish(self, event: Dict[str, Any], before: Optional[Dict[str, Any]] = None):
+        self.sequence += 1
+        self.recent.append((self.sequence, event, before))
+        for subscriber in self.subscribers:
+            if subscriber.matches(event, before):
+                subscriber.deliver((f"{self.epoch}-{self.sequence}", event))
+
+    async def subscribe(
+        self,
+        collections: Optional[List[str]] = None,
+        filters: Optional[Dict[str, str]] = None,
+        last_event_id: Optional[str] = None
+    ) -> Subscription:
+        await self.start()
+        subscription = Subscription(collections, filters or {})
+        replay = [
+            (sequence, event) for sequence, event, before in self._replay(last_event_id)
+            if subscription.matches(event, before)
+        ]
+        # Leave room in the queue for live events
+        for sequence, event in replay[-(EVENTS_QUEUE_SIZE // 2):]:
+            subscription.deliver((f"{self.epoch}-{sequence}", event))
+        self.subscribers.append(subscription)
+        return subscription
+
+    def _replay(self, last_event_id: Optional[str]):
+        """Buffered events after `last_event_id`, if it came from this hub"""
+        epoch, _, sequence = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return []
+        return [item for item in self.recent if item[0] > int(sequence)]
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+
+    async def _watch(self, collection_name: str, pre_images: bool):
+        """Follow one collection's change stream, resuming after errors.
+
+        When the stream can't resume where it left off (its history rolled off
+        the oplog, the token is invalid, or the stream was invalidated) it
+        restarts from now, and once the new stream is open subscribers get a
+        reset event so they refetch what they may have missed.
+        """
+        options = {"full_document": "updateLookup"}
+        if pre_images:
+            options["full_document_before_change"] = "whenAvailable"
+        resume_token = None
+        lost = False
+        delay = 1.0
+        while True:
+            try:
+                collection = db.get_database()[collection_name]
+                async with collection.watch(resume_after=resume_token, **options) as stream:
+                    delay = 1.0
+                    if lost:
+                        lost = False
+                        self.publish(reset_event(collection_name))
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        if change.get("operationType") == "invalidate":
+                            resume_token = None
+                            lost = True
+                            break
+                        converted = change_event(collection_name, change)
+                        if converted:
+                            self.publish(*converted)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                if _resumable(e):
+                    print(f"Change stream on {collection_name} failed, retrying in {delay:.0f}s: {e}")
+                else:
+                    print(f"Change stream on {collection_name} cannot resume, restarting in {delay:.0f}s: {e}")
+                    resume_token = None
+                    lost = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        self.subscribers = []
+        self.source = None
+
+
+async def _supports_change_streams() -> bool:
+    """Change streams need a replica set or a sharded cluster"""
+    try:
+        hello = await db.get_database().command("hello")
+    except Exception as e:
+        print(f"Could not detect change stream support, using in-process events: {e}")
+        return False
+    return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+
+
+def _resumable(error: PyMongoError) -> bool:
+    """Whether retrying from the same resume token can succeed"""
+    if error.has_error_label("NonResumableChangeStreamError"):
+        return False
+    return not (isinstance(error, OperationFailure) and error.code in NON_RESUMABLE_CODES)
+
+
+async def _pre_images_enabled() -> bool:
+    """Whether every collection records pre-images (turned on by indexes.ensure_pre_images)"""
+    try:
+        result = await db.get_database().command("listCollections", filter={"name": {"$in": list(COLLECTIONS)}})
+    except OperationFailure as e:
+        print(f"Could not read change stream pre-image settings: {e}")
+        return False
+    enabled = {
+        info["name"] for info in result["cursor"]["firstBatch"]
+        if info.get("options", {}).get("changeStreamPreAndPostImages", {}).get("enabled")
+    }
+    if enabled != set(COLLECTIONS):
+        print("Change stream pre-images are off; run `python indexes.py` to enable them")
+        return False
+    return True
+
+
+# Global hub, started by the first subscriber
+_hub: Optional[EventHub] = None
+
+
+def get_hub() -> EventHub:
+    global _hub
+    if _hub is None:
+        _hub = EventHub()
+    return _hub
+
+
+async def close_hub():
+    """Stop the sources and end every open stream"""
+    global _hub
+    if _hub:
+        await _hub.close()
+        _hub = None
+
+
+def _on_write(collection_name: str, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+    """Publish this process's writes when there is no change stream to do it"""
+    if _hub is None or _hub.source != "inprocess":
+        return
+    for before, after in changes:
+        _hub.publish(write_event(collection_name, before, after), before)
+
+
+db.add_write_listener(_on_write)
+
+
+# ==================== SERVER-SENT EVENTS ====================
+
+async def sse_stream(subscription: Subscription) -> AsyncIterator[bytes]:
+    """Encode a subscription as text/event-stream until it closes, times out or the client leaves"""
+    hub = get_hub()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EVENTS_MAX_STREAM_SECONDS
+    try:
+        yield f"retry: {EVENTS_RETRY_MS}\n\n".encode()
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), timeout=min(EVENTS_HEARTBEAT, remaining))
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            event_id, event = item
+            yield b"id: " + event_id.encode() + b"\ndata: " + orjson.dumps(event, default=str) + b"\n\n"
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,255 @@
+from pymongo import ASCENDING, GEOSPHERE, IndexModel, UpdateOne
+from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+import json
+import os
+import re
+import unicodedata
+
+
+# Geo Configuration
+# Offline gazetteer of countries, regions and cities; swap in a larger file with the same shape
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.json"))
+
+# Radius MongoDB uses to turn $centerSphere distances into radians
+EARTH_RADIUS_KM = 6378.1
+
+# Derived fields stored next to `location`: the canonical display label, a
+# filter key for every level of the place (country, region, city) and a
+# GeoJSON point for cities
+LABEL_FIELD = "locationLabel"
+KEYS_FIELD = "locationKeys"
+POINT_FIELD = "locationPoint"
+GEO_FIELDS = [LABEL_FIELD, KEYS_FIELD, POINT_FIELD]
+
+# Countries whose cities are labelled with their region code ("Palo Alto, CA")
+_REGION_LABEL_COUNTRIES = {"US", "CA", "AU"}
+
+_SEPARATOR_RE = re.compile(r"[^\w,]+", re.UNICODE)
+
+
+# ==================== NORMALIZATION ====================
+
+def _parts(text: str) -> List[str]:
+    """Comma-separated parts of a location, without accents, case, dots or extra spaces"""
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    text = _SEPARATOR_RE.sub(" ", text.lower().replace(".", ""))
+    return [" ".join(part.split()) for part in text.split(",") if part.strip()]
+
+
+def _slug(text: str) -> str:
+    return "-".join(" ".join(_parts(text)).split())
+
+
+# ==================== GAZETTEER ====================
+
+class Place:
+    """A resolved location: its label, the filter keys of each level it sits in
+    (least specific first) and, for cities, its coordinates
+    """
+
+    def __init__(self, label: str, keys: List[str], point: Optional[Tuple[float, float]], qualifiers: set):
+        self.label = label
+        self.keys = keys
+        self.point = point
+        # Normalized names and codes that may follow the place after a comma
+        self.qualifiers = qualifiers
+
+
+class Gazetteer:
+    """Name and alias lookup over the bundled countries, regions and cities.
+
+    A location is resolved from its first comma-separated part; later parts
+    ("CA", "United States") must match the candidate's region or country.
+    Cities win over regions and regions over countries, and among
+    same-named cities the one listed first in the file wins.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.countries: Dict[str, List[Place]] = {}
+        self.regions: Dict[str, List[Place]] = {}
+        self.cities: Dict[str, List[Place]] = {}
+
+        countries = {}
+        for country in data["countries"]:
+            names = {" ".join(_parts(name)) for name in [country["name"], *country.get("aliases", [])]}
+            place = Place(
+                country["name"],
+                [f"country:{country['code'].lower()}"],
+                None,
+                names | {country["code"].lower()}
+            )
+            countries[country["code"]] = (country, place)
+            for name in names:
+                self.countries.setdefault(name, []).append(place)
+
+        regions = {}
+        for region in data["regions"]:
+            country, country_place = countries[region["country"]]
+            code = f"{region['country']}-{region['code']}".lower()
+            place = Place(
+                f"{region['name']}, {country['name']}",
+                [*country_place.keys, f"region:{code}"],
+                None,
+                country_place.qualifiers | {region["code"].lower(), " ".join(_parts(region["name"]))}
+            )
+            regions[(region["country"], region["code"])] = place
+            self.regions.setdefault(" ".join(_parts(region["name"])), []).append(place)
+
+        for city in data["cities"]:
+            country, country_place = countries[city["country"]]
+            region_place = regions.get((city["country"], city.get("region")))
+            parent = region_place or country_place
+            if city["name"] == country["name"]:
+                label = city["name"]
+            elif region_place and city["country"] in _REGION_LABEL_COUNTRIES:
+                label = f"{city['name']}, {city['region']}"
+            else:
+                label = f"{city['name']}, {country['name']}"
+            place = Place(
+                label,
+                [*parent.keys, f"city:{parent.keys[-1].split(':', 1)[1]}-{_slug(city['name'])}"],
+                (city["lng"], city["lat"]),
+                parent.qualifiers
+            )
+            for name in [city["name"], *city.get("aliases", [])]:
+                self.cities.setdefault(" ".join(_parts(name)), []).append(place)
+
+    def resolve(self, text: str) -> Optional[Place]:
+        """The place a free-form location names, or None if it isn't in the gazetteer"""
+        parts = _parts(text)
+        if not parts:
+            return None
+        place = self._lookup(parts[0], parts[1:])
+        if place is None and len(parts) == 1 and " " in parts[0]:
+            # "Palo Alto CA": try the last word as a qualifier
+            head, _, qualifier = parts[0].rpartition(" ")
+            place = self._lookup(head, [qualifier])
+        return place
+
+    def _lookup(self, head: str, qualifiers: List[str]) -> Optional[Place]:
+        for index in (self.cities, self.regions, self.countries):
+            for place in index.get(head, []):
+                if all(qualifier in place.qualifiers for qualifier in qualifiers):
+                    return place
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Get the gazetteer, reading GAZETTEER_PATH on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with open(GAZETTEER_PATH, encoding="utf-8") as f:
+            _gazetteer = Gazetteer(json.load(f))
+    return _gazetteer
+
+
+def resolve(location: Any) -> Optional[Place]:
+    return get_gazetteer().resolve(location) if isinstance(location, str) else None
+
+
+def label(location: str) -> str:
+    """Canonical display label of a location, or the trimmed text when it is unknown"""
+    place = resolve(location)
+    return place.label if place else location.strip()
+
+
+# ==================== DERIVED FIELDS ====================
+
+def location_fields(location: Any) -> Dict[str, Any]:
+    """Derived field values for a `location` string; unknown places keep only a label"""
+    place = resolve(location)
+    if place is None:
+        text = location.strip() if isinstance(location, str) else ""
+        return {LABEL_FIELD: text or None, KEYS_FIELD: [], POINT_FIELD: None}
+    point = {"type": "Point", "coordinates": list(place.point)} if place.point else None
+    return {LABEL_FIELD: place.label, KEYS_FIELD: place.keys, POINT_FIELD: point}
+
+
+def location_fields_update(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Derived field values for a document or $set, if it contains `location`"""
+    return location_fields(data["location"]) if "location" in data else {}
+
+
+def index_models() -> List[IndexModel]:
+    """Exact place lookups seek the multikey index; near queries use 2dsphere"""
+    return [
+        IndexModel([(KEYS_FIELD, ASCENDING), ("id", ASCENDING)], name="locationKeys_id"),
+        IndexModel([(POINT_FIELD, GEOSPHERE)], name="locationPoint_2dsphere"),
+    ]
+
+
+# ==================== QUERIES ====================
+
+def location_filter(location: str) -> Dict[str, Any]:
+    """Exact match on a known place at any level ("Berlin", "California",
+    "United States"); anything else keeps the case-insensitive substring match
+    """
+    place = resolve(location)
+    if place is None:
+        return {"location": {"$regex": location, "$options": "i"}}
+    return {KEYS_FIELD: place.keys[-1]}
+
+
+def parse_near(near: str) -> Tuple[float, float]:
+    """Parse "lat,lng" into a (lat, lng) pair"""
+    try:
+        lat, lng = (float(value) for value in near.split(","))
+    except ValueError:
+        raise ValueError("near must be 'lat,lng'")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("near is out of range: latitude must be within ±90 and longitude within ±180")
+    return lat, lng
+
+
+def near_filter(lat: float, lng: float, radius_km: float) -> Dict[str, Any]:
+    """Documents located within `radius_km` of a point, served by the 2dsphere index.
+
+    $geoWithin (unlike $near) leaves the sort order alone and works with
+    count_documents, so paging and totals behave as for any other filter.
+    """
+    if radius_km <= 0:
+        raise ValueError("radius_km must be positive")
+    return {POINT_FIELD: {"$geoWithin": {"$centerSphere": [[lng, lat], radius_km / EARTH_RADIUS_KM]}}}
+
+
+# ==================== BACKFILL ====================
+
+async def backfill_locations(
+    database,
+    collection_name: str,
+    batch_size: int = 500,
+    missing_only: bool = False
+) -> int:
+    """Recompute the location fields of every document (or only of those that
+    never had them) in batches; returns documents updated
+    """
+    collection = database[collection_name]
+    query = {KEYS_FIELD: {"$exists": False}} if missing_only else {}
+    updated = 0
+    batch = []
+    async for document in collection.find(query, {"_id": 1, "location": 1}):
+        batch.append(UpdateOne({"_id": document["_id"]}, {"$set": location_fields(document.get("location"))}))
+        if len(batch) >= batch_size:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+
+async def _main():
+    # db imports this module, so it is only pulled in when run as a script
+    import db
+    for collection_name in ("investors", "startups"):
+        updated = await backfill_locations(db.get_database(), collection_name)
+        print(f"Backfilled locations for {collection_name}: {updated} documents updated")
+    db.close_database()
+
+
+if __name__ == "__main__":
+    # python geo.py -> canonicalize locations of existing documents
+    asyncio.run(_main())
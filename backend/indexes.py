@@ -0,0 +1,209 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from typing import List, Dict, Any
+import asyncio
+import sys
+import db
+import geo
+import text_search
+
+
+# ==================== INDEX MANIFEST ====================
+
+# Stored fields behind /api/startups?sort_by=... (funding and growth sort on
+# their numeric shadow fields, which also serve the min/max_funding range)
+STARTUP_SORT_FIELDS = ["matchPercentage", "teamSize", "founded", "fundingAmount", "growthPercent"]
+
+# Every index the data layer relies on. Compound indexes follow the
+# equality -> sort -> range rule and always end in `id`, which is the
+# tie-breaker used by keyset pagination (see db._cursor_page).
+INDEX_MANIFEST: Dict[str, List[IndexModel]] = {
+    "investors": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("focusIndustries", ASCENDING), ("id", ASCENDING)], name="focusIndustries_id"),
+        IndexModel([("investmentStages", ASCENDING), ("id", ASCENDING)], name="investmentStages_id"),
+        IndexModel([("status", ASCENDING), ("id", ASCENDING)], name="status_id"),
+        IndexModel([("dealSize", ASCENDING), ("id", ASCENDING)], name="dealSize_id"),
+        IndexModel(
+            [("investmentRangeMin", ASCENDING), ("investmentRangeMax", ASCENDING)],
+            name="investmentRange_amounts"
+        ),
+        # Only incubators/accelerators carry `duration`, so this stays tiny
+        IndexModel(
+            [("duration", ASCENDING)],
+            name="incubators_partial",
+            partialFilterExpression={"duration": {"$exists": True}}
+        ),
+        text_search.text_index_model("investors"),
+        *geo.index_models(),
+    ],
+    "startups": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("industry", ASCENDING), ("id", ASCENDING)], name="industry_id"),
+        IndexModel([("fundingStage", ASCENDING), ("id", ASCENDING)], name="fundingStage_id"),
+        text_search.text_index_model("startups"),
+        *geo.index_models(),
+    ]
+    + [
+        IndexModel([(field, ASCENDING), ("id", ASCENDING)], name=f"{field}_id")
+        for field in STARTUP_SORT_FIELDS
+    ]
+    + [
+        IndexModel([(prefix, ASCENDING), (field, ASCENDING), ("id", ASCENDING)], name=f"{prefix}_{field}_id")
+        for prefix in ("industry", "fundingStage")
+        for field in STARTUP_SORT_FIELDS
+    ],
+}
+
+
+async def ensure_indexes(database=None) -> Dict[str, List[str]]:
+    """Create every index in the manifest; existing identical indexes are left alone"""
+    database = database if database is not None else db.get_database()
+    created = {}
+    for collection_name, models in INDEX_MANIFEST.items():
+        try:
+            created[collection_name] = await database[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            # A conflicting legacy index or duplicate ids must not keep the API down
+            print(f"Index provisioning failed for {collection_name}: {e}")
+            created[collection_name] = []
+    print(f"Indexes ensured: {', '.join(INDEX_MANIFEST)}")
+    return created
+
+
+# ==================== CHANGE STREAM PRE-IMAGES ====================
+
+async def ensure_pre_images(database=None) -> bool:
+    """Record pre-images (MongoDB 6.0+) so change stream deletes carry ids and updates
+    can be filtered on old values (see events.py); returns whether every collection has them"""
+    database = database if database is not None else db.get_database()
+    if db.STORAGE_BACKEND == "embedded":
+        # No change streams; events come from this process's writes
+        return False
+    try:
+        for collection_name in INDEX_MANIFEST:
+            await database.command("collMod", collection_name, changeStreamPreAndPostImages={"enabled": True})
+    except OperationFailure as e:
+        print(f"Change stream pre-images unavailable: {e}")
+        return False
+    print(f"Change stream pre-images enabled: {', '.join(INDEX_MANIFEST)}")
+    return True
+
+
+# ==================== DERIVED FIELDS ====================
+
+async def ensure_search_grams(database=None) -> Dict[str, int]:
+    """Fill in the search grams (see text_search.py) of documents stored before
+    they existed, which $text searches would never find; returns documents updated
+    """
+    database = database if database is not None else db.get_database()
+    updated = {}
+    for collection_name in INDEX_MANIFEST:
+        updated[collection_name] = await text_search.rebuild_search_grams(database, collection_name, missing_only=True)
+        if updated[collection_name]:
+            print(f"Backfilled search grams for {collection_name}: {updated[collection_name]} documents updated")
+    return updated
+
+
+async def ensure_location_fields(database=None) -> Dict[str, int]:
+    """Fill in the location fields (see geo.py) of documents stored before they
+    existed, so place filters, facets and stats see them; returns documents updated
+    """
+    database = database if database is not None else db.get_database()
+    updated = {}
+    for collection_name in INDEX_MANIFEST:
+        updated[collection_name] = await geo.backfill_locations(database, collection_name, missing_only=True)
+        if updated[collection_name]:
+            print(f"Backfilled locations for {collection_name}: {updated[collection_name]} documents updated")
+    return updated
+
+
+# ==================== QUERY PLAN CHECK ====================
+
+def _sort(field: str, direction: int) -> List[Any]:
+    """Sort used by both page and cursor mode for a given sort field"""
+    return [[field, direction]] if field == "id" else [[field, direction], ["id", direction]]
+
+
+# Representative query shapes issued by db.py; values are irrelevant to the plan
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"collection": "investors", "filter": {"id": 1}},
+    {"collection": "investors", "filter": {"focusIndustries": "FinTech"}, "sort": _sort("id", 1)},
+    {"collection": "investors", "filter": {"investmentStages": "Seed"}, "sort": _sort("id", 1)},
+    {"collection": "investors", "filter": {"status": "Active"}, "sort": _sort("id", 1)},
+    {"collection": "investors", "filter": {"dealSize": "large"}, "sort": _sort("id", 1)},
+    {"collection": "investors", "filter": {"id": {"$gt": 100}}, "sort": _sort("id", 1)},
+    {
+        "collection": "investors",
+        "filter": {"investmentRangeMin": {"$lte": 5e6}, "investmentRangeMax": {"$gte": 5e6}}
+    },
+    {"collection": "investors", "filter": {"duration": {"$exists": True}}},
+    {"collection": "investors", "filter": {"status": "Active", "duration": {"$exists": False}}},
+    {"collection": "investors", "filter": text_search.text_query("sequoia"), "sort": text_search.RELEVANCE_SORT},
+    {"collection": "investors", "filter": geo.location_filter("San Francisco"), "sort": _sort("id", 1)},
+    {"collection": "investors", "filter": geo.near_filter(37.77, -122.42, 50), "sort": _sort("id", 1)},
+    {"collection": "startups", "filter": {"id": 1}},
+    {"collection": "startups", "filter": {"industry": "FinTech"}, "sort": _sort("id", 1)},
+    {"collection": "startups", "filter": {"fundingStage": "Seed"}, "sort": _sort("id", 1)},
+    {"collection": "startups", "filter": {"teamSize": {"$gte": 10, "$lte": 50}}, "sort": _sort("id", 1)},
+    {"collection": "startups", "filter": {"fundingAmount": {"$gte": 1e6, "$lte": 2e7}}, "sort": _sort("id", 1)},
+    {"collection": "startups", "filter": {"industry": "FinTech", "teamSize": {"$gte": 10}}, "sort": _sort("teamSize", -1)},
+    {"collection": "startups", "filter": text_search.text_query("fin"), "sort": text_search.RELEVANCE_SORT},
+    {"collection": "startups", "filter": geo.location_filter("Berlin"), "sort": _sort("id", 1)},
+    {"collection": "startups", "filter": geo.near_filter(52.52, 13.40, 50), "sort": _sort("id", 1)},
+] + [
+    {"collection": "startups", "filter": filter_query, "sort": _sort(field, direction)}
+    for field in STARTUP_SORT_FIELDS
+    for direction in (ASCENDING, DESCENDING)
+    for filter_query in ({}, {"industry": "FinTech"}, {"fundingStage": "Seed"})
+]
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flatten the stage names of a winning plan tree"""
+    stages = [plan.get("stage")]
+    for child in plan.get("inputStages", []) + [plan.get("inputStage")]:
+        if child:
+            stages.extend(_plan_stages(child))
+    return stages
+
+
+async def check_query_plans(database=None) -> List[Dict[str, Any]]:
+    """Explain every query shape and return the ones whose winning plan is a COLLSCAN"""
+    database = database if database is not None else db.get_database()
+    offenders = []
+    for shape in QUERY_SHAPES:
+        find = {"find": shape["collection"], "filter": shape["filter"]}
+        if shape.get("sort"):
+            find["sort"] = dict(shape["sort"])
+        explained = await database.command({"explain": find, "verbosity": "queryPlanner"})
+        planner = explained["queryPlanner"]
+        # Slot-based engine plans nest the classic tree under `queryPlan`
+        winning = planner["winningPlan"].get("queryPlan", planner["winningPlan"])
+        if "COLLSCAN" in _plan_stages(winning):
+            offenders.append(shape)
+    return offenders
+
+
+async def _main(argv: List[str]) -> int:
+    database = db.get_database()
+    await ensure_indexes(database)
+    await ensure_pre_images(database)
+    await ensure_search_grams(database)
+    await ensure_location_fields(database)
+    status = 0
+    if "--check" in argv:
+        offenders = await check_query_plans(database)
+        for shape in offenders:
+            print(f"COLLSCAN: {shape['collection']} filter={shape['filter']} sort={shape.get('sort')}")
+        print(f"Checked {len(QUERY_SHAPES)} query shapes, {len(offenders)} collection scans")
+        status = 1 if offenders else 0
+    db.close_database()
+    return status
+
+
+if __name__ == "__main__":
+    # python indexes.py          -> apply the manifest, enable change stream pre-images
+    #                               and fill in missing search grams and location fields
+    # python indexes.py --check  -> apply, then fail if any query shape scans a collection
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
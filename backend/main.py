@@ -1,19 +1,60 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable, Tuple, Type
+from functools import wraps
 import uvicorn
+import orjson
+import asyncio
+import hashlib
 import os
+import re
+import signal
+import sys
 from dotenv import load_dotenv
+import cache
 import db
+import indexes
+import events
+import geo
+import matching
+import metrics
+import snapshot
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # Optional dependency; gzip alone is used without it
+    BrotliMiddleware = None
 
 load_dotenv()
 
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 500))
+
+# Cache-Control sent with conditional GETs. "no-cache" still lets clients keep
+# the body, they just revalidate it with If-None-Match every time.
+LIST_CACHE_CONTROL = os.getenv("LIST_CACHE_CONTROL", "no-cache")
+FILTER_CACHE_CONTROL = os.getenv("FILTER_CACHE_CONTROL", "public, max-age=60")
+STATS_CACHE_CONTROL = os.getenv("STATS_CACHE_CONTROL", "no-cache")
+
+# Seconds a server told to stop (SIGTERM) keeps accepting requests while /ready
+# answers 503, so load balancers take it out of rotation before its listeners
+# close. SIGINT stops at once.
+DRAIN_DELAY = float(os.getenv("DRAIN_DELAY", 5))
+# Longest /ready waits for a MongoDB ping before reporting not ready
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", 2))
+
+# Most ids a single batch lookup may resolve
+MAX_LOOKUP_IDS = int(os.getenv("MAX_LOOKUP_IDS", 5000))
+
 # Create FastAPI app
 app = FastAPI(
     title="Visnex API",
     description="API for managing startups and investors",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -25,6 +66,79 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requests whose response is still being sent, and whether shutdown has begun
+_in_flight = 0
+_draining = False
+
+
+def _begin_drain():
+    """Report draining on /ready and end the event streams, which would otherwise
+    hold the server's graceful shutdown open until it times out"""
+    global _draining
+    if not _draining:
+        _draining = True
+        asyncio.ensure_future(events.close_hub())
+
+
+def _drain_on_exit(handle_exit: Callable) -> Callable:
+    """Wrap uvicorn's signal handler (gunicorn's uvicorn workers use it too) so
+    draining starts as the signal arrives, not in the lifespan shutdown, which
+    only runs once every connection has closed
+    """
+    @wraps(handle_exit)
+    def wrapper(server, sig, frame):
+        if sig == signal.SIGTERM and not _draining and DRAIN_DELAY > 0:
+            _begin_drain()
+            asyncio.get_event_loop().call_later(DRAIN_DELAY, handle_exit, server, sig, frame)
+            return
+        _begin_drain()
+        handle_exit(server, sig, frame)
+    return wrapper
+
+
+uvicorn.Server.handle_exit = _drain_on_exit(uvicorn.Server.handle_exit)
+
+
+class InFlightMiddleware:
+    """Counts HTTP requests until their response body is fully sent, as reported by /ready"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        _in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight -= 1
+
+
+app.add_middleware(InFlightMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+class IdentityEncodingMiddleware:
+    """Keeps compression away from streams that must flush every message (server-sent events)"""
+
+    def __init__(self, app, paths: List[str]):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            scope = {**scope, "headers": [(k, v) for k, v in scope["headers"] if k != b"accept-encoding"]}
+        await self.app(scope, receive, send)
+
+
+# Response compression: brotli when available (falling back to gzip per client), else gzip
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+app.add_middleware(IdentityEncodingMiddleware, paths=["/api/events"])
+
 
 # ==================== PYDANTIC MODELS ====================
 
@@ -33,6 +147,11 @@ class InvestmentRange(BaseModel):
     max: str
 
 
+class InvestmentRangePatch(BaseModel):
+    min: Optional[str] = None
+    max: Optional[str] = None
+
+
 class InvestorCreate(BaseModel):
     name: str
     type: str
@@ -63,6 +182,29 @@ class InvestorUpdate(BaseModel):
     dealSize: Optional[str] = None
 
 
+class InvestorPatch(InvestorUpdate):
+    investmentRange: Optional[InvestmentRangePatch] = None
+
+
+class IncubatorCreate(BaseModel):
+    """An incubator or accelerator program, stored with the investors (its `duration` tells it apart)"""
+    name: str
+    type: str
+    logo: str
+    location: str
+    status: str = "Active"
+    duration: str
+    description: str
+    image: Optional[str] = None
+    equity: Optional[str] = None
+    funding: Optional[str] = None
+    focusAreas: List[str] = []
+    batchSize: Optional[int] = None
+    successRate: Optional[str] = None
+    alumni: Optional[int] = None
+    programHighlight: Optional[str] = None
+
+
 class StartupCreate(BaseModel):
     name: str
     logo: str
@@ -78,6 +220,17 @@ class StartupCreate(BaseModel):
     categories: List[str]
     foundingTeam: List[str] = []
     tags: List[str] = []
+    matchPercentage: Optional[int] = Field(None, ge=0, le=100)
+
+
+class LookupItem(BaseModel):
+    collection: str = Field(..., pattern="^(investors|startups)$")
+    id: int
+
+
+class LookupRequest(BaseModel):
+    items: List[LookupItem] = Field(..., max_length=MAX_LOOKUP_IDS)
+    fields: Optional[List[str]] = None
 
 
 class StartupUpdate(BaseModel):
@@ -95,21 +248,362 @@ class StartupUpdate(BaseModel):
     categories: Optional[List[str]] = None
     foundingTeam: Optional[List[str]] = None
     tags: Optional[List[str]] = None
+    matchPercentage: Optional[int] = Field(None, ge=0, le=100)
+
+
+# ==================== FIELDSET HELPERS ====================
+
+_FIELD_RE = re.compile(r"^[A-Za-z][A-Za-z0-9]*(\.[A-Za-z][A-Za-z0-9]*)*$")
+
+FIELDS_DESCRIPTION = "Comma-separated sparse fieldset, e.g. id,name,logo (id is always returned)"
+
+
+def _check_fields(names: Optional[List[str]]) -> Optional[List[str]]:
+    """Reject field names that are anything but plain (dotted) paths, or that overlap.
+
+    A path and one inside it (investmentRange, investmentRange.min) can't be
+    projected together; `id` counts as requested since it always is.
+    """
+    if not names:
+        return None
+    invalid = [name for name in names if not _FIELD_RE.match(name)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid)}")
+    names = list(dict.fromkeys(names))
+    requested = ["id", *names]
+    overlapping = [name for name in names if any(name.startswith(f"{other}.") for other in requested)]
+    if overlapping:
+        raise HTTPException(status_code=400, detail=f"Fields overlap a parent field: {', '.join(overlapping)}")
+    return names
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a `fields` query parameter into field names"""
+    if not fields:
+        return None
+    return _check_fields([name.strip() for name in fields.split(",") if name.strip()])
+
+
+def _sparse(document: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Drop the version a sparse detail read fetched for its ETag unless it was asked for"""
+    if fields and "version" not in fields:
+        document.pop("version", None)
+    return document
+
+
+FACETS_DESCRIPTION = (
+    "Comma-separated fields to count values of under the other active filters, "
+    "e.g. industry,fundingStage,tags"
+)
+
+
+def _parse_facets(collection_name: str, facets: Optional[str]) -> Optional[List[str]]:
+    """Split a `facets` query parameter into facet names"""
+    if not facets:
+        return None
+    try:
+        return db.check_facets(collection_name, [name.strip() for name in facets.split(",") if name.strip()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ==================== LOCATION HELPERS ====================
+
+LOCATION_DESCRIPTION = (
+    "A city, region or country; known places (e.g. 'San Francisco', 'SF, CA', 'Germany') "
+    "match exactly, anything else by substring"
+)
+NEAR_DESCRIPTION = "'lat,lng': keep documents located within radius_km of this point"
+SEARCH_DESCRIPTION = (
+    "Words or word beginnings; documents matching any of them are returned, "
+    "those matching more ranked first (not a phrase search)"
+)
+
+
+def _parse_near(near: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Split a `near` query parameter into (lat, lng)"""
+    if near is None:
+        return None
+    try:
+        return geo.parse_near(near)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ==================== LOOKUP HELPERS ====================
+
+IDS_DESCRIPTION = (
+    f"Comma-separated ids (up to {MAX_LOOKUP_IDS}) to fetch in this order; "
+    "other filters and pagination are ignored"
+)
+
+
+def _parse_ids(ids: str) -> List[int]:
+    """Split an `ids` query parameter into integer ids"""
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if len(parsed) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LOOKUP_IDS} ids per request")
+    return parsed
+
+
+async def _ids_page(collection_name: str, ids: str, fields: Optional[List[str]]) -> Dict[str, Any]:
+    """List-endpoint response for an explicit set of ids, in request order"""
+    requested = _parse_ids(ids)
+    try:
+        documents = await db.find_by_ids(collection_name, requested, fields)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    found = {document["id"] for document in documents}
+    return {
+        "data": documents,
+        "total": len(documents),
+        "missing": [document_id for document_id in dict.fromkeys(requested) if document_id not in found]
+    }
+
+
+# ==================== CONDITIONAL GET HELPERS ====================
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag, as RFC 9110 requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == opaque
+        for candidate in (item.strip() for item in if_none_match.split(","))
+    )
+
+
+def conditional(*depends_on: str, cache_control: str = LIST_CACHE_CONTROL):
+    """Route dependency giving a GET an ETag from the versions of `depends_on`.
+
+    db.py bumps a collection's version on every write, so the ETag changes
+    exactly when the response can. A matching If-None-Match is answered with
+    304 before the handler runs, i.e. without touching MongoDB. The ETag is
+    weak: compression sends other bytes for the same representation.
+
+    No validator is issued when versions are per process and several workers
+    serve the app: another worker's write would not change the ETag.
+    """
+    async def dependency(request: Request, response: Response):
+        shared_cache = cache.get_cache()
+        if not shared_cache.versions_shared():
+            return
+        versions = await shared_cache.versions(list(depends_on))
+        state = ":".join(f"{name}={version}" for name, version in zip(depends_on, versions))
+        digest = hashlib.blake2b(
+            f"{await shared_cache.epoch()}|{request.url.path}?{request.url.query}|{state}".encode(),
+            digest_size=16
+        ).hexdigest()
+        headers = {"ETag": f'W/"{digest}"', "Cache-Control": cache_control}
+        if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return Depends(dependency)
+
+
+# ==================== VERSION HELPERS ====================
+
+def _version_etag(document: Dict[str, Any], fields: Optional[List[str]] = None) -> str:
+    """Weak ETag of a single document (or of a sparse fieldset of it), derived
+    from its version counter, which If-Match sends back
+    """
+    etag = str(document.get("version") or 0)
+    if fields:
+        etag += "." + hashlib.blake2b(",".join(sorted(fields)).encode(), digest_size=8).hexdigest()
+    return f'W/"{etag}"'
+
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Expected document version from an If-Match header ('*' or absent means any)"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        # A sparse fieldset's ETag carries the same version before its field hash
+        return int(value.strip('"').split(".")[0])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid If-Match header: {if_match}")
+
+
+async def _apply_update(
+    update: Callable,
+    label: str,
+    document_id: int,
+    update_data: Dict[str, Any],
+    if_match: Optional[str],
+    response: Response
+) -> Dict[str, Any]:
+    """Run a db update, mapping a missing document to 404 and a stale version to 412"""
+    expected_version = _parse_if_match(if_match)
+    try:
+        result = await update(document_id, update_data, expected_version=expected_version)
+    except db.VersionConflict as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"{label} with id {document_id} not found")
+    response.headers["ETag"] = _version_etag(result)
+    return result
+
+
+# ==================== BULK HELPERS ====================
+
+# Rows validated before each insert_many
+BULK_BATCH_SIZE = 500
+
+# Keys of a wrapping JSON object whose lists are imported, as in the seed files
+# in frontend/src/data (investorsData.json lists incubators on their own)
+BULK_LIST_KEYS = {"investors": ["investors", "incubators"], "startups": ["startups"]}
+
+
+def _validation_message(error: ValidationError) -> str:
+    """Compact one-line description of a validation error"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+async def _bulk_rows(request: Request, collection_name: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (row number, row) pairs from the request body.
+
+    NDJSON bodies are read line by line as they stream in. A JSON body may be
+    a list of rows or an object wrapping lists under BULK_LIST_KEYS, like
+    {"startups": [...]}, which is the format of the seed files in
+    frontend/src/data; rows are numbered across those lists in order.
+    """
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = orjson.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if isinstance(body, dict):
+            lists = [body[key] for key in BULK_LIST_KEYS[collection_name] if key in body]
+            body = [row for rows in lists if isinstance(rows, list) for row in rows] if lists else None
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail=f"Expected a list of {collection_name}")
+        for number, row in enumerate(body, start=1):
+            yield number, row
+        return
+    
+    buffer = b""
+    number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+def _investor_model(row: Any) -> Type[BaseModel]:
+    """Bulk investor rows are incubators when they have a program duration"""
+    return IncubatorCreate if isinstance(row, dict) and "duration" in row else InvestorCreate
+
+
+def _validate_row(model: Any, row: Any) -> BaseModel:
+    """Validate a bulk row with a model, or with the model a callable picks for the row"""
+    if isinstance(model, type):
+        return model.model_validate_json(row) if isinstance(row, bytes) else model.model_validate(row)
+    if isinstance(row, bytes):
+        row = orjson.loads(row)
+    return model(row).model_validate(row)
+
+
+async def _bulk_import(
+    request: Request,
+    collection_name: str,
+    model: Any,
+    create_batch: Callable
+) -> Dict[str, Any]:
+    """Validate rows with `model` (a model, or a callable picking one per row)
+    and write them in batches, reporting errors per row; unset optional
+    fields are left out of the stored documents
+    """
+    inserted = 0
+    errors = []
+    batch = []
+    batch_rows = []
+    
+    async def flush():
+        nonlocal inserted
+        result = await create_batch(list(batch))
+        inserted += result["inserted"]
+        errors.extend({"row": batch_rows[item["index"]], "error": item["error"]} for item in result["errors"])
+        batch.clear()
+        batch_rows.clear()
+    
+    async for number, row in _bulk_rows(request, collection_name):
+        try:
+            item = _validate_row(model, row)
+        except ValidationError as e:
+            errors.append({"row": number, "error": _validation_message(e)})
+            continue
+        except ValueError as e:
+            errors.append({"row": number, "error": f"Invalid JSON: {e}"})
+            continue
+        batch.append(item.model_dump(exclude_none=True))
+        batch_rows.append(number)
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    
+    errors.sort(key=lambda item: item["row"])
+    return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+
+def _ndjson_response(documents: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Stream documents as newline-delimited JSON"""
+    async def generate():
+        async for document in documents:
+            yield orjson.dumps(document, default=str) + b"\n"
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 # ==================== STARTUP EVENTS ====================
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database connection on startup"""
-    db.get_database()
+    """Initialize database connection and indexes on startup"""
+    global _draining
+    _draining = False
+    await db.warm_up()
+    if os.getenv("AUTO_CREATE_INDEXES", "true").lower() == "true":
+        await indexes.ensure_indexes()
+        await indexes.ensure_pre_images()
+        await indexes.ensure_search_grams()
+        await indexes.ensure_location_fields()
+    await db.ensure_id_counters()
+    if snapshot.SNAPSHOT_ENGINE:
+        # Loads in the background; MongoDB answers list queries until it is ready
+        snapshot.get_engine().schedule_load()
     print("Application started successfully")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection on shutdown"""
+    """Close event streams left open, the database connection and cache.
+
+    Runs after the server has stopped accepting connections and waited for
+    open ones (see _drain_on_exit for what happens when the signal arrives).
+    """
+    await events.close_hub()
+    await snapshot.close_engine()
     db.close_database()
+    await cache.close_cache()
     print("Application shutdown successfully")
 
 
@@ -132,47 +626,121 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check endpoint; see /ready for dependencies"""
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: MongoDB answers a ping and the app is not draining"""
+    body: Dict[str, Any] = {"status": "ready", "inFlight": _in_flight}
+    if _draining:
+        body["status"] = "draining"
+    else:
+        try:
+            body["pingMs"] = round(await asyncio.wait_for(db.ping(), READY_TIMEOUT), 2)
+        except Exception as e:
+            body["status"] = "unavailable"
+            body["error"] = str(e) or type(e).__name__
+    body["pool"] = db.pool_stats()
+    return ORJSONResponse(body, status_code=200 if body["status"] == "ready" else 503)
+
+
 # ==================== INVESTOR ENDPOINTS ====================
 
-@app.get("/api/investors")
+@app.get("/api/investors", dependencies=[conditional("investors")])
 async def get_investors(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     industry: Optional[str] = None,
     stage: Optional[str] = None,
-    location: Optional[str] = None,
+    location: Optional[str] = Query(None, description=LOCATION_DESCRIPTION),
+    near: Optional[str] = Query(None, description=NEAR_DESCRIPTION),
+    radius_km: float = Query(50, gt=0, le=20000),
     deal_size: Optional[str] = None,
     status: Optional[str] = None,
-    search: Optional[str] = None
+    check_size: Optional[float] = Query(None, ge=0, description="Only investors whose investment range covers this amount"),
+    search: Optional[str] = Query(None, description=SEARCH_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: '*' for the first page, then nextCursor"),
+    include_total: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    ids: Optional[str] = Query(None, description=IDS_DESCRIPTION),
+    facets: Optional[str] = Query(None, description=FACETS_DESCRIPTION)
 ):
-    """Get all investors with filtering and pagination"""
+    """Get all investors with filtering and pagination, optionally with facet counts"""
+    field_names = _parse_fields(fields)
+    facet_names = _parse_facets("investors", facets)
+    near_point = _parse_near(near)
+    if ids is not None:
+        return await _ids_page("investors", ids, field_names)
     try:
-        result = db.get_all_investors(
+        result = await db.get_all_investors(
             page=page,
             limit=limit,
             industry=industry,
             stage=stage,
             location=location,
+            near=near_point,
+            radius_km=radius_km,
             deal_size=deal_size,
             status=status,
-            search=search
+            check_size=check_size,
+            search=search,
+            cursor=cursor,
+            include_total=include_total,
+            fields=field_names,
+            facets=facet_names
         )
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/investors:bulk")
+async def bulk_create_investors(request: Request):
+    """Create investors and incubators from an NDJSON stream (or a JSON list, or a seed file)"""
+    try:
+        return await _bulk_import(request, "investors", _investor_model, db.bulk_create_investors)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/investors/export")
+async def export_investors(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    """Stream all investors as NDJSON"""
+    return _ndjson_response(db.export_investors(_parse_fields(fields)))
+
+
 @app.get("/api/investors/{investor_id}")
-async def get_investor(investor_id: int):
+async def get_investor(
+    investor_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
     """Get a specific investor by ID"""
-    investor = db.get_investor_by_id(investor_id)
+    field_names = _parse_fields(fields)
+    investor = await db.get_investor_by_id(investor_id, field_names)
     if not investor:
         raise HTTPException(status_code=404, detail=f"Investor with id {investor_id} not found")
-    return investor
+    etag = _version_etag(investor, field_names)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return _sparse(investor, field_names)
+
+
+@app.get("/api/investors/{investor_id}/matches", dependencies=[conditional("investors", "startups")])
+async def get_investor_matches(investor_id: int, limit: int = Query(10, ge=1, le=100)):
+    """Get the startups that best match an investor"""
+    matches = await matching.get_investor_matches(investor_id, limit)
+    if matches is None:
+        raise HTTPException(status_code=404, detail=f"Investor with id {investor_id} not found")
+    return {"data": matches, "total": len(matches)}
 
 
 @app.post("/api/investors", status_code=201)
@@ -180,71 +748,80 @@ async def create_investor(investor: InvestorCreate):
     """Create a new investor"""
     try:
         investor_data = investor.model_dump()
-        result = db.create_investor(investor_data)
+        result = await db.create_investor(investor_data)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.put("/api/investors/{investor_id}")
-async def update_investor(investor_id: int, investor: InvestorUpdate):
+async def update_investor(
+    investor_id: int,
+    investor: InvestorUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
     """Update an existing investor"""
-    existing = db.get_investor_by_id(investor_id)
-    if not existing:
-        raise HTTPException(status_code=404, detail=f"Investor with id {investor_id} not found")
-    
-    try:
-        update_data = investor.model_dump(exclude_none=True)
-        result = db.update_investor(investor_id, update_data)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    update_data = investor.model_dump(exclude_none=True)
+    return await _apply_update(db.update_investor, "Investor", investor_id, update_data, if_match, response)
+
+
+@app.patch("/api/investors/{investor_id}")
+async def patch_investor(
+    investor_id: int,
+    investor: InvestorPatch,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """Partially update an existing investor; nested objects are merged field by field"""
+    update_data = db.to_dotted_set(investor.model_dump(exclude_none=True))
+    return await _apply_update(db.update_investor, "Investor", investor_id, update_data, if_match, response)
 
 
 @app.delete("/api/investors/{investor_id}")
 async def delete_investor(investor_id: int):
     """Delete an investor"""
-    success = db.delete_investor(investor_id)
+    success = await db.delete_investor(investor_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Investor with id {investor_id} not found")
     return {"message": f"Investor {investor_id} deleted successfully"}
 
 
-@app.get("/api/investors/incubators/all")
+@app.get("/api/investors/incubators/all", dependencies=[conditional("investors")])
 async def get_incubators():
     """Get all incubators/accelerators"""
     try:
-        incubators = db.get_incubators()
+        incubators = await db.get_incubators()
         return {"data": incubators, "total": len(incubators)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/investors/filters/industries")
+@app.get("/api/investors/filters/industries", dependencies=[conditional("investors", cache_control=FILTER_CACHE_CONTROL)])
 async def get_investor_industries():
     """Get list of all unique industries"""
     try:
-        industries = db.get_investor_industries()
+        industries = await db.get_investor_industries()
         return {"industries": industries}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/investors/filters/stages")
+@app.get("/api/investors/filters/stages", dependencies=[conditional("investors", cache_control=FILTER_CACHE_CONTROL)])
 async def get_investor_stages():
     """Get list of all unique investment stages"""
     try:
-        stages = db.get_investor_stages()
+        stages = await db.get_investor_stages()
         return {"stages": stages}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/investors/filters/locations")
+@app.get("/api/investors/filters/locations", dependencies=[conditional("investors", cache_control=FILTER_CACHE_CONTROL)])
 async def get_investor_locations():
     """Get list of all unique locations"""
     try:
-        locations = db.get_investor_locations()
+        locations = await db.get_investor_locations()
         return {"locations": locations}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -252,161 +829,304 @@ async def get_investor_locations():
 
 # ==================== STARTUP ENDPOINTS ====================
 
-@app.get("/api/startups")
+@app.get("/api/startups", dependencies=[conditional("startups")])
 async def get_startups(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     industry: Optional[str] = None,
     funding_stage: Optional[str] = None,
-    location: Optional[str] = None,
+    location: Optional[str] = Query(None, description=LOCATION_DESCRIPTION),
+    near: Optional[str] = Query(None, description=NEAR_DESCRIPTION),
+    radius_km: float = Query(50, gt=0, le=20000),
     min_team_size: Optional[int] = None,
     max_team_size: Optional[int] = None,
-    search: Optional[str] = None,
-    sort_by: Optional[str] = Query(None, regex="^(matchPercentage|teamSize|founded)$"),
-    sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$")
+    min_funding: Optional[float] = Query(None, ge=0),
+    max_funding: Optional[float] = Query(None, ge=0),
+    search: Optional[str] = Query(None, description=SEARCH_DESCRIPTION),
+    sort_by: Optional[str] = Query(None, regex="^(matchPercentage|teamSize|founded|funding|growth)$"),
+    sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: '*' for the first page, then nextCursor"),
+    include_total: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    ids: Optional[str] = Query(None, description=IDS_DESCRIPTION),
+    facets: Optional[str] = Query(None, description=FACETS_DESCRIPTION)
 ):
-    """Get all startups with filtering, sorting, and pagination"""
+    """Get all startups with filtering, sorting, and pagination, optionally with facet counts"""
+    field_names = _parse_fields(fields)
+    facet_names = _parse_facets("startups", facets)
+    near_point = _parse_near(near)
+    if ids is not None:
+        return await _ids_page("startups", ids, field_names)
     try:
-        result = db.get_all_startups(
+        result = await db.get_all_startups(
             page=page,
             limit=limit,
             industry=industry,
             funding_stage=funding_stage,
             location=location,
+            near=near_point,
+            radius_km=radius_km,
             min_team_size=min_team_size,
             max_team_size=max_team_size,
+            min_funding=min_funding,
+            max_funding=max_funding,
             search=search,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            cursor=cursor,
+            include_total=include_total,
+            fields=field_names,
+            facets=facet_names
         )
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/startups:bulk")
+async def bulk_create_startups(request: Request):
+    """Create startups from an NDJSON stream (or a JSON list)"""
+    try:
+        return await _bulk_import(request, "startups", StartupCreate, db.bulk_create_startups)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/startups/export")
+async def export_startups(fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
+    """Stream all startups as NDJSON"""
+    return _ndjson_response(db.export_startups(_parse_fields(fields)))
+
+
 @app.get("/api/startups/{startup_id}")
-async def get_startup(startup_id: int):
+async def get_startup(
+    startup_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
     """Get a specific startup by ID"""
-    startup = db.get_startup_by_id(startup_id)
+    field_names = _parse_fields(fields)
+    startup = await db.get_startup_by_id(startup_id, field_names)
     if not startup:
         raise HTTPException(status_code=404, detail=f"Startup with id {startup_id} not found")
-    return startup
+    etag = _version_etag(startup, field_names)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return _sparse(startup, field_names)
+
+
+@app.get("/api/startups/{startup_id}/matches", dependencies=[conditional("investors", "startups")])
+async def get_startup_matches(startup_id: int, limit: int = Query(10, ge=1, le=100)):
+    """Get the investors that best match a startup"""
+    matches = await matching.get_startup_matches(startup_id, limit)
+    if matches is None:
+        raise HTTPException(status_code=404, detail=f"Startup with id {startup_id} not found")
+    return {"data": matches, "total": len(matches)}
 
 
 @app.post("/api/startups", status_code=201)
 async def create_startup(startup: StartupCreate):
     """Create a new startup"""
     try:
-        startup_data = startup.model_dump()
-        result = db.create_startup(startup_data)
+        startup_data = startup.model_dump(exclude_none=True)
+        result = await db.create_startup(startup_data)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.put("/api/startups/{startup_id}")
-async def update_startup(startup_id: int, startup: StartupUpdate):
+async def update_startup(
+    startup_id: int,
+    startup: StartupUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
     """Update an existing startup"""
-    existing = db.get_startup_by_id(startup_id)
-    if not existing:
-        raise HTTPException(status_code=404, detail=f"Startup with id {startup_id} not found")
-    
-    try:
-        update_data = startup.model_dump(exclude_none=True)
-        result = db.update_startup(startup_id, update_data)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    update_data = startup.model_dump(exclude_none=True)
+    return await _apply_update(db.update_startup, "Startup", startup_id, update_data, if_match, response)
+
+
+@app.patch("/api/startups/{startup_id}")
+async def patch_startup(
+    startup_id: int,
+    startup: StartupUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """Partially update an existing startup; nested objects are merged field by field"""
+    update_data = db.to_dotted_set(startup.model_dump(exclude_none=True))
+    return await _apply_update(db.update_startup, "Startup", startup_id, update_data, if_match, response)
 
 
 @app.delete("/api/startups/{startup_id}")
 async def delete_startup(startup_id: int):
     """Delete a startup"""
-    success = db.delete_startup(startup_id)
+    success = await db.delete_startup(startup_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Startup with id {startup_id} not found")
     return {"message": f"Startup {startup_id} deleted successfully"}
 
 
-@app.get("/api/startups/filters/industries")
+@app.get("/api/startups/filters/industries", dependencies=[conditional("startups", cache_control=FILTER_CACHE_CONTROL)])
 async def get_startup_industries():
     """Get list of all unique industries with counts"""
     try:
-        industries = db.get_startup_industries()
+        industries = await db.get_startup_industries()
         return {"industries": industries}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/startups/filters/stages")
+@app.get("/api/startups/filters/stages", dependencies=[conditional("startups", cache_control=FILTER_CACHE_CONTROL)])
 async def get_startup_funding_stages():
     """Get list of all unique funding stages with counts"""
     try:
-        stages = db.get_startup_funding_stages()
+        stages = await db.get_startup_funding_stages()
         return {"fundingStages": stages}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/startups/filters/locations")
+@app.get("/api/startups/filters/locations", dependencies=[conditional("startups", cache_control=FILTER_CACHE_CONTROL)])
 async def get_startup_locations():
     """Get list of all unique locations"""
     try:
-        locations = db.get_startup_locations()
+        locations = await db.get_startup_locations()
         return {"locations": locations}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/startups/filters/categories")
+@app.get("/api/startups/filters/categories", dependencies=[conditional("startups", cache_control=FILTER_CACHE_CONTROL)])
 async def get_startup_categories():
     """Get list of all unique categories"""
     try:
-        categories = db.get_startup_categories()
+        categories = await db.get_startup_categories()
         return {"categories": categories}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/startups/filters/tags")
+@app.get("/api/startups/filters/tags", dependencies=[conditional("startups", cache_control=FILTER_CACHE_CONTROL)])
 async def get_startup_tags():
     """Get list of all unique tags"""
     try:
-        tags = db.get_startup_tags()
+        tags = await db.get_startup_tags()
         return {"tags": tags}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== LOOKUP ENDPOINTS ====================
+
+@app.post("/api/lookup")
+async def lookup(request: LookupRequest):
+    """Resolve many investor and startup ids in one round trip.
+
+    `data` lines up with `items`: the document for each item, or null when
+    it does not exist.
+    """
+    field_names = _check_fields(request.fields)
+    requested: Dict[str, List[int]] = {}
+    for item in request.items:
+        requested.setdefault(item.collection, []).append(item.id)
+    try:
+        found = await db.lookup(requested, field_names)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    data = [found.get(item.collection, {}).get(item.id) for item in request.items]
+    return {"data": data, "found": sum(document is not None for document in data)}
+
+
+# ==================== EVENT ENDPOINTS ====================
+
+@app.get("/api/events")
+async def stream_events(
+    collection: Optional[str] = Query(None, regex="^(investors|startups)$"),
+    industry: Optional[str] = None,
+    stage: Optional[str] = Query(None, description="Funding stage of startups, investment stage of investors"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """Server-sent events for every investor and startup insert, update and delete.
+
+    `industry` and `stage` narrow the feed the same way the list filters do;
+    an update is delivered if the document matched before or after it. A
+    `reset` event means writes to its collection may have been missed and
+    anything derived from them should be refetched.
+    """
+    filters = {name: value for name, value in (("industry", industry), ("stage", stage)) if value}
+    try:
+        subscription = await events.get_hub().subscribe(
+            [collection] if collection else None, filters, last_event_id
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        events.sse_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ==================== STATISTICS ENDPOINTS ====================
 
-@app.get("/api/stats")
+@app.get("/api/stats", dependencies=[conditional("investors", "startups", cache_control=STATS_CACHE_CONTROL)])
 async def get_stats():
     """Get platform statistics"""
     try:
-        stats = db.get_platform_stats()
+        stats = await db.get_platform_stats()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/stats/dashboard")
+@app.get("/api/stats/dashboard", dependencies=[conditional("investors", "startups", cache_control=STATS_CACHE_CONTROL)])
 async def get_dashboard_stats():
     """Get comprehensive dashboard statistics"""
     try:
-        stats = db.get_dashboard_stats()
+        stats = await db.get_dashboard_stats()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== CACHE ENDPOINTS ====================
+
+@app.get("/api/cache/metrics")
+async def get_cache_metrics():
+    """Get cache hit/miss metrics"""
+    return await cache.get_cache().metrics()
+
+
+# ==================== METRICS ENDPOINTS ====================
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 # ==================== RUN SERVER ====================
 
 if __name__ == "__main__":
     PORT = int(os.getenv("PORT", 8000))
     HOST = os.getenv("HOST", "0.0.0.0")
-    
-    print(f"Starting Visnex API on {HOST}:{PORT}")
+
+    if os.getenv("RELOAD", "false").lower() != "true":
+        # Production: hand over to the multi-worker server (server.py) in a fresh
+        # interpreter, so workers import the app only after it has set them up
+        server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+        os.execv(sys.executable, [sys.executable, server_path])
+
+    print(f"Starting Visnex API on {HOST}:{PORT} (development, auto-reload)")
     print(f"Documentation available at http://{HOST}:{PORT}/docs")
     
     uvicorn.run(
@@ -414,4 +1134,4 @@ if __name__ == "__main__":
         host=HOST,
         port=PORT,
         reload=True
-    )
\ No newline at end of file
+    )
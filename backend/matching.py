@@ -0,0 +1,333 @@
+from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+import math
+import os
+import time
+import numpy as np
+import cache
+import db
+import money
+
+
+# ==================== SCORING CONFIGURATION ====================
+
+# Contribution of each signal to the final score (they sum to 1)
+INDUSTRY_WEIGHT = 0.5
+STAGE_WEIGHT = 0.3
+FUNDING_WEIGHT = 0.2
+
+# Share of a startup's industry signal carried by its primary industry; the
+# rest is split across its categories
+PRIMARY_INDUSTRY_SHARE = 0.6
+
+# Funding outside an investor's range loses all credit this many orders of
+# magnitude away from the nearest bound
+FUNDING_FALLOFF_DECADES = 1.0
+
+# Funding score when either side has no parseable amount
+NEUTRAL_FUNDING_SCORE = 0.5
+
+# A collection version that moved without a local write means another worker
+# wrote; the engine reloads once that has lasted this long
+MATCHING_RESYNC_SECONDS = float(os.getenv("MATCHING_RESYNC_SECONDS", 2))
+# Without versions shared between workers, other workers' writes are only
+# picked up by reloading the engine this often
+MATCHING_RELOAD_SECONDS = float(os.getenv("MATCHING_RELOAD_SECONDS", 60))
+
+INVESTOR_FIELDS = {"_id": 0, "id": 1, "focusIndustries": 1, "investmentStages": 1, "investmentRange": 1}
+STARTUP_FIELDS = {"_id": 0, "id": 1, "industry": 1, "categories": 1, "fundingStage": 1, "funding": 1}
+
+
+# ==================== FEATURE STORAGE ====================
+
+class _Vocabulary:
+    """Maps terms (industries, stages) to feature columns"""
+
+    def __init__(self):
+        self.columns: Dict[str, int] = {}
+
+    def column(self, term: str) -> int:
+        if term not in self.columns:
+            self.columns[term] = len(self.columns)
+        return self.columns[term]
+
+    def __len__(self):
+        return len(self.columns)
+
+
+class _FeatureTable:
+    """One row of feature arrays per document, addressable by document id.
+
+    Rows grow geometrically and freed rows are reused, so single-document
+    writes never rebuild the matrices.
+    """
+
+    def __init__(self, numeric_fields: List[str]):
+        self.rows: Dict[int, int] = {}
+        self.free: List[int] = []
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.industries = np.zeros((0, 0), dtype=np.float32)
+        self.stages = np.zeros((0, 0), dtype=np.float32)
+        self.numeric = {name: np.zeros(0, dtype=np.float64) for name in numeric_fields}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def fit_columns(self, industry_columns: int, stage_columns: int):
+        """Widen the one-hot matrices after the vocabularies grew"""
+        if industry_columns > self.industries.shape[1]:
+            self.industries = np.pad(self.industries, ((0, 0), (0, industry_columns - self.industries.shape[1])))
+        if stage_columns > self.stages.shape[1]:
+            self.stages = np.pad(self.stages, ((0, 0), (0, stage_columns - self.stages.shape[1])))
+
+    def _allocate_row(self) -> int:
+        if self.free:
+            return self.free.pop()
+        row = len(self.rows)
+        if row >= len(self.ids):
+            extra = max(16, len(self.ids))
+            self.ids = np.pad(self.ids, (0, extra))
+            self.alive = np.pad(self.alive, (0, extra))
+            self.industries = np.pad(self.industries, ((0, extra), (0, 0)))
+            self.stages = np.pad(self.stages, ((0, extra), (0, 0)))
+            for name, values in self.numeric.items():
+                self.numeric[name] = np.pad(values, (0, extra), constant_values=np.nan)
+        return row
+
+    def upsert(
+        self,
+        document_id: int,
+        industries: Dict[int, float],
+        stages: List[int],
+        numeric: Dict[str, float]
+    ):
+        row = self.rows.get(document_id)
+        if row is None:
+            row = self._allocate_row()
+            self.rows[document_id] = row
+        self.ids[row] = document_id
+        self.alive[row] = True
+        self.industries[row] = 0
+        for column, weight in industries.items():
+            self.industries[row, column] = weight
+        self.stages[row] = 0
+        self.stages[row, stages] = 1
+        for name, values in self.numeric.items():
+            values[row] = numeric.get(name, np.nan)
+
+    def remove(self, document_id: int):
+        row = self.rows.pop(document_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.free.append(row)
+
+
+def _log_amount(value: Any) -> float:
+    """log10 of a money display string, NaN when missing or unparseable"""
+    amount = money.parse_money(value)
+    return math.log10(amount) if amount and amount > 0 else np.nan
+
+
+def _funding_scores(amounts: np.ndarray, lows: np.ndarray, highs: np.ndarray) -> np.ndarray:
+    """1 inside [low, high] (log10 space), falling linearly to 0 outside it"""
+    with np.errstate(invalid="ignore"):
+        distance = np.maximum(np.maximum(lows - amounts, amounts - highs), 0)
+        scores = np.clip(1 - distance / FUNDING_FALLOFF_DECADES, 0, 1)
+    return np.where(np.isnan(scores), NEUTRAL_FUNDING_SCORE, scores)
+
+
+# ==================== MATCHING ENGINE ====================
+
+class MatchingEngine:
+    """Investor and startup feature vectors scored in vectorized batches"""
+
+    def __init__(self):
+        self.industries = _Vocabulary()
+        self.stages = _Vocabulary()
+        self.investors = _FeatureTable(["rangeMin", "rangeMax"])
+        self.startups = _FeatureTable(["funding"])
+        self.loaded = False
+
+    def _fit_columns(self):
+        for table in (self.investors, self.startups):
+            table.fit_columns(len(self.industries), len(self.stages))
+
+    def upsert_investor(self, investor: Dict[str, Any]):
+        industries = {self.industries.column(term): 1.0 for term in investor.get("focusIndustries") or [] if term}
+        stages = [self.stages.column(term) for term in investor.get("investmentStages") or [] if term]
+        investment_range = investor.get("investmentRange") or {}
+        self._fit_columns()
+        self.investors.upsert(investor["id"], industries, stages, {
+            "rangeMin": _log_amount(investment_range.get("min")),
+            "rangeMax": _log_amount(investment_range.get("max")),
+        })
+
+    def upsert_startup(self, startup: Dict[str, Any]):
+        industry = startup.get("industry")
+        categories = [term for term in dict.fromkeys(startup.get("categories") or []) if term]
+        # The industry signal sums to 1 however the startup is labelled
+        primary_share = (PRIMARY_INDUSTRY_SHARE if categories else 1.0) if industry else 0.0
+        industries: Dict[int, float] = {}
+        if industry:
+            industries[self.industries.column(industry)] = primary_share
+        for term in categories:
+            column = self.industries.column(term)
+            industries[column] = industries.get(column, 0.0) + (1 - primary_share) / len(categories)
+        stages = [self.stages.column(startup["fundingStage"])] if startup.get("fundingStage") else []
+        self._fit_columns()
+        self.startups.upsert(startup["id"], industries, stages, {"funding": _log_amount(startup.get("funding"))})
+
+    def remove(self, collection_name: str, document_id: int):
+        table = self.investors if collection_name == "investors" else self.startups
+        table.remove(document_id)
+
+    @staticmethod
+    def _top_k(table: _FeatureTable, scores: np.ndarray, limit: int) -> List[Tuple[int, int]]:
+        """(document id, match percentage) of the best rows, best first"""
+        scores = np.where(table.alive, scores, -np.inf)
+        limit = min(limit, len(table))
+        if limit <= 0:
+            return []
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+        ordered = sorted(candidates, key=lambda row: (-scores[row], table.ids[row]))
+        return [(int(table.ids[row]), int(round(float(scores[row]) * 100))) for row in ordered]
+
+    def startups_for_investor(self, investor_id: int, limit: int) -> Optional[List[Tuple[int, int]]]:
+        """Top startups for an investor, or None if the investor is unknown"""
+        row = self.investors.rows.get(investor_id)
+        if row is None:
+            return None
+        investors, startups = self.investors, self.startups
+        scores = (
+            INDUSTRY_WEIGHT * (startups.industries @ investors.industries[row])
+            + STAGE_WEIGHT * (startups.stages @ investors.stages[row])
+            + FUNDING_WEIGHT * _funding_scores(
+                startups.numeric["funding"],
+                investors.numeric["rangeMin"][row],
+                investors.numeric["rangeMax"][row]
+            )
+        )
+        return self._top_k(startups, scores, limit)
+
+    def investors_for_startup(self, startup_id: int, limit: int) -> Optional[List[Tuple[int, int]]]:
+        """Top investors for a startup, or None if the startup is unknown"""
+        row = self.startups.rows.get(startup_id)
+        if row is None:
+            return None
+        investors, startups = self.investors, self.startups
+        scores = (
+            INDUSTRY_WEIGHT * (investors.industries @ startups.industries[row])
+            + STAGE_WEIGHT * (investors.stages @ startups.stages[row])
+            + FUNDING_WEIGHT * _funding_scores(
+                startups.numeric["funding"][row],
+                investors.numeric["rangeMin"],
+                investors.numeric["rangeMax"]
+            )
+        )
+        return self._top_k(investors, scores, limit)
+
+
+# Global engine, loaded from MongoDB on first use and kept fresh by db write hooks
+_engine = MatchingEngine()
+_load_lock = asyncio.Lock()
+# Cache version of each collection the engine reflects; every local write accounts for one bump
+_synced: Dict[str, int] = {}
+# Writes landing while a load reads the collections, replayed on top of it
+_pending: Optional[List[Tuple[str, list]]] = None
+_diverged_since: Optional[float] = None
+_loaded_at = 0.0
+
+
+def _apply(engine: MatchingEngine, collection_name: str, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+    for before, after in changes:
+        if after is None:
+            engine.remove(collection_name, before["id"])
+        elif collection_name == "investors":
+            engine.upsert_investor(after)
+        else:
+            engine.upsert_startup(after)
+
+
+async def _load():
+    """Build a new engine from both collections and swap it in"""
+    global _engine, _synced, _pending, _diverged_since, _loaded_at
+    versions = await cache.get_cache().versions(["investors", "startups"])
+    _pending = []
+    try:
+        engine = MatchingEngine()
+        database = db.get_database()
+        async for investor in database["investors"].find({}, INVESTOR_FIELDS):
+            engine.upsert_investor(investor)
+        async for startup in database["startups"].find({}, STARTUP_FIELDS):
+            engine.upsert_startup(startup)
+        pending, _pending = _pending, None
+    except BaseException:
+        _pending = None
+        raise
+    synced = dict(zip(["investors", "startups"], versions))
+    for collection_name, changes in pending:
+        _apply(engine, collection_name, changes)
+        synced[collection_name] += 1
+    engine.loaded = True
+    _engine, _synced, _diverged_since, _loaded_at = engine, synced, None, time.monotonic()
+    print(f"Matching engine loaded: {len(engine.investors)} investors, {len(engine.startups)} startups")
+
+
+async def _missed_writes() -> bool:
+    """Whether the engine has been missing another worker's writes long enough to reload"""
+    global _diverged_since
+    shared_cache = cache.get_cache()
+    if not shared_cache.versions_shared():
+        return time.monotonic() - _loaded_at >= MATCHING_RELOAD_SECONDS
+    versions = await shared_cache.versions(list(_synced))
+    if versions == list(_synced.values()):
+        _diverged_since = None
+        return False
+    # Either a local write between its version bump and its hook, or a
+    # write from another worker; only the latter persists
+    if _diverged_since is None:
+        _diverged_since = time.monotonic()
+    return time.monotonic() - _diverged_since >= MATCHING_RESYNC_SECONDS
+
+
+async def get_engine() -> MatchingEngine:
+    """Get the matching engine, loading it on first use and reloading it after missed writes"""
+    if not _engine.loaded or await _missed_writes():
+        async with _load_lock:
+            if not _engine.loaded or await _missed_writes():
+                await _load()
+    return _engine
+
+
+def _on_write(collection_name: str, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+    """Apply one db.py write batch, which bumped the collection version once"""
+    if _pending is not None:
+        _pending.append((collection_name, changes))
+    if _engine.loaded:
+        _apply(_engine, collection_name, changes)
+        _synced[collection_name] += 1
+
+
+db.add_write_listener(_on_write)
+
+
+# ==================== MATCH QUERIES ====================
+
+async def _with_scores(collection_name: str, matches: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+    """Fetch matched documents in score order and attach their match percentage"""
+    documents = await db.find_by_ids(collection_name, [document_id for document_id, _ in matches])
+    scores = dict(matches)
+    return [{**document, "matchPercentage": scores[document["id"]]} for document in documents]
+
+
+async def get_investor_matches(investor_id: int, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+    """Best matching startups for an investor, or None if the investor does not exist"""
+    matches = (await get_engine()).startups_for_investor(investor_id, limit)
+    return None if matches is None else await _with_scores("startups", matches)
+
+
+async def get_startup_matches(startup_id: int, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+    """Best matching investors for a startup, or None if the startup does not exist"""
+    matches = (await get_engine()).investors_for_startup(startup_id, limit)
+    return None if matches is None else await _with_scores("investors", matches)
@@ -0,0 +1,207 @@
+from prometheus_client import Counter, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+from pymongo import monitoring
+from typing import Dict, Any, Callable, Tuple
+from functools import wraps
+import json
+import os
+import time
+
+
+# Metrics Configuration
+# Commands slower than this (milliseconds) are logged with their query shape
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+
+# Latency buckets in seconds, from cache hits up to slow aggregations
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ==================== METRICS ====================
+
+REQUEST_LATENCY = Histogram(
+    "visnex_http_request_duration_seconds",
+    "HTTP request latency until the response body is fully sent",
+    ["method", "route", "status"],
+    buckets=_BUCKETS
+)
+DB_FUNCTION_LATENCY = Histogram(
+    "visnex_db_function_duration_seconds",
+    "Latency of db.py data functions",
+    ["function"],
+    buckets=_BUCKETS
+)
+DB_FUNCTION_ERRORS = Counter(
+    "visnex_db_function_errors_total",
+    "db.py data function calls that raised",
+    ["function"]
+)
+DB_FUNCTION_DOCUMENTS = Counter(
+    "visnex_db_function_documents_total",
+    "Documents returned by db.py data functions",
+    ["function"]
+)
+LIST_QUERIES = Counter(
+    "visnex_list_queries_total",
+    "List queries by the engine that answered them (the storage backend or snapshot)",
+    ["collection", "engine"]
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "visnex_mongo_command_duration_seconds",
+    "MongoDB command latency as reported by the driver",
+    ["collection", "command"],
+    buckets=_BUCKETS
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "visnex_mongo_command_failures_total",
+    "MongoDB commands that failed",
+    ["collection", "command"]
+)
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type.
+
+    Under a multi-worker server (PROMETHEUS_MULTIPROC_DIR set, see server.py)
+    every worker writes its samples to files there and a scrape merges them,
+    whichever worker answers it.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# ==================== HTTP MIDDLEWARE ====================
+
+class MetricsMiddleware:
+    """Records request latency labelled by route template, so /api/startups/{startup_id} is one series"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)
+            ).observe(time.perf_counter() - started)
+
+
+# ==================== DB FUNCTION TIMING ====================
+
+def _document_count(result: Any) -> int:
+    """Documents in a db.py result: a page, a list, a single document or anything else"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        if isinstance(result.get("data"), list):
+            return len(result["data"])
+        return 1 if "id" in result else 0
+    return 0
+
+
+def timed(func: Callable) -> Callable:
+    """Record latency, errors and documents returned for an async db function"""
+    name = func.__name__
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            DB_FUNCTION_ERRORS.labels(name).inc()
+            raise
+        finally:
+            DB_FUNCTION_LATENCY.labels(name).observe(time.perf_counter() - started)
+        DB_FUNCTION_DOCUMENTS.labels(name).inc(_document_count(result))
+        return result
+    return wrapper
+
+
+# ==================== COMMAND MONITORING ====================
+
+# Command fields that describe the session or cluster rather than the query
+_COMMAND_NOISE = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "signature", "cursor"}
+
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values with "?" so queries group by structure, not by parameters"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        shapes = [query_shape(item) for item in value if isinstance(item, (dict, list))]
+        return shapes if shapes else ["?"] if value else []
+    return "?"
+
+
+def command_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape of a whole command; sort and projection specs are kept since they are structural"""
+    shape = {}
+    for key, value in command.items():
+        if key in _COMMAND_NOISE:
+            continue
+        if key == command_name or key in ("sort", "projection", "hint"):
+            shape[key] = value
+        else:
+            shape[key] = query_shape(value)
+    return shape
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Per-collection command timing and the slow-query log.
+
+    The command document is only held between its started and finished
+    events; it is turned into a shape just for the slow ones.
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._started: Dict[Tuple[Any, int], Tuple[str, Dict[str, Any]]] = {}
+
+    @staticmethod
+    def _collection(command_name: str, command: Dict[str, Any]) -> str:
+        target = command.get("collection") if command_name == "getMore" else command.get(command_name)
+        return target if isinstance(target, str) else ""
+
+    def started(self, event):
+        command = event.command
+        self._started[(event.connection_id, event.request_id)] = (
+            self._collection(event.command_name, command),
+            command
+        )
+
+    def _finished(self, event, failed: bool):
+        collection, command = self._started.pop((event.connection_id, event.request_id), ("", None))
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        if failed:
+            MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+        duration_ms = event.duration_micros / 1000
+        if command is not None and duration_ms >= self.slow_query_ms:
+            shape = json.dumps(command_shape(event.command_name, command), default=str)
+            print(f"Slow query ({duration_ms:.0f}ms) {event.command_name} {collection}: {shape}")
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+
+# Listener passed to the MongoDB client in db.get_database()
+command_metrics = CommandMetrics()
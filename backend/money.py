@@ -0,0 +1,117 @@
+from pymongo import UpdateOne
+from typing import Optional, List, Dict, Any, Callable, Tuple
+import asyncio
+import re
+
+
+# ==================== DISPLAY STRING PARSING ====================
+
+# Suffix multipliers used by the display strings ("$500K", "$8.5M", "$1.2B")
+_MULTIPLIERS = {"": 1, "K": 1_000, "M": 1_000_000, "B": 1_000_000_000, "T": 1_000_000_000_000}
+
+_MONEY_RE = re.compile(r"^\s*[$€£]?\s*([0-9][0-9,]*(?:\.[0-9]+)?)\s*([KMBT]?)\+?\s*$", re.IGNORECASE)
+_PERCENT_RE = re.compile(r"^\s*([+-]?[0-9][0-9,]*(?:\.[0-9]+)?)\s*%\s*$")
+
+
+def parse_money(value: Any) -> Optional[float]:
+    """Parse a money display string into a number: "$8.5M" -> 8500000.0.
+
+    Plain numbers pass through; anything unparseable gives None.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _MONEY_RE.match(value)
+    if not match:
+        return None
+    amount, suffix = match.groups()
+    return float(amount.replace(",", "")) * _MULTIPLIERS[suffix.upper()]
+
+
+def parse_percent(value: Any) -> Optional[float]:
+    """Parse a percentage display string into a number: "+320%" -> 320.0"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _PERCENT_RE.match(value)
+    return float(match.group(1).replace(",", "")) if match else None
+
+
+# ==================== NUMERIC SHADOW FIELDS ====================
+
+# Numeric copies of display strings, kept next to them for range filters and
+# sorting: shadow field -> (source path, parser)
+SHADOW_FIELDS: Dict[str, Dict[str, Tuple[str, Callable]]] = {
+    "startups": {
+        "fundingAmount": ("funding", parse_money),
+        "growthPercent": ("growth", parse_percent),
+    },
+    "investors": {
+        "investmentRangeMin": ("investmentRange.min", parse_money),
+        "investmentRangeMax": ("investmentRange.max", parse_money),
+    },
+}
+
+# Every shadow field name, for projections that hide them
+ALL_SHADOW_FIELDS: List[str] = [field for fields in SHADOW_FIELDS.values() for field in fields]
+
+
+def _lookup(data: Dict[str, Any], path: str) -> Tuple[bool, Any]:
+    """Find a dotted path in a document or $set, whichever prefix of it is a key"""
+    parts = path.split(".")
+    for split in range(len(parts), 0, -1):
+        key = ".".join(parts[:split])
+        if key in data:
+            value = data[key]
+            for part in parts[split:]:
+                if not isinstance(value, dict) or part not in value:
+                    return False, None
+                value = value[part]
+            return True, value
+    return False, None
+
+
+def shadow_fields_update(collection_name: str, data: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """Shadow field values for whichever source fields a document or $set contains"""
+    values = {}
+    for field, (path, parser) in SHADOW_FIELDS[collection_name].items():
+        found, value = _lookup(data, path)
+        if found:
+            values[field] = parser(value)
+    return values
+
+
+# ==================== BACKFILL ====================
+
+async def backfill_shadow_fields(database, collection_name: str, batch_size: int = 500) -> int:
+    """Recompute the shadow fields of every document in batches; returns documents updated"""
+    collection = database[collection_name]
+    projection = {"_id": 1, **{path.split(".")[0]: 1 for path, _ in SHADOW_FIELDS[collection_name].values()}}
+    updated = 0
+    batch = []
+    async for document in collection.find({}, projection).batch_size(batch_size):
+        values = {field: None for field in SHADOW_FIELDS[collection_name]}
+        values.update(shadow_fields_update(collection_name, document))
+        batch.append(UpdateOne({"_id": document["_id"]}, {"$set": values}))
+        if len(batch) >= batch_size:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+
+async def _main():
+    # db imports this module, so it is only pulled in when run as a script
+    import db
+    for collection_name in SHADOW_FIELDS:
+        updated = await backfill_shadow_fields(db.get_database(), collection_name)
+        print(f"Backfilled numeric fields for {collection_name}: {updated} documents updated")
+    db.close_database()
+
+
+if __name__ == "__main__":
+    # python money.py -> backfill numeric shadow fields for existing documents
+    asyncio.run(_main())
@@ -0,0 +1,175 @@
+from typing import Optional, Dict, Any
+import glob
+import os
+import shutil
+import sys
+import tempfile
+from dotenv import load_dotenv
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+except ImportError:  # Optional dependency (not available on Windows); uvicorn's own supervisor is used without it
+    BaseApplication = None
+    UvicornWorker = None
+
+load_dotenv()
+
+# Server Configuration
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+# Worker processes; each has its own event loop, MongoDB pool and in-process caches.
+# With CACHE_BACKEND=memory several workers can't share cache versions, so ETags
+# and the snapshot are off and cached results live at most MICRO_CACHE_TTL
+# (see cache.versions_shared); CACHE_BACKEND=redis keeps them all.
+WORKERS = int(os.getenv("WEB_CONCURRENCY", 0)) or os.cpu_count() or 1
+# Event loop and HTTP parser implementations (both ship with uvicorn[standard])
+SERVER_LOOP = os.getenv("SERVER_LOOP", "uvloop")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "httptools")
+# Seconds an idle keep-alive connection stays open. Longer than the usual load
+# balancer idle timeout (60s), so the balancer closes first and never sends a
+# request down a connection we are closing.
+SERVER_KEEP_ALIVE = int(os.getenv("SERVER_KEEP_ALIVE", 65))
+# Pending connections the kernel queues per listening socket (capped by net.core.somaxconn)
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", 2048))
+# Seconds a stopping worker waits for open requests and streams before closing them;
+# main.DRAIN_DELAY (serving while /ready reports draining) comes before this
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+# Recycle a worker after this many requests, plus up to the jitter so they don't all restart at once (0 = never)
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", 0))
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", 0))
+
+# Seconds past SERVER_GRACEFUL_TIMEOUT before gunicorn kills a worker: the drain
+# delay before it, and room for the shutdown hook to close connections after it
+_SHUTDOWN_HOOK_SECONDS = int(float(os.getenv("DRAIN_DELAY", 5))) + 5
+
+
+# ==================== METRICS ====================
+
+def _prepare_metrics_dir(workers: int) -> Optional[str]:
+    """Share Prometheus metrics between workers through PROMETHEUS_MULTIPROC_DIR.
+
+    Must run before prometheus_client is imported anywhere in this process,
+    since it picks its storage on import. Stale files from a previous run are
+    removed so counters start from zero. Returns the directory if it is a
+    temporary one created here, for removal on exit.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+        os.makedirs(path, exist_ok=True)
+        for stale in glob.glob(os.path.join(path, "*.db")):
+            os.remove(stale)
+        return None
+    if workers < 2:
+        return None
+    path = tempfile.mkdtemp(prefix="visnex-metrics-")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def _child_exit(server, worker):
+    """Gunicorn hook: stop reporting live gauges of a worker that has exited"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+# ==================== GUNICORN ====================
+
+if BaseApplication is not None:
+    class Worker(UvicornWorker):
+        """Uvicorn worker with the configured loop and parser and a bounded graceful shutdown"""
+
+        CONFIG_KWARGS = {
+            "loop": SERVER_LOOP,
+            "http": SERVER_HTTP,
+            "timeout_graceful_shutdown": SERVER_GRACEFUL_TIMEOUT,
+        }
+
+    class Application(BaseApplication):
+        """Gunicorn configured from the environment rather than a config file or its CLI"""
+
+        def __init__(self, options: Dict[str, Any]):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in each worker after the fork (no preload), so every worker
+            # builds its own MongoDB client, caches and metrics from scratch
+            from main import app
+            return app
+
+
+def gunicorn_options(workers: int) -> Dict[str, Any]:
+    options = {
+        "bind": f"{HOST}:{PORT}",
+        "workers": workers,
+        "worker_class": "server.Worker",
+        "keepalive": SERVER_KEEP_ALIVE,
+        "backlog": SERVER_BACKLOG,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT + _SHUTDOWN_HOOK_SECONDS,
+        "max_requests": SERVER_MAX_REQUESTS,
+        "max_requests_jitter": SERVER_MAX_REQUESTS_JITTER,
+        "preload_app": False,
+        "child_exit": _child_exit,
+    }
+    if os.path.isdir("/dev/shm"):
+        # Worker heartbeats go to a temp file; keep it off disk so a slow disk can't get workers killed
+        options["worker_tmp_dir"] = "/dev/shm"
+    return options
+
+
+# ==================== RUN SERVER ====================
+
+def run(workers: Optional[int] = None):
+    """Serve main:app with `workers` processes (default WEB_CONCURRENCY, else one per CPU).
+
+    With gunicorn installed the master restarts crashed workers, SIGHUP
+    replaces every worker without dropping in-flight requests (new workers
+    start before old ones drain) and SIGTERM drains and stops. Without it,
+    uvicorn's supervisor runs the same app but cannot reload gracefully.
+    """
+    workers = workers or WORKERS
+    if workers > 1 and os.getenv("STORAGE_BACKEND") == "embedded":
+        # Each worker would hold its own copy of the data and never see the others' writes
+        print("STORAGE_BACKEND=embedded keeps data in process memory: running a single worker")
+        workers = 1
+    if workers > 1 and os.getenv("CACHE_BACKEND", "memory") != "redis":
+        print(f"WARNING CACHE_BACKEND=memory keeps cache versions per process: with {workers} workers "
+              "ETags and the snapshot are off and cached results expire after MICRO_CACHE_TTL "
+              "(set CACHE_BACKEND=redis to keep them)")
+    # Tells each worker how many siblings it has (see cache.WEB_CONCURRENCY)
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    metrics_dir = _prepare_metrics_dir(workers)
+    print(f"Starting Visnex API on {HOST}:{PORT} with {workers} workers ({SERVER_LOOP}, {SERVER_HTTP})")
+
+    try:
+        if BaseApplication is not None:
+            Application(gunicorn_options(workers)).run()
+            return
+
+        print("gunicorn is not installed: workers are not restarted and SIGHUP reloads are unavailable")
+        import uvicorn
+        uvicorn.run(
+            "main:app",
+            host=HOST,
+            port=PORT,
+            workers=workers,
+            loop=SERVER_LOOP,
+            http=SERVER_HTTP,
+            timeout_keep_alive=SERVER_KEEP_ALIVE,
+            backlog=SERVER_BACKLOG,
+            timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT
+        )
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # python server.py [workers] -> production server
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,579 @@
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+import os
+import re
+import time
+import numpy as np
+import cache
+import db
+import geo
+import indexes
+import money
+import text_search
+
+
+# Snapshot Configuration
+# Answer list queries from in-memory columns instead of MongoDB (which stays the source of truth)
+SNAPSHOT_ENGINE = os.getenv("SNAPSHOT_ENGINE", "false").lower() == "true"
+# A collection version that moved without a local write means another worker
+# wrote; queries fall back to MongoDB and the snapshot reloads if that lasts this long.
+# Only enabled when versions are shared between workers (see cache.versions_shared).
+SNAPSHOT_RESYNC_SECONDS = float(os.getenv("SNAPSHOT_RESYNC_SECONDS", 2))
+
+# Columns kept per collection: numeric columns serve range filters and sorting,
+# dictionary-encoded ones equality and regex filters, bitmaps array membership
+# and points (GeoJSON) $geoWithin spheres
+COLUMNS = {
+    "startups": {
+        "numeric": list(dict.fromkeys(["id", "teamSize", *indexes.STARTUP_SORT_FIELDS])),
+        "encoded": ["industry", "fundingStage", "location", geo.LABEL_FIELD],
+        "bitmaps": ["categories", "tags", geo.KEYS_FIELD],
+        "points": [geo.POINT_FIELD],
+    },
+    "investors": {
+        "numeric": ["id", *money.SHADOW_FIELDS["investors"]],
+        "encoded": ["location", "dealSize", "status", geo.LABEL_FIELD],
+        "bitmaps": ["focusIndustries", "investmentStages", geo.KEYS_FIELD],
+        "points": [geo.POINT_FIELD],
+    },
+}
+
+# Stored documents without the search grams, which only $text queries use
+_LOAD_PROJECTION = {"_id": 0, text_search.GRAMS_FIELD: 0}
+
+_REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+# Set bits per byte value, for counting rows in packed bitmaps
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+_COMPARISONS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+class Unsupported(Exception):
+    """The query uses something the snapshot can't evaluate; MongoDB answers it instead"""
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _point_radians(value: Any) -> Tuple[float, float]:
+    """(lat, lng) in radians of a GeoJSON point, NaN when missing or malformed"""
+    coordinates = value.get("coordinates") if isinstance(value, dict) and value.get("type") == "Point" else None
+    if isinstance(coordinates, list) and len(coordinates) == 2 and all(_is_number(c) for c in coordinates):
+        return np.radians(coordinates[1]), np.radians(coordinates[0])
+    return np.nan, np.nan
+
+
+@lru_cache(maxsize=256)
+def _compile_regex(pattern: str, options: str) -> "re.Pattern":
+    flags = 0
+    for option in options:
+        if option not in _REGEX_FLAGS:
+            raise Unsupported(f"regex option {option}")
+        flags |= _REGEX_FLAGS[option]
+    try:
+        return re.compile(pattern, flags)
+    except re.error as e:
+        raise Unsupported(str(e))
+
+
+# ==================== PROJECTION ====================
+
+def _path_tree(paths: List[str]) -> Dict[str, Any]:
+    """{"a.b": 1, "c": 1} -> {"a": {"b": True}, "c": True}"""
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        *parents, leaf = path.split(".")
+        node = tree
+        for part in parents:
+            child = node.get(part)
+            if child is True:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[leaf] = True
+    return tree
+
+
+# Returned by _pick for values a nested path leaves out entirely
+_OMIT = object()
+
+
+def _pick(value: Any, tree: Any) -> Any:
+    """Apply an inclusion tree the way MongoDB does: scalars under a nested path vanish"""
+    if tree is True:
+        return value
+    if isinstance(value, dict):
+        picked = {}
+        for key, item in value.items():
+            if key in tree:
+                item = _pick(item, tree[key])
+                if item is not _OMIT:
+                    picked[key] = item
+        return picked
+    if isinstance(value, list):
+        return [_pick(item, tree) for item in value if isinstance(item, (dict, list))]
+    return _OMIT
+
+
+def project(document: Dict[str, Any], projection: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of a snapshot document shaped by a db.py projection"""
+    if 1 in projection.values():
+        return _pick(document, _path_tree([path for path, value in projection.items() if value == 1]))
+    return {key: value for key, value in document.items() if projection.get(key) != 0}
+
+
+# ==================== COLUMN STORAGE ====================
+
+class _Dictionary:
+    """Maps the distinct values of a column to small integer codes"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.terms: List[str] = []
+
+    def code(self, term: str) -> int:
+        if term not in self.codes:
+            self.codes[term] = len(self.terms)
+            self.terms.append(term)
+        return self.codes[term]
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class _ColumnTable:
+    """One collection as column arrays, one row per document, addressable by id.
+
+    Single-valued strings are dictionary-encoded (-1 when missing), arrays of
+    strings get one packed bitmap per distinct term, and numbers are float64
+    with NaN for missing or non-numeric values, as are the latitude and
+    longitude (radians) of points. Rows grow geometrically and freed rows are
+    reused, as in matching._FeatureTable.
+    """
+
+    def __init__(self, numeric: List[str], encoded: List[str], bitmaps: List[str], points: List[str]):
+        self.rows: Dict[int, int] = {}
+        self.free: List[int] = []
+        self.documents: List[Optional[Dict[str, Any]]] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.numeric = {field: np.zeros(0, dtype=np.float64) for field in numeric}
+        self.codes = {field: np.zeros(0, dtype=np.int32) for field in encoded}
+        self.dictionaries = {field: _Dictionary() for field in [*encoded, *bitmaps]}
+        # Per term a row of packed bits over documents, and per row the terms set in them
+        self.bitmaps = {field: np.zeros((0, 0), dtype=np.uint8) for field in bitmaps}
+        self.row_terms: Dict[str, List[List[int]]] = {field: [] for field in bitmaps}
+        self.points = {field: np.zeros((0, 2), dtype=np.float64) for field in points}
+        # Row order per (sort field, direction), dropped on every change
+        self._orders: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _allocate_row(self) -> int:
+        if self.free:
+            return self.free.pop()
+        row = len(self.rows)
+        if row >= len(self.alive):
+            extra = max(16, len(self.alive))
+            self.alive = np.pad(self.alive, (0, extra))
+            self.documents.extend([None] * extra)
+            for field, values in self.numeric.items():
+                self.numeric[field] = np.pad(values, (0, extra), constant_values=np.nan)
+            for field, codes in self.codes.items():
+                self.codes[field] = np.pad(codes, (0, extra), constant_values=-1)
+            for field, bitmap in self.bitmaps.items():
+                self.bitmaps[field] = np.pad(bitmap, ((0, 0), (0, extra // 8)))
+                self.row_terms[field].extend([] for _ in range(extra))
+            for field, points in self.points.items():
+                self.points[field] = np.pad(points, ((0, extra), (0, 0)), constant_values=np.nan)
+        return row
+
+    def upsert(self, document: Dict[str, Any]):
+        row = self.rows.get(document["id"])
+        if row is None:
+            row = self._allocate_row()
+            self.rows[document["id"]] = row
+        self.documents[row] = document
+        self.alive[row] = True
+        for field, values in self.numeric.items():
+            value = document.get(field)
+            values[row] = value if _is_number(value) else np.nan
+        for field, codes in self.codes.items():
+            value = document.get(field)
+            codes[row] = self.dictionaries[field].code(value) if isinstance(value, str) else -1
+        for field in self.bitmaps:
+            value = document.get(field)
+            terms = [value] if isinstance(value, str) else value if isinstance(value, list) else []
+            self._set_terms(field, row, [self.dictionaries[field].code(term) for term in terms if isinstance(term, str)])
+        for field, points in self.points.items():
+            points[row] = _point_radians(document.get(field))
+        self._orders.clear()
+
+    def _set_terms(self, field: str, row: int, terms: List[int]):
+        bitmap = self.bitmaps[field]
+        terms_count = len(self.dictionaries[field])
+        if terms_count > len(bitmap):
+            # One document can bring any number of new terms; grow geometrically past all of them
+            bitmap = np.pad(bitmap, ((0, max(16, terms_count, 2 * len(bitmap)) - len(bitmap)), (0, 0)))
+            self.bitmaps[field] = bitmap
+        byte, bit = row >> 3, 0x80 >> (row & 7)
+        for term in self.row_terms[field][row]:
+            bitmap[term, byte] &= 0xFF ^ bit
+        for term in terms:
+            bitmap[term, byte] |= bit
+        self.row_terms[field][row] = terms
+
+    def remove(self, document_id: int):
+        row = self.rows.pop(document_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.documents[row] = None
+            for field in self.bitmaps:
+                self._set_terms(field, row, [])
+            self.free.append(row)
+            self._orders.clear()
+
+    # ---------- filters ----------
+
+    def supports(self, query: Dict[str, Any]) -> bool:
+        try:
+            self.mask(query, dry_run=True)
+        except Unsupported:
+            return False
+        return True
+
+    def mask(self, query: Dict[str, Any], dry_run: bool = False) -> Optional[np.ndarray]:
+        """Rows matching a db.py filter document; raises Unsupported for anything else.
+
+        With `dry_run` only the shape of the query is checked.
+        """
+        result = None if dry_run else self.alive.copy()
+        for key, condition in query.items():
+            if key in ("$and", "$or"):
+                if not isinstance(condition, list):
+                    raise Unsupported(key)
+                masks = [self.mask(clause, dry_run) for clause in condition]
+                if dry_run:
+                    continue
+                if not masks:
+                    raise Unsupported(f"empty {key}")
+                if key == "$and":
+                    for clause_mask in masks:
+                        result &= clause_mask
+                else:
+                    result &= np.logical_or.reduce(masks)
+            else:
+                field_mask = self._field_mask(key, condition, dry_run)
+                if not dry_run:
+                    result &= field_mask
+        return result
+
+    def _field_mask(self, field: str, condition: Any, dry_run: bool) -> Optional[np.ndarray]:
+        operators = isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)
+        if field in self.numeric:
+            return self._numeric_mask(field, condition if operators else {"$eq": condition}, dry_run)
+        if field in self.points:
+            if not operators or set(condition) != {"$geoWithin"}:
+                raise Unsupported(field)
+            return self._geo_mask(field, condition, dry_run)
+        if operators and set(condition) <= {"$regex", "$options"} and field in self.codes:
+            return self._regex_mask(field, condition, dry_run)
+        if operators or not (isinstance(condition, str) or (condition is None and field in self.codes)):
+            raise Unsupported(field)
+        if dry_run:
+            return None
+        if field in self.codes:
+            code = -1 if condition is None else self.dictionaries[field].codes.get(condition)
+            return self.codes[field] == code if code is not None else np.zeros_like(self.alive)
+        if field in self.bitmaps:
+            term = self.dictionaries[field].codes.get(condition)
+            if term is None:
+                return np.zeros_like(self.alive)
+            return np.unpackbits(self.bitmaps[field][term], count=len(self.alive)).view(bool)
+        raise Unsupported(field)
+
+    def _geo_mask(self, field: str, condition: Dict[str, Any], dry_run: bool) -> Optional[np.ndarray]:
+        """{"$geoWithin": {"$centerSphere": [[lng, lat], radians]}} by great-circle distance"""
+        try:
+            (center_lng, center_lat), radius = condition["$geoWithin"]["$centerSphere"]
+            center_lat, center_lng, radius = np.radians(center_lat), np.radians(center_lng), float(radius)
+        except (KeyError, TypeError, ValueError):
+            raise Unsupported(f"{field} $geoWithin")
+        if dry_run:
+            return None
+        lat, lng = self.points[field][:, 0], self.points[field][:, 1]
+        with np.errstate(invalid="ignore"):
+            haversine = (
+                np.sin((lat - center_lat) / 2) ** 2
+                + np.cos(center_lat) * np.cos(lat) * np.sin((lng - center_lng) / 2) ** 2
+            )
+            return 2 * np.arcsin(np.sqrt(np.clip(haversine, 0, 1))) <= radius
+
+    def _numeric_mask(self, field: str, operators: Dict[str, Any], dry_run: bool) -> Optional[np.ndarray]:
+        for operator, value in operators.items():
+            if value is None and operator not in ("$eq", "$ne"):
+                raise Unsupported(f"{field} {operator} null")
+            if value is not None and not (_is_number(value) and operator in (*_COMPARISONS, "$eq")):
+                raise Unsupported(f"{field} {operator}")
+        if dry_run:
+            return None
+        values = self.numeric[field]
+        result = np.ones_like(self.alive)
+        for operator, value in operators.items():
+            if value is None:
+                missing = np.isnan(values)
+                result &= missing if operator == "$eq" else ~missing
+            elif operator == "$eq":
+                result &= values == value
+            else:
+                result &= _COMPARISONS[operator](values, value)
+        return result
+
+    def _regex_mask(self, field: str, condition: Dict[str, Any], dry_run: bool) -> Optional[np.ndarray]:
+        pattern, options = condition.get("$regex"), condition.get("$options", "")
+        if not isinstance(pattern, str) or not isinstance(options, str):
+            raise Unsupported(f"{field} $regex")
+        regex = _compile_regex(pattern, options)
+        if dry_run:
+            return None
+        # The pattern runs once per distinct value rather than once per document
+        matched = [code for code, term in enumerate(self.dictionaries[field].terms) if regex.search(term)]
+        return np.isin(self.codes[field], matched)
+
+    # ---------- counting ----------
+
+    def value_counts(self, field: str, mask: np.ndarray) -> List[Tuple[str, int]]:
+        """(value, rows) of an encoded or bitmap column within `mask`"""
+        terms = self.dictionaries[field].terms
+        if field in self.codes:
+            codes = self.codes[field][mask]
+            counts = np.bincount(codes[codes >= 0], minlength=len(terms))
+        elif field in self.bitmaps:
+            packed = np.packbits(mask)
+            counts = _POPCOUNT[self.bitmaps[field][:len(terms)] & packed].sum(axis=1)
+        else:
+            raise Unsupported(f"counts of {field}")
+        return [(terms[code], int(counts[code])) for code in np.flatnonzero(counts)]
+
+    # ---------- ordering ----------
+
+    def order(self, sort_field: str, direction: int) -> np.ndarray:
+        """Live rows sorted like MongoDB: nulls lowest, ties broken by id in the same direction"""
+        key = (sort_field, direction)
+        if key not in self._orders:
+            if sort_field not in self.numeric:
+                raise Unsupported(f"sort on {sort_field}")
+            rows = np.flatnonzero(self.alive)
+            values = self.numeric[sort_field][rows]
+            values = np.where(np.isnan(values), -np.inf, values)
+            ids = self.numeric["id"][rows]
+            rows = rows[np.lexsort((ids, values) if direction == 1 else (-ids, -values))]
+            self._orders[key] = rows
+        return self._orders[key]
+
+
+# ==================== COLLECTION VIEW ====================
+
+class _SnapshotCursor:
+    """The subset of a Motor cursor db.py list queries use"""
+
+    def __init__(self, table: _ColumnTable, query: Dict[str, Any], projection: Optional[Dict[str, Any]]):
+        self.table = table
+        self.query = query
+        self.projection = projection or {}
+        self.sort_spec: List[Tuple[str, int]] = [("id", 1)]
+        self.skip_count = 0
+        self.limit_count = 0
+
+    def sort(self, sort_spec: List[Tuple[str, int]]) -> "_SnapshotCursor":
+        self.sort_spec = list(sort_spec)
+        return self
+
+    def skip(self, count: int) -> "_SnapshotCursor":
+        self.skip_count = count
+        return self
+
+    def limit(self, count: int) -> "_SnapshotCursor":
+        self.limit_count = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        sort_field, direction = self.sort_spec[0]
+        if any(field != "id" or value != direction for field, value in self.sort_spec[1:]):
+            raise Unsupported("sort tie-breaker")
+        rows = self.table.order(sort_field, direction)
+        rows = rows[self.table.mask(self.query)[rows]]
+        end = self.skip_count + (self.limit_count or len(rows))
+        if length is not None:
+            end = min(end, self.skip_count + length)
+        return [project(self.table.documents[row], self.projection) for row in rows[self.skip_count:end]]
+
+
+class SnapshotCollection:
+    """A read-only stand-in for a Motor collection, backed by column arrays"""
+
+    def __init__(self, name: str, table: _ColumnTable):
+        self.name = name
+        self.table = table
+
+    def find(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> _SnapshotCursor:
+        return _SnapshotCursor(self.table, query, projection)
+
+    async def count_documents(self, query: Dict[str, Any]) -> int:
+        return int(np.count_nonzero(self.table.mask(query)))
+
+    async def estimated_document_count(self) -> int:
+        return len(self.table)
+
+    def facet_counts(self, query: Dict[str, Any], facets: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """What db._add_facets computes with an aggregation, from the column indexes"""
+        shared, own = db.facet_filters(self.name, query, facets)
+        shared_mask = self.table.mask(shared)
+        result = {}
+        for name in facets:
+            field = db.FACET_FIELDS[self.name][name][0]
+            mask = shared_mask & self.table.mask(own[name]) if own[name] else shared_mask
+            counts = self.table.value_counts(field, mask)
+            counts.sort(key=lambda item: (-item[1], item[0]))
+            result[name] = [{"name": term, "count": count} for term, count in counts if term]
+        return result
+
+
+# ==================== SNAPSHOT ENGINE ====================
+
+def _stored_document(collection_name: str, document: Dict[str, Any]) -> Dict[str, Any]:
+    """A public document with the shadow and location fields MongoDB stores next to it"""
+    return {
+        **document,
+        **money.shadow_fields_update(collection_name, document),
+        **geo.location_fields_update(document)
+    }
+
+
+class SnapshotEngine:
+    """Both collections in column tables, kept fresh by db.py write hooks.
+
+    The snapshot remembers which cache version of each collection it
+    reflects; every local write accounts for one version bump. A version
+    that moved further means another worker wrote: queries go to MongoDB
+    until a background reload catches up.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, _ColumnTable] = {}
+        self.synced: Dict[str, int] = {}
+        self.loaded = False
+        self._diverged_since: Dict[str, float] = {}
+        self._pending: Optional[List[Tuple[str, list]]] = None
+        self._load_task: Optional[asyncio.Task] = None
+
+    async def load(self):
+        """Read both collections from MongoDB and swap the new tables in"""
+        versions = await cache.get_cache().versions(list(COLUMNS))
+        # Writes landing while the collections are read are replayed on top
+        self._pending = []
+        try:
+            tables = {}
+            database = db.get_database()
+            for collection_name, columns in COLUMNS.items():
+                table = _ColumnTable(**columns)
+                async for document in database[collection_name].find({}, _LOAD_PROJECTION):
+                    table.upsert(_stored_document(collection_name, db.public_document(document)))
+                tables[collection_name] = table
+            pending, self._pending = self._pending, None
+        except BaseException:
+            self._pending = None
+            raise
+        synced = dict(zip(COLUMNS, versions))
+        for collection_name, changes in pending:
+            self._apply(tables[collection_name], collection_name, changes)
+            synced[collection_name] += 1
+        self.tables, self.synced = tables, synced
+        self._diverged_since = {}
+        self.loaded = True
+        print(f"Snapshot loaded: {', '.join(f'{len(table)} {name}' for name, table in tables.items())}")
+
+    def schedule_load(self):
+        """Start a background (re)load unless one is already running"""
+        if self._load_task is None or self._load_task.done():
+            self._load_task = asyncio.ensure_future(self._load_in_background())
+
+    async def _load_in_background(self):
+        try:
+            await self.load()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Snapshot load failed, MongoDB keeps answering: {e}")
+
+    async def close(self):
+        if self._load_task is not None:
+            self._load_task.cancel()
+            await asyncio.gather(self._load_task, return_exceptions=True)
+            self._load_task = None
+
+    @staticmethod
+    def _apply(table: _ColumnTable, collection_name: str, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+        for before, after in changes:
+            if after is None:
+                table.remove(before["id"])
+            else:
+                table.upsert(_stored_document(collection_name, after))
+
+    def on_write(self, collection_name: str, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+        """Apply one db.py write batch, which bumped the collection version once"""
+        if self._pending is not None:
+            self._pending.append((collection_name, changes))
+        if not self.loaded or collection_name not in self.tables:
+            return
+        self._apply(self.tables[collection_name], collection_name, changes)
+        self.synced[collection_name] += 1
+
+    async def collection(self, collection_name: str, query: Dict[str, Any]) -> Optional[SnapshotCollection]:
+        """A view that can answer `query` from memory, or None to use MongoDB"""
+        if not self.loaded:
+            self.schedule_load()
+            return None
+        table = self.tables.get(collection_name)
+        if table is None or not table.supports(query):
+            return None
+        version = (await cache.get_cache().versions([collection_name]))[0]
+        if version != self.synced[collection_name]:
+            # Either a local write between its version bump and its hook, or a
+            # write from another worker; only the latter persists
+            diverged_since = self._diverged_since.setdefault(collection_name, time.monotonic())
+            if time.monotonic() - diverged_since >= SNAPSHOT_RESYNC_SECONDS:
+                self.schedule_load()
+            return None
+        self._diverged_since.pop(collection_name, None)
+        return SnapshotCollection(collection_name, table)
+
+
+# Global engine, loaded in the background on first use
+_engine = SnapshotEngine()
+
+
+def get_engine() -> SnapshotEngine:
+    return _engine
+
+
+async def close_engine():
+    await _engine.close()
+
+
+db.add_write_listener(_engine.on_write)
+
+if SNAPSHOT_ENGINE:
+    if cache.get_cache().versions_shared():
+        db.set_list_engine(_engine)
+    else:
+        # Writes on other workers would never show up in this worker's snapshot
+        print("SNAPSHOT_ENGINE needs CACHE_BACKEND=redis when WEB_CONCURRENCY > 1; list queries go to the database")
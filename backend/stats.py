@@ -0,0 +1,291 @@
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timezone
+from urllib.parse import unquote
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import os
+import geo
+
+
+# ==================== MATERIALIZED STATS ====================
+
+# Single document in the `stats` collection holding every platform counter.
+# Writes in db.py keep it current with $inc; rebuild() recomputes it from scratch
+# and can run while the API is serving writes.
+STATS_COLLECTION = "stats"
+STATS_ID = "global"
+# Count of $inc writes applied to the document; rebuild() only replaces a
+# document whose count hasn't moved while it was recomputing
+WRITES_FIELD = "writes"
+# Recomputes rebuild() tries before giving up to a steady stream of writes
+STATS_REBUILD_ATTEMPTS = int(os.getenv("STATS_REBUILD_ATTEMPTS", 5))
+# Layout of the stored counters; load() rebuilds documents written with another one
+# (2: locations are counted under their canonical label)
+STATS_SCHEMA = 2
+
+# Distributions live in sub-documents keyed by encoded value.
+# Distribution name -> (document field, whether the field is an array)
+INVESTOR_DISTRIBUTIONS = {
+    "industries": ("focusIndustries", True),
+    "investmentStages": ("investmentStages", True),
+    "locations": ("location", False),
+}
+STARTUP_DISTRIBUTIONS = {
+    "industries": ("industry", False),
+    "fundingStages": ("fundingStage", False),
+    "locations": ("location", False),
+    "categories": ("categories", True),
+    "tags": ("tags", True),
+}
+
+# Fields counted under a canonical form of their value, so spelling variants
+# ("SF", "San Francisco, CA") share one counter
+CANONICAL_VALUES = {"location": geo.label}
+
+
+def _encode_key(value: str) -> str:
+    """Make a value safe as a field name ('.' and a leading '$' are not allowed)"""
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _decode_key(key: str) -> str:
+    return unquote(key)
+
+
+def _canonical(field: str, value: Any) -> Any:
+    canonical = CANONICAL_VALUES.get(field)
+    return canonical(value) if canonical and isinstance(value, str) else value
+
+
+def _values(document: Dict[str, Any], field: str, is_array: bool) -> List[Any]:
+    """Values of a field the same way $group/$unwind see them, canonicalized; empty ones are skipped"""
+    value = document.get(field)
+    if isinstance(value, list):
+        values = [item for item in value if item] if is_array else []
+    else:
+        values = [value] if value else []
+    return [canonical for canonical in (_canonical(field, item) for item in values) if canonical]
+
+
+def _number(value: Any) -> int:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def _investor_contribution(document: Dict[str, Any]) -> Dict[str, int]:
+    """Counter increments one investor document accounts for"""
+    active = document.get("status") == "Active"
+    incubator = "duration" in document
+    counters = {
+        "investors.total": 1,
+        "investors.active": int(active),
+        "investors.activeNonIncubator": int(active and not incubator),
+        "investors.incubators": int(incubator),
+        "investors.activeDeals": _number(document.get("activeDeals")) if active else 0,
+        "investors.portfolioCompanies": _number(document.get("portfolioCompanies")) if active else 0,
+    }
+    _add_distributions(counters, "investors", INVESTOR_DISTRIBUTIONS, document)
+    return counters
+
+
+def _startup_contribution(document: Dict[str, Any]) -> Dict[str, int]:
+    """Counter increments one startup document accounts for"""
+    counters = {"startups.total": 1}
+    _add_distributions(counters, "startups", STARTUP_DISTRIBUTIONS, document)
+    return counters
+
+
+def _add_distributions(counters: Dict[str, int], prefix: str, distributions, document: Dict[str, Any]):
+    for name, (field, is_array) in distributions.items():
+        for value in _values(document, field, is_array):
+            path = f"{prefix}.{name}.{_encode_key(str(value))}"
+            counters[path] = counters.get(path, 0) + 1
+
+
+_CONTRIBUTIONS = {"investors": _investor_contribution, "startups": _startup_contribution}
+
+
+def change_delta(
+    collection_name: str,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]]
+) -> Dict[str, int]:
+    """$inc document turning the counters for `before` into the counters for `after`"""
+    contribution = _CONTRIBUTIONS[collection_name]
+    delta = contribution(after) if after else {}
+    for path, amount in (contribution(before) if before else {}).items():
+        delta[path] = delta.get(path, 0) - amount
+    return {path: amount for path, amount in delta.items() if amount}
+
+
+async def record_changes(
+    database,
+    collection_name: str,
+    changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+):
+    """Apply a batch of (before, after) writes to the counters with a single $inc.
+
+    There is deliberately no upsert: until the first rebuild() creates the
+    document, partial counters would be wrong, and reads rebuild on demand.
+    Every $inc also counts itself in WRITES_FIELD so rebuilds can detect it.
+    """
+    delta: Dict[str, int] = {}
+    for before, after in changes:
+        for path, amount in change_delta(collection_name, before, after).items():
+            delta[path] = delta.get(path, 0) + amount
+    delta = {path: amount for path, amount in delta.items() if amount}
+    if delta:
+        await database[STATS_COLLECTION].update_one({"_id": STATS_ID}, {"$inc": {**delta, WRITES_FIELD: 1}})
+
+
+# ==================== REBUILD ====================
+
+def _count_by(field: str, unwind: bool = False) -> List[Dict[str, Any]]:
+    """Pipeline stages counting documents per value of a field"""
+    stages = [{"$unwind": f"${field}"}] if unwind else []
+    stages.append({"$group": {"_id": f"${field}", "count": {"$sum": 1}}})
+    return stages
+
+
+def _facet_count(items: List[Dict[str, Any]]) -> int:
+    """Read a {"$count": "n"} facet, which is empty when nothing matched"""
+    return items[0]["n"] if items else 0
+
+
+def _distribution(field: str, items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Counters by encoded value, merging the groups of values with the same canonical form"""
+    distribution: Dict[str, int] = {}
+    for item in items:
+        value = _canonical(field, item["_id"]) if item["_id"] else None
+        if value:
+            key = _encode_key(str(value))
+            distribution[key] = distribution.get(key, 0) + item["count"]
+    return distribution
+
+
+async def _recompute(database) -> Dict[str, Any]:
+    """Every counter from scratch, with one $facet pipeline per collection"""
+    investors_pipeline = [{"$facet": {
+        "total": [{"$count": "n"}],
+        "active": [{"$match": {"status": "Active"}}, {"$count": "n"}],
+        "activeNonIncubator": [
+            {"$match": {"status": "Active", "duration": {"$exists": False}}},
+            {"$count": "n"}
+        ],
+        "incubators": [{"$match": {"duration": {"$exists": True}}}, {"$count": "n"}],
+        "sums": [
+            {"$match": {"status": "Active"}},
+            {"$group": {
+                "_id": None,
+                "activeDeals": {"$sum": "$activeDeals"},
+                "portfolioCompanies": {"$sum": "$portfolioCompanies"}
+            }}
+        ],
+        **{
+            name: _count_by(field, unwind=is_array)
+            for name, (field, is_array) in INVESTOR_DISTRIBUTIONS.items()
+        }
+    }}]
+    startups_pipeline = [{"$facet": {
+        "total": [{"$count": "n"}],
+        **{
+            name: _count_by(field, unwind=is_array)
+            for name, (field, is_array) in STARTUP_DISTRIBUTIONS.items()
+        }
+    }}]
+
+    investors_result, startups_result = await asyncio.gather(
+        database["investors"].aggregate(investors_pipeline).to_list(length=1),
+        database["startups"].aggregate(startups_pipeline).to_list(length=1)
+    )
+    investors_facets = investors_result[0]
+    startups_facets = startups_result[0]
+    sums = investors_facets["sums"][0] if investors_facets["sums"] else {}
+
+    document = {
+        "_id": STATS_ID,
+        "investors": {
+            "total": _facet_count(investors_facets["total"]),
+            "active": _facet_count(investors_facets["active"]),
+            "activeNonIncubator": _facet_count(investors_facets["activeNonIncubator"]),
+            "incubators": _facet_count(investors_facets["incubators"]),
+            "activeDeals": sums.get("activeDeals", 0),
+            "portfolioCompanies": sums.get("portfolioCompanies", 0),
+            **{
+                name: _distribution(field, investors_facets[name])
+                for name, (field, _) in INVESTOR_DISTRIBUTIONS.items()
+            }
+        },
+        "startups": {
+            "total": _facet_count(startups_facets["total"]),
+            **{
+                name: _distribution(field, startups_facets[name])
+                for name, (field, _) in STARTUP_DISTRIBUTIONS.items()
+            }
+        },
+        "schema": STATS_SCHEMA,
+        "rebuiltAt": datetime.now(timezone.utc)
+    }
+    return document
+
+
+async def rebuild(database) -> Dict[str, Any]:
+    """Recompute every counter and store it without losing concurrent writes.
+
+    Writes keep $inc-ing the stored document while the collections are read.
+    The recomputed document only replaces one whose write count is unchanged
+    since before the read (compare-and-swap); otherwise the recompute is
+    retried, since it may have missed those writes.
+    """
+    collection = database[STATS_COLLECTION]
+    for _ in range(STATS_REBUILD_ATTEMPTS):
+        try:
+            # Gives writes made during the first recompute a document to count against
+            await collection.update_one({"_id": STATS_ID}, {"$setOnInsert": {WRITES_FIELD: 0}}, upsert=True)
+        except DuplicateKeyError:
+            pass
+        current = await collection.find_one({"_id": STATS_ID}, {WRITES_FIELD: 1})
+        writes = (current or {}).get(WRITES_FIELD)
+        document = await _recompute(database)
+        document[WRITES_FIELD] = writes or 0
+        # A null filter value also matches documents from before WRITES_FIELD existed
+        result = await collection.replace_one({"_id": STATS_ID, WRITES_FIELD: writes}, document)
+        if result.matched_count:
+            return document
+    raise RuntimeError(f"Stats rebuild raced concurrent writes {STATS_REBUILD_ATTEMPTS} times; retry when writes slow down")
+
+
+async def load(database) -> Dict[str, Any]:
+    """Read the stats document, building it on first use"""
+    document = await database[STATS_COLLECTION].find_one({"_id": STATS_ID})
+    if document is None or "rebuiltAt" not in document or document.get("schema") != STATS_SCHEMA:
+        # Missing, the placeholder of a rebuild still in progress, or an older layout
+        document = await rebuild(database)
+    return document
+
+
+# ==================== FORMATTING ====================
+
+def named_counts(distribution: Dict[str, int], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """{name, count} list, most frequent first; counters decremented to zero are dropped"""
+    items = [
+        {"name": _decode_key(key), "count": count}
+        for key, count in distribution.items() if count > 0
+    ]
+    items.sort(key=lambda item: (-item["count"], item["name"]))
+    return items[:limit] if limit else items
+
+
+async def _main():
+    # db imports this module, so it is only pulled in when run as a script
+    import db
+    document = await rebuild(db.get_database())
+    print(
+        f"Rebuilt stats: {document['investors']['total']} investors, "
+        f"{document['startups']['total']} startups"
+    )
+    db.close_database()
+
+
+if __name__ == "__main__":
+    # python stats.py -> reconcile the materialized stats with a full recompute
+    asyncio.run(_main())
@@ -0,0 +1,36 @@
+from typing import Callable, Awaitable, Any
+import asyncio
+import os
+import sys
+import httpx
+import pytest
+
+# Tests run on the embedded store unless pointed at a server
+# (STORAGE_BACKEND=mongodb MONGODB_URL=...). They replace the contents of
+# DATABASE_NAME, so it defaults to a database of their own.
+os.environ.setdefault("STORAGE_BACKEND", "embedded")
+os.environ.setdefault("DATABASE_NAME", "Visnex_test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def _run_against_app(scenario: Callable[[httpx.AsyncClient], Awaitable[Any]]) -> Any:
+    import db
+    import main
+    import stats
+
+    database = db.get_database()
+    for collection_name in ("investors", "startups", db.COUNTERS_COLLECTION, stats.STATS_COLLECTION):
+        await database[collection_name].drop()
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+    finally:
+        await main.app.router.shutdown()
+
+
+@pytest.fixture
+def api() -> Callable:
+    """Run `await scenario(client)` against the app started on an empty database"""
+    return lambda scenario: asyncio.run(_run_against_app(scenario))
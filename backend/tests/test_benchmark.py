@@ -0,0 +1,59 @@
+import json
+
+import benchmark
+import matching
+
+
+def test_every_scenario_runs_against_the_seeded_app(api):
+    async def scenario(client):
+        # Seeding replaces the collections under the running app
+        matching._engine = matching.MatchingEngine()
+        assert await benchmark.seed_database(60) == {"investors": 60, "startups": 60}
+        dashboard = (await client.get("/api/stats/dashboard")).json()
+        assert dashboard["totals"]["investors"] == dashboard["totals"]["startups"] == 60
+
+        mix = {scenario: 1 for scenario in benchmark.MIXES["full"]}
+        report = await benchmark.run_benchmark(client, mix, concurrency=4, duration=1.5, warmup=0.2)
+        assert report["summary"]["requests"] > 0
+        assert {name: summary["errors"] for name, summary in report["endpoints"].items() if summary["errors"]} == {}
+        assert report["summary"]["latencyMs"]["p50"] <= report["summary"]["latencyMs"]["p99"]
+
+    api(scenario)
+
+
+def _report(latency_ms: dict, errors: dict = None, duration: float = 10) -> dict:
+    """A run report whose endpoints each took a fixed latency on every request"""
+    endpoints = {
+        name: benchmark.summarize([ms / 1000] * requests, (errors or {}).get(name, 0), duration)
+        for name, (ms, requests) in latency_ms.items()
+    }
+    samples = [ms / 1000 for ms, requests in latency_ms.values() for _ in range(requests)]
+    return {
+        "summary": benchmark.summarize(samples, sum((errors or {}).values()), duration),
+        "endpoints": endpoints,
+        "meta": {"target": "in-process", "mix": "read", "concurrency": 4},
+    }
+
+
+def test_compare_flags_only_regressions_beyond_the_noise(tmp_path, capsys):
+    base = _report({"list": (10, 100), "detail": (2, 100), "rare": (5, 3)})
+    head = _report(
+        {"list": (20, 100), "detail": (2.5, 100), "rare": (50, 3)},
+        errors={"detail": 5}
+    )
+
+    regressions = benchmark.compare(base, head, threshold=0.10, min_ms=1.0, min_requests=20)
+    flagged = {(item["endpoint"], item["metric"]) for item in regressions}
+    # detail slowed by 0.5ms (under min_ms) but started failing; rare has too few samples
+    assert flagged == {
+        ("list", "p50"), ("list", "p95"), ("list", "p99"),
+        ("detail", "errorRate"),
+        ("summary", "p50"), ("summary", "p95"), ("summary", "p99"), ("summary", "errorRate"),
+    }
+    assert benchmark.compare(base, base, threshold=0.10, min_ms=1.0, min_requests=20) == []
+
+    for name, report in (("base.json", base), ("head.json", head)):
+        (tmp_path / name).write_text(json.dumps(report))
+    assert benchmark.main(["compare", str(tmp_path / "base.json"), str(tmp_path / "base.json")]) == 0
+    assert benchmark.main(["compare", str(tmp_path / "base.json"), str(tmp_path / "head.json")]) == 1
+    assert "REGRESSION list p50: 10.0 -> 20.0 (+100.0%)" in capsys.readouterr().out
@@ -0,0 +1,53 @@
+import json
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "frontend", "src", "data")
+
+
+def _seed_file(name: str) -> bytes:
+    with open(os.path.join(DATA_DIR, name), "rb") as f:
+        return f.read()
+
+
+def test_seed_files_import_in_one_call_each(api):
+    investors_data = json.loads(_seed_file("investorsData.json"))
+    startups_data = json.loads(_seed_file("startupsData.json"))
+
+    async def scenario(client):
+        headers = {"Content-Type": "application/json"}
+        investors = await client.post("/api/investors:bulk", content=_seed_file("investorsData.json"), headers=headers)
+        startups = await client.post("/api/startups:bulk", content=_seed_file("startupsData.json"), headers=headers)
+        total = len(investors_data["investors"]) + len(investors_data["incubators"])
+        assert investors.json() == {"inserted": total, "failed": 0, "errors": []}
+        assert startups.json() == {"inserted": len(startups_data["startups"]), "failed": 0, "errors": []}
+
+        incubators = (await client.get("/api/investors/incubators/all")).json()["data"]
+        assert sorted(incubator["name"] for incubator in incubators) == sorted(i["name"] for i in investors_data["incubators"])
+        assert all("focusAreas" in incubator and "investmentRange" not in incubator for incubator in incubators)
+
+        stored = (await client.get("/api/startups", params={"sort_by": "matchPercentage", "limit": 100})).json()["data"]
+        by_name = {startup["name"]: startup for startup in startups_data["startups"]}
+        assert [startup["matchPercentage"] for startup in stored] == sorted(
+            (startup["matchPercentage"] for startup in startups_data["startups"]), reverse=True
+        )
+        assert all(startup["tags"] == by_name[startup["name"]]["tags"] for startup in stored)
+
+    api(scenario)
+
+
+def test_bulk_rows_are_validated_per_model(api):
+    async def scenario(client):
+        rows = [
+            {"name": "Half an incubator", "duration": "3 Months"},
+            {"name": "Half an investor", "type": "VC Firm"},
+            "not an object",
+        ]
+        body = b"\n".join(json.dumps(row).encode() for row in rows) + b"\n{broken"
+        response = (await client.post("/api/investors:bulk", content=body)).json()
+        assert response["inserted"] == 0
+        assert [error["row"] for error in response["errors"]] == [1, 2, 3, 4]
+        assert "description" in response["errors"][0]["error"]
+        assert "investmentThesis" in response["errors"][1]["error"]
+        assert response["errors"][3]["error"].startswith("Invalid JSON")
+
+    api(scenario)
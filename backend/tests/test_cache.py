@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+import cache
+import db
+import embedded
+
+from test_locations import STARTUP
+from test_updates import INVESTOR
+
+
+async def _counts(client, name: str) -> dict:
+    return (await client.get("/api/cache/metrics")).json()["byName"][name]
+
+
+def test_filter_lists_are_cached_until_a_write(api):
+    async def scenario(client):
+        await client.post("/api/startups", json={**STARTUP, "categories": ["AI"]})
+
+        for _ in range(2):
+            response = await client.get("/api/startups/filters/categories")
+            assert response.json()["categories"] == [{"name": "AI", "count": 1}]
+        assert await _counts(client, "get_startup_categories") == {"hits": 1, "misses": 1, "coalesced": 0}
+
+        # Only writes to the collection a list depends on start a new entry
+        await client.post("/api/investors", json=INVESTOR)
+        await client.get("/api/startups/filters/categories")
+        assert await _counts(client, "get_startup_categories") == {"hits": 2, "misses": 1, "coalesced": 0}
+
+        await client.post("/api/startups", json={**STARTUP, "categories": ["AI", "Data"]})
+        response = await client.get("/api/startups/filters/categories")
+        assert response.json()["categories"] == [{"name": "AI", "count": 2}, {"name": "Data", "count": 1}]
+        assert await _counts(client, "get_startup_categories") == {"hits": 2, "misses": 2, "coalesced": 0}
+
+        metrics = (await client.get("/api/cache/metrics")).json()
+        assert metrics["backend"] == "memory"
+        assert metrics["hitRate"] == round(metrics["hits"] / (metrics["hits"] + metrics["misses"]), 4)
+
+    api(scenario)
+
+
+def test_entries_expire_after_their_ttl(api):
+    loads = []
+
+    async def loader():
+        loads.append(len(loads))
+        return len(loads)
+
+    async def scenario(client):
+        shared_cache = cache.get_cache()
+        assert await shared_cache.get_or_load("probe", ["startups"], "key", loader, ttl=0.05) == 1
+        assert await shared_cache.get_or_load("probe", ["startups"], "key", loader, ttl=0.05) == 1
+        await asyncio.sleep(0.1)
+        assert await shared_cache.get_or_load("probe", ["startups"], "key", loader, ttl=0.05) == 2
+        assert shared_cache.hits["probe"] == 1 and shared_cache.misses["probe"] == 2
+
+    api(scenario)
+
+
+def test_identical_concurrent_reads_share_one_query(api, monkeypatch):
+    count_documents = embedded.Collection.count_documents
+    counted, release = [], asyncio.Event()
+
+    async def held_count(self, filter, *args, **kwargs):
+        if self.name == "startups":
+            counted.append(filter)
+            await release.wait()
+        return await count_documents(self, filter, *args, **kwargs)
+
+    async def scenario(client):
+        await client.post("/api/startups", json=STARTUP)
+        monkeypatch.setattr(embedded.Collection, "count_documents", held_count)
+
+        requests = [asyncio.ensure_future(client.get("/api/startups", params={"industry": "SaaS"})) for _ in range(5)]
+        other = asyncio.ensure_future(client.get("/api/startups", params={"industry": "FinTech"}))
+        # Every request reaches the cache before the held queries are let go
+        await asyncio.sleep(0.1)
+        release.set()
+        responses = await asyncio.gather(*requests, other)
+
+        assert counted == [{"industry": "SaaS"}, {"industry": "FinTech"}]
+        assert [response.json()["total"] for response in responses] == [1, 1, 1, 1, 1, 0]
+        assert (await _counts(client, "get_all_startups"))["coalesced"] == 4
+
+    api(scenario)
+
+
+def test_a_flight_outlives_a_cancelled_caller_and_shares_its_error(api):
+    release = asyncio.Event()
+    calls = []
+
+    async def loader():
+        calls.append(len(calls))
+        await release.wait()
+        if len(calls) == 1:
+            raise ValueError("first load failed")
+        return "loaded"
+
+    async def scenario(client):
+        shared_cache = cache.get_cache()
+        first = asyncio.ensure_future(shared_cache.single_flight("probe", "key", loader))
+        second = asyncio.ensure_future(shared_cache.single_flight("probe", "key", loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        release.set()
+        with pytest.raises(ValueError, match="first load failed"):
+            await second
+        assert first.cancelled()
+
+        # A landed flight is not reused
+        assert await shared_cache.single_flight("probe", "key", loader) == "loaded"
+        assert calls == [0, 1]
+        assert shared_cache.coalesced["probe"] == 1
+
+    api(scenario)
+
+
+def test_per_process_versions_cap_entry_lifetimes_with_several_workers(api, monkeypatch):
+    monkeypatch.setattr(cache, "WEB_CONCURRENCY", 2)
+    monkeypatch.setattr(cache, "MICRO_CACHE_TTL", 0.05)
+
+    async def scenario(client):
+        await client.post("/api/startups", json={**STARTUP, "categories": ["AI"]})
+        response = await client.get("/api/startups/filters/categories")
+        assert "etag" not in response.headers
+        assert (await client.get("/api/cache/metrics")).json()["versionsShared"] is False
+
+        # Another worker's write: it does not move this process's versions
+        await db.get_database()["startups"].insert_one({**STARTUP, "id": 2, "categories": ["Robotics"]})
+        response = await client.get("/api/startups/filters/categories")
+        assert [item["name"] for item in response.json()["categories"]] == ["AI"]
+        await asyncio.sleep(0.1)
+        response = await client.get("/api/startups/filters/categories")
+        assert [item["name"] for item in response.json()["categories"]] == ["AI", "Robotics"]
+
+    api(scenario)
@@ -0,0 +1,40 @@
+import asyncio
+
+import embedded
+
+from test_locations import STARTUP
+from test_updates import INVESTOR
+
+
+def test_a_slow_query_does_not_hold_up_other_requests(api, monkeypatch):
+    count_documents = embedded.Collection.count_documents
+    entered, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_count(self, filter, *args, **kwargs):
+        if self.name == "startups":
+            entered.set()
+            await release.wait()
+        return await count_documents(self, filter, *args, **kwargs)
+
+    async def scenario(client):
+        startup = (await client.post("/api/startups", json=STARTUP)).json()
+        await client.post("/api/investors", json=INVESTOR)
+        monkeypatch.setattr(embedded.Collection, "count_documents", slow_count)
+
+        listing = asyncio.ensure_future(client.get("/api/startups"))
+        await asyncio.wait_for(entered.wait(), 5)
+        # Answered while the listing is still waiting on its count
+        others = await asyncio.wait_for(asyncio.gather(
+            client.get(f"/api/startups/{startup['id']}"),
+            client.get("/api/investors/filters/industries"),
+            client.get("/api/stats"),
+        ), 5)
+        assert [response.status_code for response in others] == [200, 200, 200]
+        assert not listing.done()
+
+        release.set()
+        response = await asyncio.wait_for(listing, 5)
+        assert [row["id"] for row in response.json()["data"]] == [startup["id"]]
+        assert others[1].json()["industries"] == INVESTOR["focusIndustries"]
+
+    api(scenario)
@@ -0,0 +1,65 @@
+import base64
+import json
+
+from test_snapshot import _startup
+
+
+def _cursor(payload: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+async def _walk(client, params: dict) -> list:
+    ids, cursor = [], "*"
+    while cursor:
+        body = (await client.get("/api/startups", params={**params, "cursor": cursor, "limit": 3})).json()
+        ids += [startup["id"] for startup in body["data"]]
+        cursor = body["nextCursor"]
+    return ids
+
+
+def test_cursor_pages_break_ties_and_place_missing_values(api):
+    async def scenario(client):
+        for index in range(25):
+            # Four team sizes for 25 startups, and every fifth funding unparseable (no sort value)
+            startup = {**_startup(index), "funding": "Undisclosed" if index % 5 == 0 else _startup(index)["funding"]}
+            assert (await client.post("/api/startups", json=startup)).status_code == 201
+
+        for sort_by in ("teamSize", "funding"):
+            for sort_order in ("asc", "desc"):
+                params = {"sort_by": sort_by, "sort_order": sort_order}
+                full = (await client.get("/api/startups", params={**params, "limit": 100})).json()["data"]
+                walked = await _walk(client, params)
+                assert walked == [startup["id"] for startup in full], params
+                assert len(set(walked)) == 25
+
+        filtered = await _walk(client, {"sort_by": "teamSize", "industry": "FinTech"})
+        assert sorted(filtered) == [index + 1 for index in range(25) if index % 3 == 1]
+
+    api(scenario)
+
+
+def test_tampered_or_mismatched_cursors_are_rejected(api):
+    async def scenario(client):
+        for index in range(5):
+            await client.post("/api/startups", json=_startup(index))
+        first = (await client.get("/api/startups", params={"sort_by": "teamSize", "cursor": "*", "limit": 2})).json()
+        valid = json.loads(base64.urlsafe_b64decode(first["nextCursor"] + "=="))
+
+        invalid = [
+            "not-a-cursor!",
+            _cursor({**valid, "v": {"$ne": None}}),
+            _cursor({**valid, "v": [1, 2]}),
+            _cursor({**valid, "id": {"$gt": 0}}),
+            _cursor({**valid, "id": True}),
+            _cursor({key: value for key, value in valid.items() if key != "v"}),
+            _cursor({**valid, "s": "founded"}),
+            _cursor({**valid, "d": 1}),
+        ]
+        for cursor in invalid:
+            response = await client.get("/api/startups", params={"sort_by": "teamSize", "cursor": cursor, "limit": 2})
+            assert response.status_code == 400, cursor
+
+        response = await client.get("/api/startups", params={"sort_by": "teamSize", "cursor": _cursor(valid), "limit": 2})
+        assert response.status_code == 200
+
+    api(scenario)
@@ -0,0 +1,136 @@
+import pytest
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+import db
+
+DOCUMENTS = [
+    {"id": 1, "n": 5, "s": "apple", "tags": ["a", "b"], "sub": {"k": 1}, "items": [{"k": 1}, {"k": 2}]},
+    {"id": 2, "n": None, "s": "Banana", "tags": ["b"]},
+    {"id": 3, "s": "cherry", "tags": []},
+    {"id": 4, "n": "7", "s": "date", "tags": "a"},
+    {"id": 5, "n": 7.5, "tags": ["c", "a"], "sub": {"k": 2}},
+    {"id": 6, "n": [1, 9], "s": "apple pie"},
+]
+
+# Query -> ids of DOCUMENTS it matches, as MongoDB answers it
+QUERIES = [
+    ({"n": None}, [2, 3]),
+    ({"n": {"$exists": False}}, [3]),
+    ({"n": {"$ne": None}}, [1, 4, 5, 6]),
+    ({"n": {"$gt": 5}}, [5, 6]),
+    ({"n": {"$gte": 1, "$lte": 1}}, [6]),
+    ({"n": {"$lt": "8"}}, [4]),
+    ({"n": {"$not": {"$gt": 5}}}, [1, 2, 3, 4]),
+    ({"tags": "a"}, [1, 4, 5]),
+    ({"tags": ["a", "b"]}, [1]),
+    ({"tags": {"$in": ["c", "b"]}}, [1, 2, 5]),
+    ({"tags": {"$nin": ["a"]}}, [2, 3, 6]),
+    ({"tags": {"$size": 0}}, [3]),
+    ({"tags": {"$all": ["a", "c"]}}, [5]),
+    ({"s": {"$regex": "^a"}}, [1, 6]),
+    ({"s": {"$regex": "^b", "$options": "i"}}, [2]),
+    ({"items.k": 2}, [1]),
+    ({"sub.k": {"$in": [1, 2]}}, [1, 5]),
+    ({"$or": [{"n": 5}, {"tags": "c"}]}, [1, 5]),
+    ({"$nor": [{"tags": "a"}, {"n": None}]}, [6]),
+    ({"$and": [{"tags": "a"}, {"id": {"$in": [4, 5, 42]}}]}, [4, 5]),
+]
+
+INDEXES = [IndexModel("id", unique=True), IndexModel("n"), IndexModel("tags"), IndexModel("s"), IndexModel("sub.k")]
+
+
+async def _collections():
+    """The documents in a collection without indexes and in one with them: equality lookups take another path"""
+    database = db.get_database()
+    collections = [database["semantics_scan"], database["semantics_indexed"]]
+    for collection in collections:
+        await collection.drop()
+    await collections[1].create_indexes(INDEXES)
+    for collection in collections:
+        await collection.insert_many([dict(document) for document in DOCUMENTS])
+    return collections
+
+
+def test_queries_match_like_mongodb(api):
+    async def scenario(client):
+        for collection in await _collections():
+            for query, expected in QUERIES:
+                found = await collection.find(query, {"_id": 0, "id": 1}).to_list(length=None)
+                assert sorted(document["id"] for document in found) == expected, (collection.name, query)
+                assert await collection.count_documents(query) == len(expected)
+
+            with pytest.raises(OperationFailure):
+                await collection.find({"n": {"$near": 1}}).to_list(length=None)
+
+    api(scenario)
+
+
+def test_sorts_follow_bson_order(api):
+    async def scenario(client):
+        for collection in await _collections():
+            async def ids(sort, skip=0, limit=0):
+                cursor = collection.find({}, {"_id": 0, "id": 1}).sort(sort).skip(skip).limit(limit)
+                return [document["id"] for document in await cursor.to_list(length=None)]
+
+            # Missing and null first, then numbers (arrays by their lowest element), then strings
+            assert await ids([("n", 1), ("id", 1)]) == [2, 3, 6, 1, 5, 4]
+            # Descending, arrays sort by their highest element
+            assert await ids([("n", -1), ("id", 1)]) == [4, 6, 5, 1, 2, 3]
+            assert await ids([("n", 1), ("id", 1)], skip=1, limit=2) == [3, 6]
+            assert await ids([("s", 1), ("id", -1)]) == [5, 2, 1, 6, 3, 4]
+
+    api(scenario)
+
+
+def test_projection_distinct_and_aggregation(api):
+    async def scenario(client):
+        for collection in await _collections():
+            assert await collection.find_one({"id": 1}, {"_id": 0, "id": 1, "sub.k": 1, "items.k": 1}) == {
+                "id": 1, "sub": {"k": 1}, "items": [{"k": 1}, {"k": 2}]
+            }
+            assert "s" not in await collection.find_one({"id": 2}, {"s": 0})
+            assert sorted(await collection.distinct("tags")) == ["a", "b", "c"]
+
+            counts = await collection.aggregate([
+                {"$unwind": "$tags"},
+                {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ]).to_list(length=None)
+            # A scalar is unwound as itself; an empty array and a missing field drop the document
+            assert counts == [{"_id": "a", "count": 3}, {"_id": "b", "count": 2}, {"_id": "c", "count": 1}]
+
+            facets = (await collection.aggregate([
+                {"$match": {"n": {"$exists": True}}},
+                {"$facet": {"total": [{"$count": "n"}], "none": [{"$match": {"id": 42}}, {"$count": "n"}]}},
+            ]).to_list(length=1))[0]
+            assert facets == {"total": [{"n": 5}], "none": []}
+
+    api(scenario)
+
+
+def test_updates_upserts_and_unique_indexes(api):
+    async def scenario(client):
+        collection = (await _collections())[1]
+
+        result = await collection.update_one({"id": 3}, {"$inc": {"n": 2}, "$push": {"tags": "z"}, "$unset": {"s": ""}})
+        assert (result.matched_count, result.modified_count) == (1, 1)
+        assert await collection.find_one({"id": 3}, {"_id": 0}) == {"id": 3, "n": 2, "tags": ["z"]}
+        # The indexes follow the update
+        assert [document["id"] for document in await collection.find({"tags": "z"}).to_list(length=None)] == [3]
+        assert await collection.count_documents({"n": None}) == 1
+
+        for hits in (1, 2):
+            await collection.update_one(
+                {"id": 7, "kind": {"$eq": "x"}}, {"$setOnInsert": {"n": 0}, "$inc": {"hits": 1}}, upsert=True
+            )
+            assert await collection.find_one({"id": 7}, {"_id": 0}) == {"id": 7, "kind": "x", "n": 0, "hits": hits}
+
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"id": 1})
+        with pytest.raises(DuplicateKeyError):
+            await collection.update_one({"id": 2}, {"$set": {"id": 1}})
+        assert await collection.count_documents({"id": 1}) == 1
+        assert await collection.count_documents({"id": 2}) == 1
+
+    api(scenario)
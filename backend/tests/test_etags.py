@@ -0,0 +1,44 @@
+from test_updates import INVESTOR
+
+
+def test_list_etags_are_weak_and_revalidate_across_encodings(api):
+    async def scenario(client):
+        # Enough of them to pass the compression threshold
+        for _ in range(5):
+            await client.post("/api/investors", json=INVESTOR)
+
+        plain = await client.get("/api/investors", headers={"Accept-Encoding": "identity"})
+        gzipped = await client.get("/api/investors", headers={"Accept-Encoding": "gzip"})
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert plain.headers["etag"] == gzipped.headers["etag"]
+        assert plain.headers["etag"].startswith('W/"')
+
+        revalidated = await client.get("/api/investors", headers={"If-None-Match": plain.headers["etag"]})
+        assert revalidated.status_code == 304
+
+    api(scenario)
+
+
+def test_detail_etags_depend_on_the_fieldset(api):
+    async def scenario(client):
+        created = (await client.post("/api/investors", json=INVESTOR)).json()
+        path = f"/api/investors/{created['id']}"
+
+        full = (await client.get(path)).headers["etag"]
+        sparse = (await client.get(path, params={"fields": "name,logo"})).headers["etag"]
+        reordered = (await client.get(path, params={"fields": "logo,name"})).headers["etag"]
+        assert full == f'W/"{created["version"]}"'
+        assert sparse != full and sparse == reordered
+
+        assert (await client.get(path, params={"fields": "name,logo"}, headers={"If-None-Match": full})).status_code == 200
+        assert (await client.get(path, params={"fields": "name,logo"}, headers={"If-None-Match": sparse})).status_code == 304
+        assert (await client.get(path, headers={"If-None-Match": full})).status_code == 304
+
+        # Either ETag carries the version If-Match checks
+        updated = await client.patch(path, json={"name": "Renamed"}, headers={"If-Match": sparse})
+        assert updated.status_code == 200
+        assert updated.headers["etag"] == f'W/"{created["version"] + 1}"'
+        stale = await client.patch(path, json={"name": "Again"}, headers={"If-Match": full})
+        assert stale.status_code == 412
+
+    api(scenario)
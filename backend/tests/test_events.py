@@ -0,0 +1,83 @@
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+import db
+import events
+
+
+class FakeStream:
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.changes:
+            # Stay open like an idle change stream
+            await asyncio.Event().wait()
+        change = self.changes.pop(0)
+        if isinstance(change, Exception):
+            raise change
+        self.resume_token = change["_id"]
+        return change
+
+
+class FakeCollection:
+    """Serves a stream that fails with `error` after its first change, then a healthy one"""
+
+    def __init__(self, error):
+        self.error = error
+        self.resumed_from = []
+
+    def watch(self, resume_after=None, **options):
+        self.resumed_from.append(resume_after)
+        if len(self.resumed_from) == 1:
+            return FakeStream([{"_id": "t1", "operationType": "insert", "fullDocument": {"id": 1}}, self.error])
+        return FakeStream([{"_id": "t2", "operationType": "insert", "fullDocument": {"id": 2}}])
+
+
+async def _watch_until(hub, collection, count):
+    subscription = await hub.subscribe()
+    task = asyncio.ensure_future(hub._watch("startups", False))
+    received = []
+    try:
+        while len(received) < count:
+            _, event = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+            received.append(event)
+    finally:
+        task.cancel()
+    return received
+
+
+def _run(monkeypatch, error, count):
+    collection = FakeCollection(error)
+    monkeypatch.setattr(db, "get_database", lambda: {"startups": collection})
+    monkeypatch.setattr(events, "EVENTS_SOURCE", "inprocess")
+    sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, "sleep", lambda delay: sleep(0))
+    return collection, asyncio.run(_watch_until(events.EventHub(), collection, count))
+
+
+def test_lost_history_restarts_from_now_and_resets_subscribers(monkeypatch):
+    collection, received = _run(monkeypatch, OperationFailure("history lost", code=286), 3)
+
+    assert [(event["type"], event["id"]) for event in received] == [("insert", 1), ("reset", None), ("insert", 2)]
+    assert received[1]["collection"] == "startups"
+    assert collection.resumed_from == [None, None]
+
+
+def test_resumable_errors_keep_the_resume_token(monkeypatch):
+    error = OperationFailure("not primary", code=10107, details={"errorLabels": ["ResumableChangeStreamError"]})
+    collection, received = _run(monkeypatch, error, 2)
+
+    assert [(event["type"], event["id"]) for event in received] == [("insert", 1), ("insert", 2)]
+    assert collection.resumed_from == [None, "t1"]
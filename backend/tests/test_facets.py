@@ -0,0 +1,68 @@
+from collections import Counter
+
+import geo
+
+from test_snapshot import _startup
+
+# Values each facet counts for a startup; arrays count every element, as $unwind does
+FACETS = {
+    "industry": lambda startup: [startup["industry"]],
+    "fundingStage": lambda startup: [startup["fundingStage"]],
+    "location": lambda startup: [geo.label(startup["location"])],
+    "categories": lambda startup: startup["categories"],
+    "tags": lambda startup: startup["tags"],
+}
+
+
+def _expected(startups: list, selected: dict) -> dict:
+    """Counts per facet over the startups matching every selection but the facet's own"""
+    counts = {}
+    for name, values in FACETS.items():
+        matching = [
+            startup for startup in startups
+            if all(value in FACETS[other](startup) for other, value in selected.items() if other != name)
+        ]
+        counted = Counter(value for startup in matching for value in values(startup))
+        items = sorted(counted.items(), key=lambda item: (-item[1], item[0]))
+        counts[name] = [{"name": value, "count": count} for value, count in items]
+    return counts
+
+
+def test_facet_counts_leave_out_their_own_selection(api):
+    startups = [_startup(index) for index in range(30)]
+
+    async def scenario(client):
+        for startup in startups:
+            assert (await client.post("/api/startups", json=startup)).status_code == 201
+        facets = ",".join(FACETS)
+
+        for params, selected in (
+            ({}, {}),
+            ({"industry": "FinTech"}, {"industry": "FinTech"}),
+            ({"industry": "FinTech", "funding_stage": "Seed"}, {"industry": "FinTech", "fundingStage": "Seed"}),
+            ({"location": "Berlin", "funding_stage": "Series A"}, {"location": "Berlin, Germany", "fundingStage": "Series A"}),
+        ):
+            response = (await client.get("/api/startups", params={**params, "facets": facets, "limit": 3})).json()
+            assert response["facets"] == _expected(startups, selected), params
+            # The page itself still applies every filter
+            matching = [s for s in startups if all(value in FACETS[name](s) for name, value in selected.items())]
+            assert response["total"] == len(matching)
+
+        # A selection with no matches keeps counts for the values it could switch to
+        response = (await client.get("/api/startups", params={"industry": "Nope", "facets": "industry,tags"})).json()
+        assert response["total"] == 0
+        assert response["facets"]["industry"] == _expected(startups, {})["industry"]
+        assert response["facets"]["tags"] == []
+
+    api(scenario)
+
+
+def test_unknown_facets_are_rejected(api):
+    async def scenario(client):
+        response = await client.get("/api/startups", params={"facets": "industry,teamSize"})
+        assert response.status_code == 400
+        assert "teamSize" in response.json()["detail"]
+        response = await client.get("/api/investors", params={"facets": "industry"})
+        assert response.status_code == 400
+
+    api(scenario)
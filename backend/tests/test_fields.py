@@ -0,0 +1,35 @@
+import json
+
+from test_updates import INVESTOR
+
+
+def test_detail_and_export_return_only_requested_fields(api):
+    async def scenario(client):
+        created = (await client.post("/api/investors", json=INVESTOR)).json()
+
+        detail = await client.get(f"/api/investors/{created['id']}", params={"fields": "name,investmentRange.min"})
+        assert detail.status_code == 200
+        assert detail.json() == {"id": created["id"], "name": INVESTOR["name"], "investmentRange": {"min": "$1M"}}
+        assert detail.headers["etag"].startswith(f'W/"{created["version"]}.')
+
+        export = await client.get("/api/investors/export", params={"fields": "name"})
+        assert [json.loads(line) for line in export.text.splitlines()] == [
+            {"id": created["id"], "name": INVESTOR["name"]}
+        ]
+
+    api(scenario)
+
+
+def test_overlapping_fields_are_rejected(api):
+    async def scenario(client):
+        created = (await client.post("/api/investors", json=INVESTOR)).json()
+
+        for path in ("/api/investors", f"/api/investors/{created['id']}", "/api/investors/export"):
+            response = await client.get(path, params={"fields": "investmentRange,investmentRange.min"})
+            assert response.status_code == 400, path
+            assert "investmentRange.min" in response.json()["detail"]
+
+        response = await client.get("/api/investors", params={"fields": "id.x"})
+        assert response.status_code == 400
+
+    api(scenario)
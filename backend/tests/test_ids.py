@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+CONCURRENT_CREATES = 100
+
+
+def _startup(index: int) -> dict:
+    return {
+        "name": f"Concurrent {index}",
+        "logo": "https://example.com/logo.svg",
+        "tagline": "Stress test",
+        "description": "Created concurrently with its siblings",
+        "industry": "SaaS",
+        "fundingStage": "Seed",
+        "location": "Berlin",
+        "funding": "$1M",
+        "teamSize": 5,
+        "founded": 2020,
+        "growth": "+10%",
+        "categories": ["SaaS"],
+    }
+
+
+def test_concurrent_creates_get_unique_consecutive_ids(api):
+    async def scenario(client):
+        responses = await asyncio.gather(*(
+            client.post("/api/startups", json=_startup(index)) for index in range(CONCURRENT_CREATES)
+        ))
+        assert [response.status_code for response in responses] == [201] * CONCURRENT_CREATES
+
+        ids = sorted(response.json()["id"] for response in responses)
+        assert ids == list(range(1, CONCURRENT_CREATES + 1))
+
+        stored = await client.get("/api/startups", params={"ids": ",".join(map(str, ids)), "fields": "id"})
+        assert stored.json()["missing"] == []
+        assert (await client.get("/api/stats/dashboard")).json()["totals"]["startups"] == CONCURRENT_CREATES
+
+    api(scenario)
+
+
+def test_concurrent_single_and_bulk_creates_share_one_sequence(api):
+    async def scenario(client):
+        bulk_body = "\n".join(json.dumps(_startup(index)) for index in range(10))
+        responses = await asyncio.gather(
+            *(client.post("/api/startups", json=_startup(index)) for index in range(20)),
+            *(client.post("/api/startups:bulk", content=bulk_body) for _ in range(3)),
+        )
+        assert all(response.status_code < 300 for response in responses)
+        assert sum(response.json()["inserted"] for response in responses[20:]) == 30
+
+        export = await client.get("/api/startups/export")
+        ids = sorted(json.loads(line)["id"] for line in export.text.splitlines() if line)
+        assert ids == list(range(1, 51))
+
+    api(scenario)
@@ -0,0 +1,49 @@
+import db
+import indexes
+import stats
+
+STARTUP = {
+    "name": "Geo Labs",
+    "logo": "https://example.com/logo.svg",
+    "tagline": "Maps",
+    "description": "Location software",
+    "industry": "SaaS",
+    "fundingStage": "Seed",
+    "location": "San Francisco",
+    "funding": "$2M",
+    "teamSize": 12,
+    "founded": 2021,
+    "growth": "+40%",
+    "categories": ["Maps"],
+}
+
+
+def test_top_locations_merge_spelling_variants(api):
+    async def scenario(client):
+        for location in ("SF", "San Francisco, CA", "Berlin"):
+            response = await client.post("/api/startups", json={**STARTUP, "location": location})
+            assert response.status_code == 201
+
+        expected = [{"name": "San Francisco, CA", "count": 2}, {"name": "Berlin, Germany", "count": 1}]
+        dashboard = await client.get("/api/stats/dashboard")
+        assert dashboard.json()["topLocations"] == expected
+
+        await stats.rebuild(db.get_database())
+        await client.post("/api/startups", json={**STARTUP, "location": "Nowhere Town"})
+        dashboard = await client.get("/api/stats/dashboard")
+        assert dashboard.json()["topLocations"] == [*expected, {"name": "Nowhere Town", "count": 1}]
+
+    api(scenario)
+
+
+def test_documents_without_location_fields_are_backfilled(api):
+    async def scenario(client):
+        # Stored before the location fields existed
+        await db.get_database()["startups"].insert_one({**STARTUP, "id": 1, "location": "SF"})
+
+        assert await indexes.ensure_location_fields() == {"investors": 0, "startups": 1}
+        response = await client.get("/api/startups", params={"location": "San Francisco"})
+        assert [startup["id"] for startup in response.json()["data"]] == [1]
+        assert await indexes.ensure_location_fields() == {"investors": 0, "startups": 0}
+
+    api(scenario)
@@ -0,0 +1,77 @@
+from collections import Counter
+
+import embedded
+import main
+
+from test_locations import STARTUP
+from test_updates import INVESTOR
+
+
+def _count_finds(monkeypatch) -> Counter:
+    """Count find() queries per collection from now on"""
+    find = embedded.Collection.find
+    queries = Counter()
+
+    def counted_find(self, filter=None, projection=None):
+        queries[self.name] += 1
+        return find(self, filter, projection)
+
+    monkeypatch.setattr(embedded.Collection, "find", counted_find)
+    return queries
+
+
+def test_ids_are_fetched_with_one_query_in_request_order(api, monkeypatch):
+    async def scenario(client):
+        for index in range(4):
+            await client.post("/api/startups", json={**STARTUP, "name": f"Startup {index}"})
+        queries = _count_finds(monkeypatch)
+
+        response = (await client.get("/api/startups", params={"ids": "3,1,99,3", "fields": "name"})).json()
+        assert response == {
+            "data": [{"id": 3, "name": "Startup 2"}, {"id": 1, "name": "Startup 0"}, {"id": 3, "name": "Startup 2"}],
+            "total": 3,
+            "missing": [99],
+        }
+        assert queries == {"startups": 1}
+
+        empty = (await client.get("/api/investors", params={"ids": ""})).json()
+        assert empty == {"data": [], "total": 0, "missing": []}
+
+        assert (await client.get("/api/startups", params={"ids": "1,x"})).status_code == 400
+        monkeypatch.setattr(main, "MAX_LOOKUP_IDS", 3)
+        assert (await client.get("/api/startups", params={"ids": "1,2,3,4"})).status_code == 400
+
+    api(scenario)
+
+
+def test_lookup_resolves_mixed_ids_in_item_order(api, monkeypatch):
+    async def scenario(client):
+        investor = (await client.post("/api/investors", json=INVESTOR)).json()
+        startups = [(await client.post("/api/startups", json={**STARTUP, "name": f"Startup {i}"})).json() for i in range(2)]
+        queries = _count_finds(monkeypatch)
+
+        items = [
+            {"collection": "startups", "id": startups[1]["id"]},
+            {"collection": "investors", "id": investor["id"]},
+            {"collection": "investors", "id": 42},
+            {"collection": "startups", "id": startups[0]["id"]},
+        ]
+        response = (await client.post("/api/lookup", json={"items": items, "fields": ["name"]})).json()
+        assert response == {
+            "data": [
+                {"id": startups[1]["id"], "name": "Startup 1"},
+                {"id": investor["id"], "name": INVESTOR["name"]},
+                None,
+                {"id": startups[0]["id"], "name": "Startup 0"},
+            ],
+            "found": 3,
+        }
+        assert queries == {"investors": 1, "startups": 1}
+
+        full = (await client.post("/api/lookup", json={"items": items[:1]})).json()["data"][0]
+        assert full["tagline"] == STARTUP["tagline"]
+
+        bad = await client.post("/api/lookup", json={"items": [{"collection": "users", "id": 1}]})
+        assert bad.status_code == 422
+
+    api(scenario)
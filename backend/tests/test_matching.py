@@ -0,0 +1,81 @@
+import matching
+
+from test_locations import STARTUP
+from test_updates import INVESTOR
+
+FINTECH_SEED = {**INVESTOR, "focusIndustries": ["FinTech"], "investmentStages": ["Seed"], "investmentRange": {"min": "$1M", "max": "$10M"}}
+PAYMENTS_GROWTH = {**INVESTOR, "focusIndustries": ["Payments"], "investmentStages": ["Series A"], "investmentRange": {"min": "$10M", "max": "$50M"}}
+
+# (industry, categories, stage, funding) -> score for FINTECH_SEED
+STARTUPS = [
+    ("FinTech", [], "Seed", "$2M"),                 # 100: everything matches
+    ("FinTech", ["Payments"], "Series A", "$5M"),   # 50: primary industry only, in range
+    ("SaaS", [], "Seed", "$50M"),                   # 36: stage, funding 0.7 decades over
+    ("HealthTech", [], "Series B", "$100M"),        # 0
+    ("SaaS", ["FinTech"], "Seed", "$1M"),           # 70: category share of the industry signal
+    ("FinTech", ["Payments"], "Series A", "$5M"),   # 50: ties with the second, broken by id
+]
+
+
+def _reset_engine():
+    # The engine outlives an app run; start from one loaded from this test's data
+    matching._engine = matching.MatchingEngine()
+
+
+def _scores(response) -> list:
+    return [(match["id"], match["matchPercentage"]) for match in response.json()["data"]]
+
+
+async def _create(client):
+    investor = (await client.post("/api/investors", json=FINTECH_SEED)).json()
+    other = (await client.post("/api/investors", json=PAYMENTS_GROWTH)).json()
+    for index, (industry, categories, stage, funding) in enumerate(STARTUPS):
+        body = {**STARTUP, "name": f"Startup {index}", "industry": industry, "categories": categories,
+                "fundingStage": stage, "funding": funding}
+        assert (await client.post("/api/startups", json=body)).status_code == 201
+    return investor["id"], other["id"]
+
+
+def test_matches_are_the_top_scores_best_first(api):
+    async def scenario(client):
+        _reset_engine()
+        investor, other = await _create(client)
+
+        response = await client.get(f"/api/investors/{investor}/matches", params={"limit": 4})
+        assert _scores(response) == [(1, 100), (5, 70), (2, 50), (6, 50)]
+        assert response.json()["data"][0]["name"] == "Startup 0"
+
+        response = await client.get(f"/api/investors/{investor}/matches", params={"limit": 100})
+        assert _scores(response)[-2:] == [(3, 36), (4, 0)]
+
+        response = await client.get("/api/startups/2/matches")
+        assert _scores(response) == [(other, 64), (investor, 50)]
+
+        assert (await client.get("/api/investors/99/matches")).status_code == 404
+        assert (await client.get("/api/startups/99/matches")).status_code == 404
+
+    api(scenario)
+
+
+def test_matches_follow_writes(api):
+    async def scenario(client):
+        _reset_engine()
+        investor, other = await _create(client)
+        await client.get(f"/api/investors/{investor}/matches")
+
+        await client.patch("/api/startups/4", json={"industry": "FinTech", "fundingStage": "Seed", "funding": "$3M"})
+        await client.delete("/api/startups/1")
+        response = await client.get(f"/api/investors/{investor}/matches", params={"limit": 3})
+        assert _scores(response) == [(4, 100), (5, 70), (2, 50)]
+
+        await client.patch(f"/api/investors/{investor}", json={"investmentStages": ["Seed", "Series A"]})
+        added = (await client.post("/api/investors", json=FINTECH_SEED)).json()
+        response = await client.get("/api/startups/2/matches")
+        assert _scores(response) == [(investor, 80), (other, 64), (added["id"], 50)]
+
+        await client.delete(f"/api/investors/{other}")
+        response = await client.get("/api/startups/2/matches")
+        assert _scores(response) == [(investor, 80), (added["id"], 50)]
+        assert (await client.get(f"/api/investors/{other}/matches")).status_code == 404
+
+    api(scenario)
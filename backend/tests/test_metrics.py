@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+import metrics
+
+from test_locations import STARTUP
+
+
+async def _samples(client) -> dict:
+    """(sample name, sorted labels) -> value from the /metrics endpoint"""
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def _delta(before: dict, after: dict, name: str, **labels) -> float:
+    key = (name, tuple(sorted(labels.items())))
+    return after.get(key, 0) - before.get(key, 0)
+
+
+def test_routes_and_db_functions_are_timed(api):
+    async def scenario(client):
+        created = (await client.post("/api/startups", json=STARTUP)).json()
+        before = await _samples(client)
+
+        await client.get(f"/api/startups/{created['id']}")
+        await client.get("/api/startups/999")
+        await client.get("/api/startups", params={"cursor": "tampered"})
+        after = await _samples(client)
+
+        route = "/api/startups/{startup_id}"
+        requests = "visnex_http_request_duration_seconds_count"
+        assert _delta(before, after, requests, method="GET", route=route, status="200") == 1
+        assert _delta(before, after, requests, method="GET", route=route, status="404") == 1
+        assert _delta(before, after, requests, method="GET", route="/api/startups", status="400") == 1
+
+        assert _delta(before, after, "visnex_db_function_duration_seconds_count", function="get_startup_by_id") == 2
+        assert _delta(before, after, "visnex_db_function_documents_total", function="get_startup_by_id") == 1
+        assert _delta(before, after, "visnex_db_function_errors_total", function="get_all_startups") == 1
+
+    api(scenario)
+
+
+def _command_events(name: str, command: dict, duration_ms: float, request_id: int):
+    ids = {"connection_id": ("localhost", 27017), "request_id": request_id, "command_name": name}
+    started = SimpleNamespace(command=command, **ids)
+    finished = SimpleNamespace(duration_micros=int(duration_ms * 1000), **ids)
+    return started, finished
+
+
+def test_slow_commands_are_logged_by_shape(capsys):
+    listener = metrics.CommandMetrics(slow_query_ms=50)
+    labels = {"collection": "startups", "command": "find"}
+    seconds = REGISTRY.get_sample_value("visnex_mongo_command_duration_seconds_sum", labels) or 0
+    failures = REGISTRY.get_sample_value("visnex_mongo_command_failures_total", labels) or 0
+
+    slow = {"find": "startups", "filter": {"industry": "FinTech", "tags": {"$in": ["a", "b"]}},
+            "sort": {"funding": -1}, "limit": 10, "lsid": {"id": "session"}}
+    started, finished = _command_events("find", slow, 120, 1)
+    listener.started(started)
+    listener.succeeded(finished)
+    started, finished = _command_events("find", {"find": "startups", "filter": {"industry": "SaaS"}}, 5, 2)
+    listener.started(started)
+    listener.failed(finished)
+
+    logged = capsys.readouterr().out.splitlines()
+    assert logged == [
+        'Slow query (120ms) find startups: {"find": "startups", "filter": {"industry": "?", '
+        '"tags": {"$in": ["?"]}}, "sort": {"funding": -1}, "limit": "?"}'
+    ]
+    assert REGISTRY.get_sample_value("visnex_mongo_command_duration_seconds_sum", labels) - seconds == 0.125
+    assert REGISTRY.get_sample_value("visnex_mongo_command_failures_total", labels) - failures == 1
+    assert listener._started == {}
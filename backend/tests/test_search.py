@@ -0,0 +1,37 @@
+import db
+import indexes
+import text_search
+
+from test_locations import STARTUP
+
+
+def test_search_matches_any_word_and_prefixes(api):
+    async def scenario(client):
+        for name, tagline in (("FinFlow", "Payments for clinics"), ("MediBot", "Health robots"), ("Other", "Nothing")):
+            await client.post("/api/startups", json={**STARTUP, "name": name, "tagline": tagline, "description": "x"})
+
+        async def names(search):
+            response = await client.get("/api/startups", params={"search": search})
+            return [startup["name"] for startup in response.json()["data"]]
+
+        assert await names("fin") == ["FinFlow"]
+        # Any word matches; the document matching both ranks first
+        assert await names("health payments clinics") == ["FinFlow", "MediBot"]
+
+    api(scenario)
+
+
+def test_documents_without_grams_are_backfilled(api):
+    async def scenario(client):
+        # Stored before the search grams existed
+        await db.get_database()["startups"].insert_one({**STARTUP, "id": 1, "name": "Legacy Robotics"})
+        assert text_search.GRAMS_FIELD not in await db.get_database()["startups"].find_one({"id": 1})
+
+        assert await indexes.ensure_search_grams() == {"investors": 0, "startups": 1}
+        stored = await db.get_database()["startups"].find_one({"id": 1})
+        assert stored[text_search.GRAMS_FIELD]["name"].startswith("l le leg")
+        found = (await client.get("/api/startups", params={"search": "robo"})).json()["data"]
+        assert [startup["id"] for startup in found] == [1]
+        assert await indexes.ensure_search_grams() == {"investors": 0, "startups": 0}
+
+    api(scenario)
@@ -0,0 +1,40 @@
+import asyncio
+import signal
+from types import SimpleNamespace
+
+import uvicorn
+
+import events
+import main
+
+
+def test_sigterm_drains_before_the_server_stops(api, monkeypatch):
+    monkeypatch.setattr(main, "DRAIN_DELAY", 0.2)
+
+    async def scenario(client):
+        assert (await client.get("/ready")).status_code == 200
+        subscription = await events.get_hub().subscribe()
+        server = SimpleNamespace(should_exit=False, force_exit=False)
+
+        uvicorn.Server.handle_exit(server, signal.SIGTERM, None)
+        ready = await client.get("/ready")
+        assert (ready.status_code, ready.json()["status"]) == (503, "draining")
+        # Still serving, with the event streams already ended
+        assert not server.should_exit
+        await asyncio.sleep(0)
+        assert subscription.closed
+
+        await asyncio.sleep(0.3)
+        assert server.should_exit
+
+    api(scenario)
+
+
+def test_sigint_stops_at_once(api):
+    async def scenario(client):
+        server = SimpleNamespace(should_exit=False, force_exit=False)
+        uvicorn.Server.handle_exit(server, signal.SIGINT, None)
+        assert server.should_exit
+        assert (await client.get("/ready")).json()["status"] == "draining"
+
+    api(scenario)
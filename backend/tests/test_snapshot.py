@@ -0,0 +1,97 @@
+import db
+import snapshot
+
+from test_locations import STARTUP
+
+LOCATIONS = ["San Francisco", "Berlin", "London", "Austin, TX", "Nowhere Town"]
+INDUSTRIES = ["SaaS", "FinTech", "HealthTech"]
+
+
+def _startup(index: int) -> dict:
+    return {
+        **STARTUP,
+        "name": f"Startup {index}",
+        "industry": INDUSTRIES[index % 3],
+        "fundingStage": ["Seed", "Series A"][index % 2],
+        "location": LOCATIONS[index % 5],
+        "funding": f"${index % 7 + 1}M",
+        # Repeated team sizes give the keyset pages ties to break
+        "teamSize": 5 + index % 4 * 10,
+        "tags": [f"tag-{index % 6}", f"tag-{index % 4}"],
+        "categories": [["AI", "Data"], ["Payments"], []][index % 3],
+    }
+
+
+async def _compare(queries):
+    """Each query answered by MongoDB (the embedded store here) and by the snapshot"""
+    list_startups = db.get_all_startups.__wrapped__
+    engine = snapshot.get_engine()
+    await engine.load()
+    answered = []
+    original = engine.collection
+
+    async def collection(collection_name, query):
+        view = await original(collection_name, query)
+        answered.append(view is not None)
+        return view
+
+    engine.collection = collection
+    try:
+        for query in queries:
+            db.set_list_engine(None)
+            expected = await list_startups(**query)
+            db.set_list_engine(engine)
+            actual = await list_startups(**query)
+            assert actual == expected, query
+    finally:
+        db.set_list_engine(None)
+        del engine.collection
+    return answered
+
+
+def _reset_engine():
+    engine = snapshot.get_engine()
+    engine.tables, engine.synced, engine.loaded = {}, {}, False
+
+
+def test_snapshot_answers_like_the_database(api):
+    async def scenario(client):
+        for index in range(40):
+            assert (await client.post("/api/startups", json=_startup(index))).status_code == 201
+        try:
+            answered = await _compare([
+                {},
+                {"page": 2, "limit": 7},
+                {"industry": "FinTech", "sort_by": "teamSize", "sort_order": "asc"},
+                {"funding_stage": "Seed", "sort_by": "funding", "sort_order": "desc", "limit": 5, "page": 3},
+                {"location": "San Francisco", "facets": ["industry", "tags", "location"]},
+                {"location": "Nowhere", "min_team_size": 10, "max_team_size": 30},
+                {"min_funding": 3_000_000, "sort_by": "teamSize", "cursor": "*", "limit": 4},
+                {"near": (37.77, -122.42), "radius_km": 100, "facets": ["categories", "fundingStage"]},
+            ])
+        finally:
+            _reset_engine()
+        assert all(answered)
+
+    api(scenario)
+
+
+def test_snapshot_indexes_documents_with_many_new_terms(api):
+    async def scenario(client):
+        await client.post("/api/startups", json={**_startup(0), "tags": [f"first-{i}" for i in range(40)]})
+        engine = snapshot.get_engine()
+        try:
+            await engine.load()
+            # Writes applied through the hook, each bringing more new terms than the bitmap has rows
+            for count in (10, 30, 100):
+                response = await client.post("/api/startups", json={**_startup(count), "tags": [f"new-{count}-{i}" for i in range(count)]})
+                assert response.status_code == 201
+            view = await engine.collection("startups", {"tags": "new-100-99"})
+            assert view is not None
+            assert [document["id"] for document in await view.find({"tags": "new-100-99"}).to_list()] == [4]
+            assert await view.count_documents({"tags": "first-39"}) == 1
+            assert await view.count_documents({"tags": "new-30-0"}) == 1
+        finally:
+            _reset_engine()
+
+    api(scenario)
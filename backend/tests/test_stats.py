@@ -0,0 +1,147 @@
+from collections import Counter
+import json
+
+import pytest
+
+import db
+import embedded
+import geo
+import stats
+
+from test_bulk import _seed_file
+from test_locations import STARTUP
+from test_updates import INVESTOR
+
+
+def _named(counts: Counter, limit=None) -> list:
+    items = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{"name": name, "count": count} for name, count in items][:limit]
+
+
+def _expected(investors: list, startups: list) -> dict:
+    """What the stats endpoints report, counted document by document"""
+    active = [investor for investor in investors if investor.get("status", "Active") == "Active"]
+    platform = {
+        "activeInvestors": sum("duration" not in investor for investor in active),
+        "incubators": sum("duration" in investor for investor in investors),
+        "fundingFacilitated": f"${round(sum(i.get('activeDeals', 0) for i in active) * 5.2, 1)}B",
+        "activeConnections": sum(investor.get("portfolioCompanies", 0) for investor in active),
+    }
+    dashboard = {
+        "totals": {"investors": len(investors), "startups": len(startups), "activeInvestors": len(active)},
+        "fundingStages": _named(Counter(startup["fundingStage"] for startup in startups)),
+        "industries": _named(Counter(startup["industry"] for startup in startups)),
+        "investmentStages": _named(Counter(s for i in investors for s in i.get("investmentStages", []))),
+        "topLocations": _named(Counter(geo.label(startup["location"]) for startup in startups), limit=10),
+    }
+    return {"platform": platform, "dashboard": dashboard}
+
+
+def test_stats_match_the_documents_with_one_pipeline_per_collection(api, monkeypatch):
+    seed = json.loads(_seed_file("investorsData.json"))
+    paused = {**INVESTOR, "status": "Paused", "activeDeals": 7, "portfolioCompanies": 3}
+    investors = [*seed["investors"], *seed["incubators"], paused]
+    startups = json.loads(_seed_file("startupsData.json"))["startups"]
+    aggregate = embedded.Collection.aggregate
+    pipelines = Counter()
+
+    def counted_aggregate(self, pipeline):
+        pipelines[self.name] += 1
+        return aggregate(self, pipeline)
+
+    async def scenario(client):
+        headers = {"Content-Type": "application/json"}
+        await client.post("/api/investors:bulk", content=_seed_file("investorsData.json"), headers=headers)
+        await client.post("/api/startups:bulk", content=_seed_file("startupsData.json"), headers=headers)
+        await client.post("/api/investors", json=paused)
+
+        monkeypatch.setattr(embedded.Collection, "aggregate", counted_aggregate)
+        await stats.rebuild(db.get_database())
+        assert pipelines == {"investors": 1, "startups": 1}
+
+        expected = _expected(investors, startups)
+        assert (await client.get("/api/stats")).json() == expected["platform"]
+        assert (await client.get("/api/stats/dashboard")).json() == expected["dashboard"]
+
+    api(scenario)
+
+
+def _counters(document: dict) -> dict:
+    """Counters of a stats document, without bookkeeping fields or counters back at zero"""
+    counters = {}
+    for collection_name in ("investors", "startups"):
+        for name, value in document[collection_name].items():
+            counters[f"{collection_name}.{name}"] = (
+                {key: count for key, count in value.items() if count} if isinstance(value, dict) else value
+            )
+    return counters
+
+
+def test_writes_keep_the_counters_equal_to_a_recompute(api):
+    async def scenario(client):
+        database = db.get_database()
+        await stats.rebuild(database)
+        startups = [
+            (await client.post("/api/startups", json={**STARTUP, "name": f"Startup {i}", "tags": [f"tag-{i % 2}"]})).json()
+            for i in range(4)
+        ]
+        investor = (await client.post("/api/investors", json={**INVESTOR, "activeDeals": 4})).json()
+        await client.patch(f"/api/startups/{startups[0]['id']}", json={"industry": "FinTech", "tags": ["tag-9"], "location": "SF"})
+        await client.patch(f"/api/investors/{investor['id']}", json={"status": "Paused", "investmentStages": ["Series B"]})
+        await client.delete(f"/api/startups/{startups[1]['id']}")
+
+        stored = await database[stats.STATS_COLLECTION].find_one({"_id": stats.STATS_ID})
+        assert stored[stats.WRITES_FIELD] == 8
+        assert _counters(stored) == _counters(await stats._recompute(database))
+
+    api(scenario)
+
+
+def test_rebuild_retries_when_a_write_lands_during_the_recompute(api, monkeypatch):
+    recompute = stats._recompute
+    calls = []
+
+    async def racing_recompute(database):
+        document = await recompute(database)
+        calls.append(document["startups"]["total"])
+        if len(calls) == 1:
+            # Counted by $inc after the collections were read
+            await db.create_startup({**STARTUP, "name": "Late"})
+        return document
+
+    async def scenario(client):
+        database = db.get_database()
+        await client.post("/api/startups", json=STARTUP)
+        await stats.rebuild(database)
+        monkeypatch.setattr(stats, "_recompute", racing_recompute)
+
+        document = await stats.rebuild(database)
+        assert calls == [1, 2]
+        assert document["startups"]["total"] == 2
+        stored = await database[stats.STATS_COLLECTION].find_one({"_id": stats.STATS_ID})
+        assert stored["startups"]["total"] == 2
+        assert stored[stats.WRITES_FIELD] == document[stats.WRITES_FIELD] == 1
+
+    api(scenario)
+
+
+def test_rebuild_gives_up_under_a_steady_stream_of_writes(api, monkeypatch):
+    recompute = stats._recompute
+
+    async def always_raced(database):
+        document = await recompute(database)
+        await db.create_startup({**STARTUP, "name": "Late"})
+        return document
+
+    async def scenario(client):
+        database = db.get_database()
+        await stats.rebuild(database)
+        monkeypatch.setattr(stats, "_recompute", always_raced)
+        with pytest.raises(RuntimeError, match="raced concurrent writes"):
+            await stats.rebuild(database)
+
+        stored = await database[stats.STATS_COLLECTION].find_one({"_id": stats.STATS_ID})
+        # The stored counters kept every write, though none was recomputed
+        assert stored["startups"]["total"] == stats.STATS_REBUILD_ATTEMPTS
+
+    api(scenario)
@@ -0,0 +1,53 @@
+import db
+
+INVESTOR = {
+    "name": "Patch Capital",
+    "type": "VC Firm",
+    "logo": "https://example.com/logo.svg",
+    "location": "Berlin",
+    "investmentRange": {"min": "$1M", "max": "$10M"},
+    "focusIndustries": ["SaaS"],
+    "investmentStages": ["Seed"],
+    "investmentThesis": "Software",
+    "dealSize": "medium",
+}
+
+
+async def _stored(document_id: int) -> dict:
+    return await db.get_database()["investors"].find_one({"id": document_id}, {"_id": 0})
+
+
+def test_patch_with_empty_object_changes_nothing(api):
+    async def scenario(client):
+        created = (await client.post("/api/investors", json=INVESTOR)).json()
+        before = await _stored(created["id"])
+
+        response = await client.patch(f"/api/investors/{created['id']}", json={"investmentRange": {}})
+        assert response.status_code == 200
+        assert response.json()["investmentRange"] == INVESTOR["investmentRange"]
+
+        after = await _stored(created["id"])
+        assert after == before
+        assert (after["investmentRangeMin"], after["investmentRangeMax"]) == (1_000_000, 10_000_000)
+
+        in_range = await client.get("/api/investors", params={"check_size": 5_000_000})
+        out_of_range = await client.get("/api/investors", params={"check_size": 50_000_000})
+        assert [investor["id"] for investor in in_range.json()["data"]] == [created["id"]]
+        assert out_of_range.json()["data"] == []
+
+    api(scenario)
+
+
+def test_patch_of_one_leaf_keeps_its_siblings(api):
+    async def scenario(client):
+        created = (await client.post("/api/investors", json=INVESTOR)).json()
+
+        response = await client.patch(f"/api/investors/{created['id']}", json={"investmentRange": {"max": "$20M"}})
+        assert response.json()["investmentRange"] == {"min": "$1M", "max": "$20M"}
+
+        stored = await _stored(created["id"])
+        assert stored["investmentRange"] == {"min": "$1M", "max": "$20M"}
+        assert (stored["investmentRangeMin"], stored["investmentRangeMax"]) == (1_000_000, 20_000_000)
+        assert stored["version"] == created["version"] + 1
+
+    api(scenario)
@@ -0,0 +1,121 @@
+from pymongo import IndexModel, UpdateOne
+from typing import List, Dict, Any
+import asyncio
+import re
+
+
+# ==================== SEARCH CONFIGURATION ====================
+
+# Searchable fields per collection with their relevance weights
+SEARCH_FIELDS: Dict[str, Dict[str, int]] = {
+    "startups": {"name": 10, "tagline": 5, "description": 2},
+    "investors": {"name": 10, "investmentThesis": 3},
+}
+
+# Sub-document holding the edge n-grams of each searchable field, so that a
+# partially typed word ("fin") still hits the text index ("finflow")
+GRAMS_FIELD = "searchGrams"
+MAX_GRAM = 20
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text the way the text index does (language "none": no stemming, no stop words)"""
+    return [token.lower() for token in _TOKEN_RE.findall(text or "")]
+
+
+def _edge_grams(word: str) -> List[str]:
+    return [word[:size] for size in range(1, min(len(word), MAX_GRAM) + 1)]
+
+
+def build_search_grams(collection_name: str, document: Dict[str, Any]) -> Dict[str, str]:
+    """Edge n-grams for every searchable field of a document"""
+    grams = {}
+    for field in SEARCH_FIELDS[collection_name]:
+        seen = dict.fromkeys(gram for word in tokenize(document.get(field, "")) for gram in _edge_grams(word))
+        grams[field] = " ".join(seen)
+    return grams
+
+
+def search_grams_update(collection_name: str, update_data: Dict[str, Any]) -> Dict[str, str]:
+    """$set entries refreshing the grams of the searchable fields an update touches.
+
+    Grams are kept per field, so no other stored field is needed to rebuild them.
+    """
+    return {
+        f"{GRAMS_FIELD}.{field}": build_search_grams(collection_name, {field: update_data[field]})[field]
+        for field in SEARCH_FIELDS[collection_name] if field in update_data
+    }
+
+
+def text_query(search: str) -> Dict[str, Any]:
+    """$text filter for a user query; operators like quotes and -negation are stripped.
+
+    A document matches if any word (or a word starting with one) is in it, so
+    "ai health" finds AI companies and health companies alike, with those
+    matching both ranked first by RELEVANCE_SORT. The regex search this
+    replaced only matched the whole phrase.
+    """
+    return {"$text": {"$search": " ".join(tokenize(search))}}
+
+
+# Relevance ordering for $text queries, ties broken by id
+RELEVANCE_SORT = [("score", {"$meta": "textScore"}), ("id", 1)]
+
+
+def text_index_model(collection_name: str) -> IndexModel:
+    """The single text index of a collection: full words weigh more than prefixes"""
+    weights = {}
+    for field, weight in SEARCH_FIELDS[collection_name].items():
+        weights[field] = weight
+        weights[f"{GRAMS_FIELD}.{field}"] = max(1, weight // 2)
+    return IndexModel(
+        [(field, "text") for field in weights],
+        name="search_text",
+        weights=weights,
+        default_language="none"
+    )
+
+
+# ==================== BACKFILL ====================
+
+async def rebuild_search_grams(
+    database,
+    collection_name: str,
+    batch_size: int = 500,
+    missing_only: bool = False
+) -> int:
+    """Recompute the n-grams of every document (or only of those that never
+    had them) in batches; returns documents updated
+    """
+    collection = database[collection_name]
+    projection = {"_id": 1, **{field: 1 for field in SEARCH_FIELDS[collection_name]}}
+    query = {GRAMS_FIELD: {"$exists": False}} if missing_only else {}
+    updated = 0
+    batch = []
+    async for document in collection.find(query, projection).batch_size(batch_size):
+        batch.append(UpdateOne(
+            {"_id": document["_id"]},
+            {"$set": {GRAMS_FIELD: build_search_grams(collection_name, document)}}
+        ))
+        if len(batch) >= batch_size:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+
+async def _main():
+    # db imports this module, so it is only pulled in when run as a script
+    import db
+    for collection_name in SEARCH_FIELDS:
+        updated = await rebuild_search_grams(db.get_database(), collection_name)
+        print(f"Rebuilt search grams for {collection_name}: {updated} documents updated")
+    db.close_database()
+
+
+if __name__ == "__main__":
+    # python text_search.py -> backfill search grams for documents written before they existed
+    asyncio.run(_main())